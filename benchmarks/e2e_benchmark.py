@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+# Sample by IoTUeli – https://iotueli.com | LinkedIn: iotueli
+
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import pathlib
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+
+SRC_PATH = pathlib.Path(__file__).resolve().parent.parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from iotueli_sample.auth import OAuthCredentials
+from iotueli_sample.benchmarking import (
+    DEFAULT_TYPE_MIX,
+    CpuSample,
+    environment_info,
+    latency_summary,
+    make_definitions,
+    parse_type_mix,
+)
+from iotueli_sample.consumer_app import ConsumerApp, ConsumerRuntime
+from iotueli_sample.local_server import LocalNatsServer
+from iotueli_sample.loopback import LoopbackBroker, LoopbackConnection
+from iotueli_sample.models import ConnectionSettings, OverflowPolicy, VariableStateModel
+from iotueli_sample.nats_client import NatsConnection
+from iotueli_sample.provider_app import ProviderApp, ProviderRuntime
+from iotueli_sample.scenario import ScenarioPlayer, load_scenario, play_scenario
+
+PROVIDER_ID = "bench-provider"
+_NO_OAUTH = OAuthCredentials("bench", "", "", "", "")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="End-to-End-Benchmark: Provider → NATS → Consumer (Durchsatz und Latenz)"
+    )
+    parser.add_argument("--variables", type=int, default=1000, help="Anzahl Variablen")
+    parser.add_argument(
+        "--type-mix",
+        default=DEFAULT_TYPE_MIX,
+        help=f"Typverteilung, z. B. '{DEFAULT_TYPE_MIX}'",
+    )
+    parser.add_argument("--rate", type=float, default=10.0, help="Ticks pro Sekunde")
+    parser.add_argument(
+        "--delta", type=float, default=1.0, help="Anteil geänderter Variablen pro Tick (0..1)"
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="NumPy-Simulation verwenden (--delta = Änderungswahrscheinlichkeit je Variable)",
+    )
+    parser.add_argument("--consumers", type=int, default=1, help="Anzahl Consumer")
+    parser.add_argument(
+        "--transport",
+        choices=("loopback", "socket"),
+        default="loopback",
+        help="loopback = ein Prozess ohne Sockets; socket = lokaler NATS-Server, "
+        "Provider und Consumer in eigenen Prozessen",
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="Messdauer in Sekunden")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Aufwärmzeit in Sekunden")
+    parser.add_argument(
+        "--policy",
+        choices=[p.value for p in OverflowPolicy],
+        default=OverflowPolicy.CONFLATE.value,
+        help="Überlaufstrategie der Publish-Queue",
+    )
+    parser.add_argument(
+        "--scenario",
+        help="Szenario-Datei (JSON) statt der Simulation; --variables/--rate/--delta entfallen",
+    )
+    parser.add_argument("--output", help="JSON-Ergebnis in diese Datei statt auf stdout")
+    return parser.parse_args(argv)
+
+
+def build_provider_runtime(config: dict, port: int = 0) -> ProviderRuntime:
+    return ProviderRuntime(
+        settings=ConnectionSettings("127.0.0.1", port, PROVIDER_ID, "bench-provider"),
+        variables=make_definitions(config["variables"], parse_type_mix(config["type_mix"])),
+        oauth=_NO_OAUTH,
+        publish_interval=1.0 / config["rate"],
+        change_ratio=config["delta"],
+        vectorized_simulation=config["vectorized"],
+        publish_policy=OverflowPolicy(config["policy"]),
+    )
+
+
+class ScenarioProvider:
+    """Spielt eine Szenario-Datei anstelle von :class:`ProviderApp` ab."""
+
+    def __init__(self, path: str, connection: NatsConnection) -> None:
+        self._player = ScenarioPlayer(load_scenario(path), PROVIDER_ID)
+        self._connection = connection
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        await self._connection.connect()
+        self._task = asyncio.create_task(play_scenario(self._connection, self._player))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._connection.close()
+
+    def publish_queue_stats(self) -> dict | None:
+        return None
+
+
+class BenchmarkProvider(ProviderApp):
+    def publish_queue_stats(self) -> dict | None:
+        return asdict(self.metrics.publish_queue)
+
+
+def build_provider(config: dict, connection: NatsConnection, port: int = 0):
+    if config["scenario"]:
+        return ScenarioProvider(config["scenario"], connection)
+    return BenchmarkProvider(build_provider_runtime(config, port), connection)
+
+
+def build_consumer_runtime(config: dict, index: int, port: int = 0) -> ConsumerRuntime:
+    return ConsumerRuntime(
+        settings=ConnectionSettings("127.0.0.1", port, PROVIDER_ID, f"bench-consumer-{index}"),
+        oauth=_NO_OAUTH,
+        variables=[],
+    )
+
+
+@dataclass
+class ConsumerProbe:
+    """Zählt Events im Messfenster und misst Provider-Zeitstempel → Callback."""
+
+    window_start_ns: int = 0
+    window_end_ns: int = 0
+    events: int = 0
+    variables: int = 0
+    latencies_ns: list[int] = field(default_factory=list)
+
+    def __call__(self, changed: list[VariableStateModel]) -> None:
+        now = time.time_ns()
+        if not self.window_start_ns <= now < self.window_end_ns:
+            return
+        self.events += 1
+        self.variables += len(changed)
+        self.latencies_ns.append(now - max(s.timestamp_ns for s in changed))
+
+    def open_window(self, start_ns: int, duration: float) -> None:
+        self.window_start_ns = start_ns
+        self.window_end_ns = start_ns + int(duration * 1_000_000_000)
+
+    def result(self, index: int) -> dict:
+        return {
+            "consumer": index,
+            "events": self.events,
+            "variables": self.variables,
+            "latencies_ns": self.latencies_ns,
+        }
+
+
+async def run_loopback(config: dict) -> dict:
+    broker = LoopbackBroker()
+    provider = build_provider(config, LoopbackConnection(broker, "bench-provider"))
+    consumers = []
+    probes = []
+    for idx in range(config["consumers"]):
+        consumer = ConsumerApp(
+            build_consumer_runtime(config, idx), LoopbackConnection(broker, f"bench-consumer-{idx}")
+        )
+        probe = ConsumerProbe()
+        consumer.on_change(probe)
+        await consumer.start()
+        consumers.append(consumer)
+        probes.append(probe)
+    await provider.start()
+
+    await asyncio.sleep(config["warmup"])
+    start_ns = time.time_ns()
+    for probe in probes:
+        probe.open_window(start_ns, config["duration"])
+    cpu_start = CpuSample.take()
+    messages, published = broker.messages, broker.bytes
+    await asyncio.sleep(config["duration"])
+    cpu = CpuSample.take().since(cpu_start, "provider+consumers")
+    messages, published = broker.messages - messages, broker.bytes - published
+
+    await provider.stop()
+    for consumer in consumers:
+        await consumer.stop()
+    return {
+        "consumers": [probe.result(idx) for idx, probe in enumerate(probes)],
+        "processes": [cpu],
+        "published_messages": messages,
+        "published_bytes": published,
+        "delivered_bytes": published * len(consumers),
+        "publish_queue": provider.publish_queue_stats(),
+    }
+
+
+async def _wait_event(event) -> None:
+    await asyncio.get_running_loop().run_in_executor(None, event.wait)
+
+
+async def _provider_process_main(config: dict, port: int, ready, go, results) -> None:
+    connection = NatsConnection("127.0.0.1", port, "bench-provider", "")
+    provider = build_provider(config, connection, port)
+    await provider.start()
+    ready.release()
+    await _wait_event(go)
+    await asyncio.sleep(config["warmup"])
+    cpu_start = CpuSample.take()
+    await asyncio.sleep(config["duration"])
+    cpu = CpuSample.take().since(cpu_start, "provider")
+    await provider.stop()
+    results.put(
+        {"kind": "provider", "cpu": cpu, "publish_queue": provider.publish_queue_stats()}
+    )
+
+
+async def _consumer_process_main(config: dict, index: int, port: int, ready, go, results) -> None:
+    connection = NatsConnection("127.0.0.1", port, f"bench-consumer-{index}", "")
+    consumer = ConsumerApp(build_consumer_runtime(config, index, port), connection)
+    probe = ConsumerProbe()
+    consumer.on_change(probe)
+    await consumer.start()
+    ready.release()
+    await _wait_event(go)
+    await asyncio.sleep(config["warmup"])
+    probe.open_window(time.time_ns(), config["duration"])
+    cpu_start = CpuSample.take()
+    await asyncio.sleep(config["duration"])
+    cpu = CpuSample.take().since(cpu_start, f"consumer-{index}")
+    # Events, die noch in der Pipeline stecken, gehören zum Messfenster.
+    await asyncio.sleep(0.2)
+    await consumer.stop()
+    results.put({"kind": "consumer", "cpu": cpu, **probe.result(index)})
+
+
+def _child(target, *args) -> None:
+    with contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(target(*args))
+
+
+async def run_socket(config: dict) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Semaphore(0)
+    go = ctx.Event()
+    results = ctx.Queue()
+    loop = asyncio.get_running_loop()
+
+    async with LocalNatsServer("127.0.0.1", 0) as server:
+        processes = [
+            ctx.Process(
+                target=_child,
+                args=(_consumer_process_main, config, idx, server.port, ready, go, results),
+            )
+            for idx in range(config["consumers"])
+        ]
+        processes.append(
+            ctx.Process(
+                target=_child, args=(_provider_process_main, config, server.port, ready, go, results)
+            )
+        )
+        for process in processes:
+            process.start()
+        for _ in processes:
+            acquired = await loop.run_in_executor(None, ready.acquire, True, 60)
+            if not acquired:
+                raise RuntimeError("Benchmark-Prozesse sind nicht rechtzeitig gestartet.")
+
+        go.set()
+        await asyncio.sleep(config["warmup"])
+        cpu_start = CpuSample.take()
+        stats_start = asdict(server.stats)
+        await asyncio.sleep(config["duration"])
+        server_cpu = CpuSample.take().since(cpu_start, "server")
+        stats_end = asdict(server.stats)
+
+        reports = [
+            await loop.run_in_executor(None, results.get, True, config["duration"] + 60)
+            for _ in processes
+        ]
+        for process in processes:
+            await loop.run_in_executor(None, process.join, 10)
+
+    provider = next(r for r in reports if r["kind"] == "provider")
+    consumers = sorted((r for r in reports if r["kind"] == "consumer"), key=lambda r: r["consumer"])
+    return {
+        "consumers": [
+            {k: v for k, v in r.items() if k not in ("kind", "cpu")} for r in consumers
+        ],
+        "processes": [server_cpu, provider["cpu"], *(r["cpu"] for r in consumers)],
+        "published_messages": stats_end["msgs_in"] - stats_start["msgs_in"],
+        "published_bytes": stats_end["bytes_in"] - stats_start["bytes_in"],
+        "delivered_bytes": stats_end["bytes_out"] - stats_start["bytes_out"],
+        "slow_consumers": stats_end["slow_consumers"],
+        "publish_queue": provider["publish_queue"],
+    }
+
+
+def summarize(config: dict, raw: dict) -> dict:
+    duration = config["duration"]
+    latencies = [ns for consumer in raw["consumers"] for ns in consumer["latencies_ns"]]
+    events = sum(c["events"] for c in raw["consumers"])
+    variables = sum(c["variables"] for c in raw["consumers"])
+    results = {
+        "events_per_s": round(events / duration, 1),
+        "variables_per_s": round(variables / duration, 1),
+        "published_messages_per_s": round(raw["published_messages"] / duration, 1),
+        "published_bytes_per_s": round(raw["published_bytes"] / duration, 1),
+        "delivered_bytes_per_s": round(raw["delivered_bytes"] / duration, 1),
+        "latency": latency_summary(latencies),
+        "consumers": [
+            {
+                "consumer": c["consumer"],
+                "events_per_s": round(c["events"] / duration, 1),
+                "variables_per_s": round(c["variables"] / duration, 1),
+                "latency": latency_summary(c["latencies_ns"]),
+            }
+            for c in raw["consumers"]
+        ],
+        "processes": raw["processes"],
+        "publish_queue": raw["publish_queue"],
+    }
+    if "slow_consumers" in raw:
+        results["slow_consumers"] = raw["slow_consumers"]
+    return {"config": config, "environment": environment_info(), "results": results}
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.rate <= 0:
+        raise SystemExit("--rate muss größer als 0 sein.")
+    if not 0.0 <= args.delta <= 1.0:
+        raise SystemExit("--delta muss zwischen 0 und 1 liegen.")
+    config = {
+        "variables": args.variables,
+        "type_mix": args.type_mix,
+        "rate": args.rate,
+        "delta": args.delta,
+        "vectorized": args.vectorized,
+        "consumers": args.consumers,
+        "transport": args.transport,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "policy": args.policy,
+        "scenario": args.scenario,
+    }
+    parse_type_mix(config["type_mix"])
+    runner = run_socket if args.transport == "socket" else run_loopback
+    # Statusmeldungen von Provider/Consumer nicht ins JSON mischen.
+    with contextlib.redirect_stdout(sys.stderr):
+        report = summarize(config, asyncio.run(runner(config)))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        pathlib.Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"Ergebnis gespeichert in {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
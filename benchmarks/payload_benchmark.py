@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+# Sample by IoTUeli – https://iotueli.com | LinkedIn: iotueli
+
+import argparse
+import gc
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+ROOT_PATH = pathlib.Path(__file__).resolve().parent.parent
+for path in (ROOT_PATH / "src", ROOT_PATH):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from iotueli_sample import payloads
+from iotueli_sample.auth import OAuthCredentials
+from iotueli_sample.benchmarking import environment_info, make_definitions, parse_type_mix
+from iotueli_sample.consumer_app import ConsumerApp, ConsumerRuntime
+from iotueli_sample.definition_cache import decode_definition
+from iotueli_sample.models import ConnectionSettings, VariableStateModel, VariableType
+from iotueli_sample.provider_app import decode_write_command
+from provider_cli import _decode_values
+from weidmueller.ucontrol.hub.ProviderDefinition import ProviderDefinitionT
+from weidmueller.ucontrol.hub.ProviderDefinitionChangedEvent import (
+    ProviderDefinitionChangedEvent,
+)
+from weidmueller.ucontrol.hub.ReadVariablesQueryResponse import ReadVariablesQueryResponse
+from weidmueller.ucontrol.hub.VariablesChangedEvent import VariablesChangedEvent
+
+DEFAULT_SIZES = (10, 1_000, 10_000, 100_000)
+MIXES = {
+    "int64": "int64=1",
+    "float64": "float64=1",
+    "boolean": "boolean=1",
+    "string": "string=1",
+    "long-string": "string=1",
+    "mixed": "int64=4,float64=4,string=1,boolean=1",
+}
+BASE_TS_NS = 1_700_000_000_000_000_000
+
+# Ein Fall liefert (Funktion ohne Argumente, Payload-Größe in Bytes).
+Case = tuple[Callable[[], object], int]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Micro-Benchmarks für payloads.py und die FlatBuffer-Decoder"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="Variablenanzahlen, kommagetrennt",
+    )
+    parser.add_argument(
+        "--mixes", default=",".join(MIXES), help=f"Typmischungen aus {', '.join(MIXES)}"
+    )
+    parser.add_argument(
+        "--functions", default="", help="Nur Funktionen, deren Name einen dieser Teile enthält"
+    )
+    parser.add_argument(
+        "--long-string-length", type=int, default=1024, help="Länge der Strings bei 'long-string'"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="Mindestmesszeit pro Fall in Sekunden"
+    )
+    parser.add_argument(
+        "--alloc-max-variables",
+        type=int,
+        default=1000,
+        help="Allokationen nur bis zu dieser Variablenanzahl zählen (Profil-Hook ist langsam)",
+    )
+    parser.add_argument("--json", dest="json_path", help="Ergebnisse zusätzlich als JSON speichern")
+    parser.add_argument("--baseline", help="Früheres JSON-Ergebnis zum Vergleich")
+    return parser.parse_args(argv)
+
+
+def make_states(definitions, string_length: int | None) -> list[VariableStateModel]:
+    states = []
+    for idx, definition in enumerate(definitions):
+        if definition.data_type == VariableType.INT64:
+            value = idx * 7
+        elif definition.data_type == VariableType.FLOAT64:
+            value = idx * 0.5 + 0.25
+        elif definition.data_type == VariableType.BOOLEAN:
+            value = idx % 2 == 0
+        elif string_length:
+            value = (f"{idx}-" * string_length)[:string_length]
+        else:
+            value = f"state-{idx}"
+        states.append(VariableStateModel(definition.id, value, "GOOD", BASE_TS_NS + idx))
+    return states
+
+
+def build_cases(count: int, mix_name: str, long_string_length: int) -> dict[str, Case]:
+    definitions = make_definitions(count, parse_type_mix(MIXES[mix_name]))
+    states = make_states(definitions, long_string_length if mix_name == "long-string" else None)
+    ids = [d.id for d in definitions]
+    provider_ids = [f"provider-{idx}" for idx in range(count)]
+
+    definition_payload, fingerprint = payloads.build_provider_definition_event(definitions)
+    flat_definition = ProviderDefinitionT.InitFromObj(
+        ProviderDefinitionChangedEvent.GetRootAsProviderDefinitionChangedEvent(
+            definition_payload, 0
+        ).ProviderDefinition()
+    )
+    event = payloads.build_variables_changed_event(definitions, states, fingerprint)
+    response = payloads.build_read_variables_response(definitions, states, fingerprint)
+    command = payloads.build_write_variables_command(definitions, states)
+    registry_event = payloads.build_registry_definition_event(flat_definition)
+
+    consumer = ConsumerApp(
+        ConsumerRuntime(
+            ConnectionSettings("127.0.0.1", 0, "bench", "bench"),
+            OAuthCredentials("bench", "", "", "", ""),
+            definitions,
+        )
+    )
+    selected = {
+        var.id: var
+        for var in decode_definition(
+            ProviderDefinitionChangedEvent.GetRootAsProviderDefinitionChangedEvent(
+                registry_event, 0
+            ).ProviderDefinition()
+        )
+    }
+
+    def run(fn, *args):
+        return lambda: fn(*args)
+
+    def sized(fn, *args) -> Case:
+        result = fn(*args)
+        if isinstance(result, tuple):
+            result = result[0]
+        return run(fn, *args), len(result)
+
+    return {
+        # Die internen Helfer erzeugen keine Payload.
+        "_fingerprint": (run(payloads._fingerprint, definitions), 0),
+        "_build_variable_list": (
+            run(payloads._build_variable_list, definitions, states, fingerprint),
+            0,
+        ),
+        "build_provider_definition_event": sized(
+            payloads.build_provider_definition_event, definitions
+        ),
+        "build_variables_changed_event": sized(
+            payloads.build_variables_changed_event, definitions, states, fingerprint
+        ),
+        "build_read_variables_response": sized(
+            payloads.build_read_variables_response, definitions, states, fingerprint
+        ),
+        "build_read_variables_query": sized(payloads.build_read_variables_query, ids),
+        "build_write_variables_command": sized(
+            payloads.build_write_variables_command, definitions, states
+        ),
+        "build_read_providers_response": sized(
+            payloads.build_read_providers_response, provider_ids
+        ),
+        "build_providers_changed_event": sized(
+            payloads.build_providers_changed_event, provider_ids
+        ),
+        "build_read_provider_definition_response": sized(
+            payloads.build_read_provider_definition_response, flat_definition
+        ),
+        "build_registry_definition_event": sized(
+            payloads.build_registry_definition_event, flat_definition
+        ),
+        "ConsumerApp._update_states(event)": (
+            lambda: consumer._update_states(
+                VariablesChangedEvent.GetRootAsVariablesChangedEvent(event, 0).ChangedVariables()
+            ),
+            len(event),
+        ),
+        "provider_cli._decode_values": (
+            lambda: _decode_values(
+                ReadVariablesQueryResponse.GetRootAsReadVariablesQueryResponse(
+                    response, 0
+                ).Variables(),
+                selected,
+            ),
+            len(response),
+        ),
+        "decode_write_command": (run(decode_write_command, command), len(command)),
+    }
+
+
+def measure_time(fn: Callable[[], object], min_time: float) -> tuple[float, int]:
+    fn()  # Aufwärmen, z. B. erster Aufbau des Consumer-Zustands
+    rounds = 0
+    started = time.perf_counter_ns()
+    deadline = started + int(min_time * 1_000_000_000)
+    while True:
+        fn()
+        rounds += 1
+        now = time.perf_counter_ns()
+        if now >= deadline:
+            return (now - started) / rounds, rounds
+
+
+def count_allocations(fn: Callable[[], object]) -> int:
+    """Speicherblöcke, die während des Aufrufs angelegt werden – inklusive
+    kurzlebiger Zwischenobjekte.
+
+    Ein Profil-Hook vergleicht ``sys.getallocatedblocks()`` bei jedem Aufruf
+    und Rücksprung (Python- wie C-Funktionen) und summiert die Zuwächse; der
+    Garbage Collector ist dabei aus. Was innerhalb einer einzelnen
+    C-Funktion angelegt und wieder freigegeben wird, bleibt unsichtbar – der
+    Wert ist also eine Untergrenze.
+    """
+    allocated = 0
+    last = sys.getallocatedblocks()
+
+    def hook(frame, event, arg) -> None:
+        nonlocal allocated, last
+        now = sys.getallocatedblocks()
+        if now > last:
+            allocated += now - last
+        # Neu lesen, damit die Objekte des Hooks selbst nicht mitzählen.
+        last = sys.getallocatedblocks()
+
+    gc.collect()
+    gc.disable()
+    sys.setprofile(hook)
+    try:
+        fn()
+    finally:
+        sys.setprofile(None)
+        gc.enable()
+    return allocated
+
+
+def measure_memory(fn: Callable[[], object]) -> tuple[int, int]:
+    """Liefert (nach dem Aufruf noch belegte neue Blöcke, Spitzenbelegung in Bytes).
+
+    Differenz zweier ``tracemalloc``-Snapshots vor und nach dem Aufruf; das
+    Ergebnis wird bis nach dem zweiten Snapshot festgehalten.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del result
+    return retained, peak
+
+
+def run_benchmarks(args) -> list[dict]:
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    mixes = [m.strip() for m in args.mixes.split(",") if m.strip()]
+    unknown = [m for m in mixes if m not in MIXES]
+    if unknown:
+        raise SystemExit(f"Unbekannte Typmischung(en): {', '.join(unknown)}")
+    filters = [f.strip() for f in args.functions.split(",") if f.strip()]
+
+    results: list[dict] = []
+    for mix in mixes:
+        for count in sizes:
+            for name, (fn, payload_size) in build_cases(count, mix, args.long_string_length).items():
+                if filters and not any(f in name for f in filters):
+                    continue
+                mean_ns, rounds = measure_time(fn, args.min_time)
+                retained, peak = measure_memory(fn)
+                # Der Profil-Hook kostet pro Aufruf ein Vielfaches der Laufzeit.
+                allocations = count_allocations(fn) if count <= args.alloc_max_variables else None
+                row = {
+                    "function": name,
+                    "mix": mix,
+                    "variables": count,
+                    "rounds": rounds,
+                    "ns_per_call": round(mean_ns),
+                    "ns_per_var": round(mean_ns / count, 1),
+                    "allocations_per_var": (
+                        None if allocations is None else round(allocations / count, 2)
+                    ),
+                    "retained_blocks_per_var": round(retained / count, 2),
+                    "peak_bytes_per_var": round(peak / count, 1),
+                    "payload_bytes_per_var": round(payload_size / count, 1),
+                }
+                results.append(row)
+                print_row(row, args.baseline_rows)
+    return results
+
+
+def _key(row: dict) -> tuple[str, str, int]:
+    return row["function"], row["mix"], row["variables"]
+
+
+def print_header(with_baseline: bool) -> None:
+    header = (
+        f"{'Funktion':<42} {'Mix':<12} {'Variablen':>9} {'ns/Var':>10} "
+        f"{'Allok./Var':>10} {'Behalten/Var':>12} {'Peak B/Var':>10} {'Payload B/Var':>13}"
+    )
+    if with_baseline:
+        header += f" {'vs. Baseline':>12}"
+    print(header)
+
+
+def print_row(row: dict, baseline: dict | None) -> None:
+    allocations = row["allocations_per_var"]
+    line = (
+        f"{row['function']:<42} {row['mix']:<12} {row['variables']:>9} "
+        f"{row['ns_per_var']:>10.1f} "
+        f"{'–' if allocations is None else f'{allocations:.2f}':>10} "
+        f"{row['retained_blocks_per_var']:>12.2f} "
+        f"{row['peak_bytes_per_var']:>10.1f} {row['payload_bytes_per_var']:>13.1f}"
+    )
+    if baseline is not None:
+        old = baseline.get(_key(row))
+        if old and old["ns_per_var"]:
+            line += f" {row['ns_per_var'] / old['ns_per_var']:>11.2f}x"
+        else:
+            line += f" {'–':>12}"
+    print(line, flush=True)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    args.baseline_rows = None
+    if args.baseline:
+        baseline = json.loads(pathlib.Path(args.baseline).read_text(encoding="utf-8"))
+        args.baseline_rows = {_key(row): row for row in baseline["results"]}
+    print_header(args.baseline_rows is not None)
+    results = run_benchmarks(args)
+    if args.json_path:
+        report = {"environment": environment_info(), "results": results}
+        pathlib.Path(args.json_path).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Ergebnis gespeichert in {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
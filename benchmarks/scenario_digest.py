@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+# Sample by IoTUeli – https://iotueli.com | LinkedIn: iotueli
+
+import argparse
+import pathlib
+import sys
+import time
+
+SRC_PATH = pathlib.Path(__file__).resolve().parent.parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from iotueli_sample.scenario import load_scenario, scenario_digest
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Prüfsumme über den Event-Strom eines Szenarios (Reproduzierbarkeit)"
+    )
+    parser.add_argument("scenario", help="Szenario-Datei (JSON)")
+    parser.add_argument("--provider", default="bench-provider", help="Provider-ID für die Subjects")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    started = time.perf_counter()
+    steps, digest = scenario_digest(load_scenario(args.scenario), args.provider)
+    elapsed = time.perf_counter() - started
+    print(f"{steps} Schritte, SHA-256 {digest} ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,10 +36,16 @@ def parse_args():
         default=PROVIDER_ID,
         help="Provider-ID, die abgefragt werden soll (Default aus config.py)",
     )
+    parser.add_argument(
+        "--id",
+        type=int,
+        action="append",
+        help="Nur diese Variable-ID dekodieren und ausgeben (mehrfach möglich)",
+    )
     return parser.parse_args()
 
 
-def build_runtime(provider_id: str) -> ConsumerRuntime:
+def build_runtime(provider_id: str, interest_ids: set[int] | None = None) -> ConsumerRuntime:
     return ConsumerRuntime(
         settings=ConnectionSettings(
             host=HOST,
@@ -55,12 +61,13 @@ def build_runtime(provider_id: str) -> ConsumerRuntime:
             scope="hub.variables.readwrite",
         ),
         variables=VARIABLES,
+        interest_ids=interest_ids,
     )
 
 
 async def main() -> None:
     args = parse_args()
-    runtime = build_runtime(args.provider)
+    runtime = build_runtime(args.provider, set(args.id) if args.id else None)
     consumer = ConsumerApp(runtime)
 
     def on_change(states):
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+# Sample by IoTUeli – https://iotueli.com | LinkedIn: iotueli
+
+import argparse
+import asyncio
+import pathlib
+import sys
+
+SRC_PATH = pathlib.Path(__file__).resolve().parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from iotueli_sample.local_server import LocalNatsServer
+from iotueli_sample.nats_client import NatsConnection
+from iotueli_sample.registry_emulator import RegistryEmulator
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Minimaler lokaler NATS-Server für Tests und Benchmarks"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind-Adresse")
+    parser.add_argument("--port", type=int, default=4222, help="Port")
+    parser.add_argument("--token", default=None, help="Optionales Token für CONNECT")
+    parser.add_argument(
+        "--with-registry",
+        action="store_true",
+        help="Zusätzlich den Registry-Emulator im selben Prozess starten",
+    )
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    server = LocalNatsServer(args.host, args.port, args.token)
+    await server.start()
+    print(f"Lokaler NATS-Server läuft auf {args.host}:{server.port} – Strg+C zum Beenden.")
+
+    registry_conn = None
+    registry = None
+    if args.with_registry:
+        registry_conn = NatsConnection(
+            host=args.host,
+            port=server.port,
+            client_name="registry-emulator",
+            token=args.token or "",
+        )
+        registry = RegistryEmulator(registry_conn, verbose=True)
+        await registry.start()
+        print("Registry-Emulator aktiv")
+
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    except KeyboardInterrupt:
+        print("Beenden...")
+    finally:
+        if registry:
+            await registry.stop()
+            await registry_conn.close()
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -22,6 +22,11 @@ from iotueli_sample.config import (
     PORT,
     TOKEN_ENDPOINT,
 )
+from iotueli_sample.definition_cache import (
+    CachedDefinition,
+    DefinitionCache,
+    decode_definition,
+)
 from iotueli_sample.models import (
     VariableAccess,
     VariableDefinitionModel,
@@ -72,23 +77,23 @@ ACCESS_TYPE_LABELS = {
     VariableAccessType.READ_WRITE: "READ_WRITE",
 }
 
-DATA_TYPE_TO_MODEL = {
-    VariableDataType.BOOLEAN: VariableType.BOOLEAN,
-    VariableDataType.FLOAT64: VariableType.FLOAT64,
-    VariableDataType.INT64: VariableType.INT64,
-    VariableDataType.STRING: VariableType.STRING,
-}
-
-ACCESS_TYPE_TO_MODEL = {
-    VariableAccessType.READ_ONLY: VariableAccess.READ_ONLY,
-    VariableAccessType.READ_WRITE: VariableAccess.READ_WRITE,
-}
+DEFAULT_DEFINITION_CACHE = pathlib.Path.home() / ".iotueli_definitions.json"
 
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Werkzeug zum Lesen/Schreiben von u-OS Provider-Variablen"
     )
+    parser.add_argument(
+        "--definition-cache",
+        default=str(DEFAULT_DEFINITION_CACHE),
+        help="Datei für zwischengespeicherte Provider-Definitionen",
+    )
+    parser.add_argument(
+        "--no-definition-cache",
+        action="store_true",
+        help="Definitionen nicht auf der Platte zwischenspeichern",
+    )
     sub = parser.add_subparsers(dest="command", required=True)
 
     sub.add_parser("list-providers", help="Alle registrierten Provider anzeigen")
@@ -158,12 +163,11 @@ async def list_providers(conn: NatsConnection) -> None:
         print(f"- {pid}")
 
 
-def _decode_definition_models(definition) -> tuple[list[VariableDefinitionModel], dict[int, dict]]:
-    variables: list[VariableDefinitionModel] = []
-    info: dict[int, dict] = {}
+def _describe_entries(definition) -> list[dict]:
+    """Anzeigezeilen aller Variablen, auch solcher mit unbekanntem Typ."""
+    rows: list[dict] = []
     if definition is None or definition.VariableDefinitionsIsNone():
-        return variables, info
-
+        return rows
     for idx in range(definition.VariableDefinitionsLength()):
         entry = definition.VariableDefinitions(idx)
         if entry is None:
@@ -173,28 +177,15 @@ def _decode_definition_models(definition) -> tuple[list[VariableDefinitionModel]
             key = key.decode("utf-8")
         access_raw = entry.AccessType()
         data_raw = entry.DataType()
-        model: Optional[VariableDefinitionModel] = None
-        access = ACCESS_TYPE_LABELS.get(access_raw, f"UNKNOWN({access_raw})")
-        data_type = DATA_TYPE_LABELS.get(data_raw, f"UNKNOWN({data_raw})")
-        if data_raw in DATA_TYPE_TO_MODEL and access_raw in ACCESS_TYPE_TO_MODEL:
-            model = VariableDefinitionModel(
-                id=entry.Id(),
-                key=str(key),
-                data_type=DATA_TYPE_TO_MODEL[data_raw],
-                access=ACCESS_TYPE_TO_MODEL[access_raw],
-                experimental=entry.Experimental(),
-            )
-            variables.append(model)
-
-        info[entry.Id()] = {
-            "id": entry.Id(),
-            "key": str(key),
-            "access": access,
-            "data_type": data_type,
-            "experimental": entry.Experimental(),
-            "model": model,
-        }
-    return variables, info
+        rows.append(
+            {
+                "id": entry.Id(),
+                "key": str(key),
+                "access": ACCESS_TYPE_LABELS.get(access_raw, f"UNKNOWN({access_raw})"),
+                "data_type": DATA_TYPE_LABELS.get(data_raw, f"UNKNOWN({data_raw})"),
+            }
+        )
+    return rows
 
 
 async def fetch_definition(conn: NatsConnection, provider_id: str):
@@ -219,14 +210,18 @@ def _state_label(state: int) -> str:
     }.get(state, f"UNKNOWN({state})")
 
 
-async def describe_provider(conn: NatsConnection, provider_id: str) -> None:
+async def describe_provider(
+    conn: NatsConnection, provider_id: str, cache: DefinitionCache | None = None
+) -> None:
     definition = await fetch_definition(conn, provider_id)
-    variables, info = _decode_definition_models(definition)
+    if cache is not None:
+        cache.put(provider_id, definition.Fingerprint(), decode_definition(definition))
+    info = _describe_entries(definition)
     print(f"Provider: {provider_id}")
     print(f"Fingerprint: {definition.Fingerprint()}")
     print(f"State: {_state_label(definition.State())}")
     print("Variablen:")
-    for entry in sorted(info.values(), key=lambda x: x["id"]):
+    for entry in sorted(info, key=lambda x: x["id"]):
         print(
             f"  ID {entry['id']:>3}  | {entry['key']:<50} | {entry['data_type']:<10} | {entry['access']}"
             + (" (RW)" if entry["access"] == "READ_WRITE" else "")
@@ -235,7 +230,7 @@ async def describe_provider(conn: NatsConnection, provider_id: str) -> None:
         print("  <keine Variablen>")
 
 
-def _decode_values(var_list, selected: dict[int, dict]) -> list[dict]:
+def _decode_values(var_list, selected: dict[int, VariableDefinitionModel]) -> list[dict]:
     if not var_list:
         return []
     base_ts = var_list.BaseTimestamp()
@@ -278,43 +273,92 @@ def _decode_values(var_list, selected: dict[int, dict]) -> list[dict]:
     return rows
 
 
+async def _cached_definition(
+    conn: NatsConnection, provider_id: str, cache: DefinitionCache
+) -> tuple[CachedDefinition, bool]:
+    """Definition aus dem Cache bzw. frisch geladen; zweiter Wert: frisch geladen."""
+    definition = cache.get(provider_id)
+    if definition is not None:
+        return definition, False
+    return await cache.resolve(conn, provider_id), True
+
+
+async def _refetch(conn: NatsConnection, provider_id: str, cache: DefinitionCache) -> CachedDefinition:
+    cache.invalidate(provider_id)
+    return await cache.resolve(conn, provider_id)
+
+
+async def _provider_fingerprint(
+    conn: NatsConnection, provider_id: str, var_id: int
+) -> int | None:
+    """Aktueller Definitions-Fingerprint des Providers über ein Lesen von ``var_id``."""
+    msg = await conn.request(
+        read_variables_query(provider_id), build_read_variables_query([var_id]), timeout=2.0
+    )
+    var_list = ReadVariablesQueryResponse.GetRootAsReadVariablesQueryResponse(
+        msg.data, 0
+    ).Variables()
+    return var_list.ProviderDefinitionFingerprint() if var_list else None
+
+
+def _target_ids(definition: CachedDefinition, key: str | None, var_id: int | None):
+    if key:
+        selected = definition.by_key.get(key)
+        if selected is None:
+            raise RuntimeError(f"Key '{key}' nicht gefunden.")
+        return [selected.id]
+    if var_id is not None:
+        if var_id not in definition.by_id:
+            raise RuntimeError(f"Variable-ID {var_id} nicht gefunden.")
+        return [var_id]
+    return None
+
+
 async def read_values(
     conn: NatsConnection,
     provider_id: str,
     key: str | None,
     var_id: int | None,
+    cache: DefinitionCache | None = None,
 ) -> None:
-    definition = await fetch_definition(conn, provider_id)
-    _, info = _decode_definition_models(definition)
-
-    target_ids: Optional[list[int]] = None
-    if key:
-        matches = [entry["id"] for entry in info.values() if entry["key"] == key]
-        if not matches:
-            raise RuntimeError(f"Key '{key}' nicht gefunden.")
-        target_ids = matches
-    elif var_id is not None:
-        if var_id not in info:
-            raise RuntimeError(f"Variable-ID {var_id} nicht gefunden.")
-        target_ids = [var_id]
-
-    payload = build_read_variables_query(target_ids)
-    msg = await conn.request(
-        read_variables_query(provider_id),
-        payload,
-        timeout=2.0,
-    )
-    response = ReadVariablesQueryResponse.GetRootAsReadVariablesQueryResponse(
-        msg.data, 0
-    )
-    rows = _decode_values(response.Variables(), info)
+    cache = cache or DefinitionCache()
+    definition, fresh = await _cached_definition(conn, provider_id, cache)
+    try:
+        target_ids = _target_ids(definition, key, var_id)
+    except RuntimeError:
+        if fresh:
+            raise
+        definition, fresh = await _refetch(conn, provider_id, cache), True
+        target_ids = _target_ids(definition, key, var_id)
+
+    while True:
+        payload = build_read_variables_query(target_ids)
+        msg = await conn.request(
+            read_variables_query(provider_id),
+            payload,
+            timeout=2.0,
+        )
+        response = ReadVariablesQueryResponse.GetRootAsReadVariablesQueryResponse(
+            msg.data, 0
+        )
+        var_list = response.Variables()
+        fingerprint = var_list.ProviderDefinitionFingerprint() if var_list else None
+        if fresh or fingerprint is None or fingerprint == definition.fingerprint:
+            break
+        # Die zwischengespeicherte Definition ist veraltet: einmal nachladen
+        # und mit den neu aufgelösten IDs erneut lesen.
+        definition = await cache.resolve(conn, provider_id, fingerprint)
+        fresh = True
+        target_ids = _target_ids(definition, key, var_id)
+
+    rows = _decode_values(var_list, definition.by_id)
     if not rows:
         print("Keine Werte erhalten.")
         return
     for row in rows:
         definition_entry = row["definition"]
         if definition_entry:
-            key_label = definition_entry["key"]
+            key_label = definition_entry.key
         else:
             key_label = "<unbekannt>"
         print(f"{key_label} (ID {row['id']}): {row['value']}")
@@ -342,23 +386,32 @@ async def write_value(
     key: str | None,
     var_id: int | None,
     value: str,
+    cache: DefinitionCache | None = None,
 ) -> None:
-    definition = await fetch_definition(conn, provider_id)
-    _, info = _decode_definition_models(definition)
-
-    selected: Optional[VariableDefinitionModel] = None
-    if key:
-        for entry in info.values():
-            if entry["key"] == key:
-                selected = entry["model"]
-                break
-        if selected is None:
-            raise RuntimeError(f"Key '{key}' nicht gefunden oder nicht unterstützter Typ.")
-    elif var_id is not None:
-        entry = info.get(var_id)
-        if entry:
-            selected = entry["model"]
+    cache = cache or DefinitionCache()
+    definition, fresh = await _cached_definition(conn, provider_id, cache)
+
+    def select(definition: CachedDefinition) -> Optional[VariableDefinitionModel]:
+        if key:
+            return definition.by_key.get(key)
+        if var_id is not None:
+            return definition.by_id.get(var_id)
+        return None
+
+    selected = select(definition)
+    if selected is None and not fresh:
+        definition, fresh = await _refetch(conn, provider_id, cache), True
+        selected = select(definition)
+    if selected is not None and not fresh:
+        # Vor dem Schreiben prüfen, ob die zwischengespeicherte Definition noch
+        # gilt; sonst könnte die ID inzwischen eine andere Variable bezeichnen.
+        fingerprint = await _provider_fingerprint(conn, provider_id, selected.id)
+        if fingerprint is not None and fingerprint != definition.fingerprint:
+            definition = await cache.resolve(conn, provider_id, fingerprint)
+            selected = select(definition)
     if selected is None:
+        if key:
+            raise RuntimeError(f"Key '{key}' nicht gefunden oder nicht unterstützter Typ.")
         raise RuntimeError("Variable konnte nicht ermittelt werden.")
     if selected.access != VariableAccess.READ_WRITE:
         raise RuntimeError("Variable ist nicht beschreibbar.")
@@ -369,28 +422,29 @@ async def write_value(
         value=converted_value,
         timestamp_ns=time.time_ns(),
     )
-    payload = build_write_variables_command([selected], [state])
+    payload = build_write_variables_command([selected], [state], definition.fingerprint)
     await conn.publish(write_variables_command(provider_id), payload)
     print(
         f"Befehl gesendet: {selected.key} (ID {selected.id}) <- {converted_value!r}"
     )
     # Optional Feedback durch erneutes Lesen
     await asyncio.sleep(0.2)
-    await read_values(conn, provider_id, selected.key, None)
+    await read_values(conn, provider_id, selected.key, None, cache)
 
 
 async def main_async():
     args = parse_args()
+    cache = DefinitionCache(None if args.no_definition_cache else args.definition_cache)
     conn = await open_connection(client_suffix="cli")
     try:
         if args.command == "list-providers":
             await list_providers(conn)
         elif args.command == "describe":
-            await describe_provider(conn, args.provider)
+            await describe_provider(conn, args.provider, cache)
         elif args.command == "read":
-            await read_values(conn, args.provider, args.key, args.id)
+            await read_values(conn, args.provider, args.key, args.id, cache)
         elif args.command == "write":
-            await write_value(conn, args.provider, args.key, args.id, args.value)
+            await write_value(conn, args.provider, args.key, args.id, args.value, cache)
     finally:
         await conn.close()
 
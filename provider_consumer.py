@@ -81,7 +81,7 @@ def _resolve_target_ids(args) -> set[int]:
     return targets
 
 
-def _build_runtime(provider_id: str) -> ConsumerRuntime:
+def _build_runtime(provider_id: str, target_ids: set[int]) -> ConsumerRuntime:
     return ConsumerRuntime(
         settings=ConnectionSettings(
             host=HOST,
@@ -97,6 +97,7 @@ def _build_runtime(provider_id: str) -> ConsumerRuntime:
             scope="hub.variables.readwrite",
         ),
         variables=[],
+        interest_ids=target_ids,
     )
 
 
@@ -116,13 +117,12 @@ def _print_states(states: Iterable, label: str) -> None:
 async def main() -> None:
     args = _parse_args()
     target_ids = _resolve_target_ids(args)
-    runtime = _build_runtime(args.provider)
+    runtime = _build_runtime(args.provider, target_ids)
+    # Der Consumer dekodiert nur noch die angefragten IDs.
     consumer = ConsumerApp(runtime)
 
     def on_change(states):
-        filtered = [s for s in states if s.id in target_ids]
-        if filtered:
-            _print_states(filtered, "Änderung erhalten:")
+        _print_states(states, "Änderung erhalten:")
 
     consumer.on_change(on_change)
 
@@ -136,11 +136,10 @@ async def main() -> None:
                 "oder stimmt die ID?"
             )
             return
-        filtered_snapshot = [s for s in snapshot if s.id in target_ids]
-        if not filtered_snapshot:
+        if not snapshot:
             print("Keine der angeforderten Variablen im Snapshot gefunden.")
         else:
-            _print_states(filtered_snapshot, "Initiale Werte:")
+            _print_states(snapshot, "Initiale Werte:")
         while True:
             await asyncio.sleep(1)
     except KeyboardInterrupt:
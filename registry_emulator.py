@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+# Sample by IoTUeli – https://iotueli.com | LinkedIn: iotueli
+
+import argparse
+import asyncio
+import pathlib
+import sys
+
+SRC_PATH = pathlib.Path(__file__).resolve().parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from iotueli_sample.nats_client import NatsConnection
+from iotueli_sample.registry_emulator import RegistryEmulator
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Lokale Provider-Registry für Tests ohne Steuerung"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Host des NATS-Servers")
+    parser.add_argument("--port", type=int, default=4222, help="Port des NATS-Servers")
+    parser.add_argument("--token", default="", help="Token für den NATS-Server")
+    parser.add_argument("--quiet", action="store_true", help="Keine Ausgabe pro Definition")
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    conn = NatsConnection(
+        host=args.host,
+        port=args.port,
+        client_name="registry-emulator",
+        token=args.token,
+    )
+    registry = RegistryEmulator(conn, verbose=not args.quiet)
+    await registry.start()
+    print(f"Registry-Emulator läuft auf {args.host}:{args.port} – Strg+C zum Beenden.")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    except KeyboardInterrupt:
+        print("Beenden...")
+    finally:
+        await registry.stop()
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from .metrics import AggregationStats
+from .models import AggregateFunction, VariableStateModel, numeric_value
+
+_NAN = math.nan
+_NO_TIME = -1
+
+
+@dataclass
+class AggregateBatch:
+    """Aggregate eines Fensters ``[window_start_ns, window_end_ns)``.
+
+    ``columns`` enthält pro gewählter Funktion eine Spalte, parallel zu ``ids``;
+    ``count`` ist ganzzahlig, alle anderen Spalten ``float64`` (``nan`` ohne
+    Messwert im Fenster).
+    """
+
+    window_start_ns: int
+    window_end_ns: int
+    ids: array
+    columns: dict[AggregateFunction, array]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class _Pane:
+    """Teilaggregate aller Variablen für ein Intervall der Länge ``step``."""
+
+    __slots__ = ("count", "min", "max", "sum", "first", "first_ts", "last", "last_ts", "area")
+
+    def __init__(self) -> None:
+        self.count = array("q")
+        self.min = array("d")
+        self.max = array("d")
+        self.sum = array("d")
+        self.first = array("d")
+        self.first_ts = array("q")
+        self.last = array("d")
+        self.last_ts = array("q")
+        self.area = array("d")
+
+    def grow(self) -> None:
+        self.count.append(0)
+        self.min.append(math.inf)
+        self.max.append(-math.inf)
+        self.sum.append(0.0)
+        self.first.append(_NAN)
+        self.first_ts.append(_NO_TIME)
+        self.last.append(_NAN)
+        self.last_ts.append(_NO_TIME)
+        self.area.append(0.0)
+
+    def reset(self, blank: "_Pane") -> None:
+        # Gleich lange Slice-Zuweisung kopiert nur Speicher in die vorhandenen
+        # Puffer – ``blank`` hält die Startwerte und wächst mit.
+        for name in _Pane.__slots__:
+            getattr(self, name)[:] = getattr(blank, name)
+
+
+class WindowAggregator:
+    """Streaming-Aggregation pro Variable über Tumbling- oder Sliding-Fenster.
+
+    ``window`` ist die Fensterlänge in Sekunden, ``step`` der Vorschub
+    (``None`` = ``window``, also Tumbling). Fenster sind an der Epoche
+    ausgerichtet und werden über die Zeitstempel der Zustände bestimmt.
+    ``allowed_lateness`` (Sekunden) hält Teilintervalle über ihr Ende hinaus
+    offen, damit verspätet zugestellte Werte noch einfließen; erst Werte vor
+    dem ältesten offenen Intervall bzw. älter als der letzte Wert derselben
+    Variable werden gezählt und verworfen. Intern gibt es
+    ``(window + allowed_lateness) / step`` Teilintervalle mit spaltenweisen
+    Teilaggregaten in vorab gewachsenen Arrays – ein Update schreibt nur in
+    vorhandene Slots. Pro abgeschlossenem Schritt geht ein
+    :class:`AggregateBatch` an die ``on_window``-Callbacks. Variablen ohne
+    Messwert im Fenster erscheinen nur mit ``include_idle`` (dann zählt ihr
+    gehaltener Wert für den zeitgewichteten Mittelwert).
+
+    Anbindung: ``consumer.on_change(aggregator.record)`` und
+    ``aggregator.start()``, damit Fenster auch ohne neue Events schließen.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        step: float | None = None,
+        functions: Iterable[AggregateFunction] = tuple(AggregateFunction),
+        include_idle: bool = False,
+        allowed_lateness: float = 0.0,
+    ) -> None:
+        self.window_ns = int(window * 1_000_000_000)
+        self.step_ns = int((step or window) * 1_000_000_000)
+        if self.step_ns <= 0 or self.window_ns < self.step_ns or self.window_ns % self.step_ns:
+            raise ValueError("window muss ein positives Vielfaches von step sein.")
+        if allowed_lateness < 0:
+            raise ValueError("allowed_lateness darf nicht negativ sein.")
+        self.lateness_ns = int(allowed_lateness * 1_000_000_000)
+        self.functions = [AggregateFunction(f) for f in functions]
+        self.include_idle = include_idle
+        self.stats = AggregationStats()
+        self._callbacks: list[Callable[[AggregateBatch], None]] = []
+        self._slots: dict[int, int] = {}
+        self._ids = array("q")
+        # Fensterlänge plus die noch offenen Intervalle innerhalb der Toleranz.
+        self._window_panes = self.window_ns // self.step_ns
+        open_panes = -(-self.lateness_ns // self.step_ns)
+        self._panes = [_Pane() for _ in range(self._window_panes + open_panes)]
+        self._blank = _Pane()
+        # Beginn des ältesten offenen Intervalls und jüngster Zeitstempel.
+        self._pane_start: int | None = None
+        self._max_ts = _NO_TIME
+        # Zuletzt gesehener Wert pro Variable – trägt den zeitgewichteten
+        # Mittelwert über Intervallgrenzen.
+        self._held = array("d")
+        self._held_ts = array("q")
+        self._first_seen = array("q")
+        self._task: asyncio.Task | None = None
+
+    def on_window(self, cb: Callable[[AggregateBatch], None]) -> None:
+        self._callbacks.append(cb)
+
+    def _slot(self, var_id: int) -> int:
+        slot = len(self._ids)
+        self._slots[var_id] = slot
+        self._ids.append(var_id)
+        self._held.append(_NAN)
+        self._held_ts.append(_NO_TIME)
+        self._first_seen.append(_NO_TIME)
+        for pane in self._panes:
+            pane.grow()
+        self._blank.grow()
+        self.stats.variables = slot + 1
+        return slot
+
+    def record(self, states: Iterable[VariableStateModel]) -> None:
+        stats = self.stats
+        slots = self._slots
+        held, held_ts = self._held, self._held_ts
+        panes, step = self._panes, self.step_ns
+        for state in states:
+            value = numeric_value(state.value)
+            if value is None:
+                stats.skipped += 1
+                continue
+            ts = state.timestamp_ns
+            if self._pane_start is None:
+                self._pane_start = ts - ts % step
+            elif ts >= self._pane_start + step + self.lateness_ns:
+                self.advance(ts)
+            if ts < self._pane_start:
+                stats.late += 1
+                continue
+            slot = slots.get(state.id)
+            if slot is None:
+                slot = self._slot(state.id)
+            pane = panes[ts // step % len(panes)]
+
+            previous_ts = held_ts[slot]
+            if previous_ts != _NO_TIME:
+                if ts < previous_ts:
+                    stats.late += 1
+                    continue
+                # Gehaltenen Wert auf die offenen Intervalle bis ``ts`` verteilen.
+                since = max(previous_ts, self._pane_start)
+                while since < ts:
+                    until = min(ts, since - since % step + step)
+                    panes[since // step % len(panes)].area[slot] += held[slot] * (until - since)
+                    since = until
+            else:
+                self._first_seen[slot] = ts
+            held[slot] = value
+            held_ts[slot] = ts
+
+            count = pane.count[slot]
+            if not count:
+                pane.first[slot] = value
+                pane.first_ts[slot] = ts
+            pane.count[slot] = count + 1
+            if value < pane.min[slot]:
+                pane.min[slot] = value
+            if value > pane.max[slot]:
+                pane.max[slot] = value
+            pane.sum[slot] += value
+            pane.last[slot] = value
+            pane.last_ts[slot] = ts
+            if ts > self._max_ts:
+                self._max_ts = ts
+            stats.updates += 1
+
+    def advance(self, now_ns: int) -> None:
+        """Schließt alle Schritte, die vor ``now_ns - allowed_lateness`` enden."""
+        if self._pane_start is None:
+            return
+        watermark = now_ns - self.lateness_ns
+        closed = 0
+        while watermark >= self._pane_start + self.step_ns:
+            if (
+                closed >= len(self._panes)
+                and self._pane_start > self._max_ts
+                and not self.include_idle
+            ):
+                # Alle Teilintervalle sind leer – die folgenden Fenster ergäben
+                # keine Batches, also direkt zum aktuellen Schritt springen.
+                self._pane_start += (watermark - self._pane_start) // self.step_ns * self.step_ns
+                break
+            self._close_pane()
+            closed += 1
+
+    def _close_pane(self) -> None:
+        pane_start = self._pane_start
+        pane_end = pane_start + self.step_ns
+        panes = self._panes
+        index = pane_start // self.step_ns
+        held, held_ts, area = self._held, self._held_ts, panes[index % len(panes)].area
+        for slot in range(len(self._ids)):
+            since = held_ts[slot]
+            # Liegt der gehaltene Wert schon in einem späteren Intervall, hat
+            # ``record`` die Fläche bis dorthin bereits verteilt.
+            if since != _NO_TIME and since < pane_end:
+                area[slot] += held[slot] * (pane_end - max(since, pane_start))
+
+        batch = self._build_batch(pane_end)
+        self.stats.windows += 1
+        # Das älteste Intervall des Fensters wird als neuestes offenes wiederverwendet.
+        panes[(index + 1 - self._window_panes) % len(panes)].reset(self._blank)
+        self._pane_start = pane_end
+        if batch is not None:
+            for cb in self._callbacks:
+                cb(batch)
+
+    def _build_batch(self, window_end: int) -> AggregateBatch | None:
+        window_start = window_end - self.window_ns
+        # Teilintervalle in zeitlicher Reihenfolge, das gerade geschlossene zuletzt.
+        first_index = window_start // self.step_ns
+        count = len(self._panes)
+        panes = [self._panes[(first_index + i) % count] for i in range(self._window_panes)]
+        held_ts, first_seen, var_ids = self._held_ts, self._first_seen, self._ids
+        include_idle = self.include_idle
+        ids = array("q")
+        columns = {
+            f: array("q" if f == AggregateFunction.COUNT else "d") for f in self.functions
+        }
+        # Spaltenindex in der Zeile unten (Reihenfolge von AggregateFunction).
+        order = list(AggregateFunction)
+        appenders = [(order.index(f), column.append) for f, column in columns.items()]
+
+        for slot in range(len(var_ids)):
+            total = 0
+            lo, hi, acc, area = math.inf, -math.inf, 0.0, 0.0
+            first = last = _NAN
+            for pane in panes:
+                n = pane.count[slot]
+                area += pane.area[slot]
+                if not n:
+                    continue
+                if not total:
+                    first = pane.first[slot]
+                total += n
+                lo = min(lo, pane.min[slot])
+                hi = max(hi, pane.max[slot])
+                acc += pane.sum[slot]
+                last = pane.last[slot]
+            if total:
+                mean = acc / total
+            elif include_idle and held_ts[slot] != _NO_TIME:
+                lo = hi = mean = _NAN
+            else:
+                continue
+            # Nur die Zeit ab dem ersten bekannten Wert zählt.
+            covered = window_end - max(window_start, first_seen[slot])
+            row = (lo, hi, mean, first, last, total, area / covered if covered > 0 else _NAN)
+            ids.append(var_ids[slot])
+            for idx, append in appenders:
+                append(row[idx])
+        if not ids:
+            return None
+        return AggregateBatch(window_start, window_end, ids, columns)
+
+    def start(self, interval: float | None = None) -> None:
+        """Schließt Fenster im Hintergrund nach Wanduhr (Standard: alle ``step``/10 s)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval or self.step_ns / 10_000_000_000))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.advance(time.time_ns())
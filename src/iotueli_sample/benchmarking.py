@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Sequence
+
+from .models import VariableAccess, VariableDefinitionModel, VariableType
+
+DEFAULT_TYPE_MIX = "int64=4,float64=4,string=1,boolean=1"
+
+
+def parse_type_mix(text: str) -> dict[VariableType, float]:
+    """Liest eine Typverteilung wie ``"int64=4,float64=4,string=1,boolean=1"``."""
+    mix: dict[VariableType, float] = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        try:
+            data_type = VariableType(name.strip().lower())
+        except ValueError:
+            raise ValueError(f"Unbekannter Datentyp in Typverteilung: '{name.strip()}'") from None
+        mix[data_type] = float(weight) if weight else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Typverteilung enthält keine positiven Gewichte.")
+    return mix
+
+
+def make_definitions(
+    count: int, mix: dict[VariableType, float], start_id: int = 1
+) -> list[VariableDefinitionModel]:
+    """Erzeugt ``count`` Variablen, deren Typen der Verteilung ``mix`` folgen.
+
+    Die Zuordnung ist deterministisch (gleichmäßig verschachtelt), damit zwei
+    Prozesse mit denselben Parametern dieselbe Definition erhalten.
+    """
+    total = sum(mix.values())
+    types = list(mix)
+    emitted = dict.fromkeys(types, 0)
+    definitions: list[VariableDefinitionModel] = []
+    for idx in range(count):
+        # Jeweils den Typ wählen, der am weitesten hinter seinem Soll liegt.
+        data_type = max(types, key=lambda t: mix[t] / total * (idx + 1) - emitted[t])
+        emitted[data_type] += 1
+        definitions.append(
+            VariableDefinitionModel(
+                id=start_id + idx,
+                key=f"bench.{data_type.value}.{idx}",
+                data_type=data_type,
+                access=VariableAccess.READ_WRITE,
+            )
+        )
+    return definitions
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float | None:
+    """Perzentil nach der Nearest-Rank-Methode; erwartet sortierte Werte."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies_ns: Sequence[int]) -> dict[str, float | int | None]:
+    values = sorted(latencies_ns)
+
+    def to_us(value: float | None) -> float | None:
+        return None if value is None else round(value / 1000.0, 1)
+
+    return {
+        "samples": len(values),
+        "p50_us": to_us(percentile(values, 50)),
+        "p99_us": to_us(percentile(values, 99)),
+        "p999_us": to_us(percentile(values, 99.9)),
+        "max_us": to_us(values[-1] if values else None),
+    }
+
+
+@dataclass
+class CpuSample:
+    cpu: float
+    wall: float
+
+    @classmethod
+    def take(cls) -> "CpuSample":
+        return cls(time.process_time(), time.perf_counter())
+
+    def since(self, start: "CpuSample", role: str) -> dict[str, object]:
+        cpu = self.cpu - start.cpu
+        wall = self.wall - start.wall
+        return {
+            "role": role,
+            "pid": os.getpid(),
+            "cpu_seconds": round(cpu, 4),
+            "wall_seconds": round(wall, 4),
+            "cpu_percent": round(cpu / wall * 100.0, 1) if wall > 0 else None,
+        }
+
+
+def environment_info() -> dict[str, object]:
+    """Angaben zur Umgebung, damit Ergebnisse über Commits vergleichbar bleiben."""
+    commit = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
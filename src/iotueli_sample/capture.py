@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import mmap
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from .nats_client import NatsConnection
+
+_MAGIC = b"IOTUCAPT"
+_VERSION = 1
+# magic, version, reserved
+_HEADER = struct.Struct("<8sII")
+# timestamp_ns, payload_len, crc32, subject_len, reply_len
+_RECORD = struct.Struct("<QIIHH")
+# timestamp_ns, offset
+_INDEX = struct.Struct("<QQ")
+_INDEX_SUFFIX = ".idx"
+
+
+@dataclass
+class CaptureRecord:
+    timestamp_ns: int
+    subject: str
+    reply: str
+    data: bytes
+
+
+@dataclass
+class CaptureStats:
+    records: int = 0
+    bytes: int = 0
+    dropped: int = 0
+
+
+def index_path(path: str) -> str:
+    return path + _INDEX_SUFFIX
+
+
+class CaptureWriter:
+    """Schreibt Nachrichten append-only in eine Capture-Datei.
+
+    Pro Datensatz landen Zeitstempel, Subject, Reply und die rohen
+    FlatBuffer-Bytes in der Datei, daneben ein Index (``<datei>.idx``) mit
+    Zeitstempel und Offset für schnelles Springen. Eine bestehende Datei wird
+    fortgesetzt.
+    """
+
+    def __init__(self, path: str, flush_every: int = 100) -> None:
+        self.path = path
+        self.flush_every = flush_every
+        self.stats = CaptureStats()
+        self._unflushed = 0
+        exists = os.path.exists(path) and os.path.getsize(path) >= _HEADER.size
+        if exists:
+            # Nach einem Absturz: Index an den Datenstand angleichen und einen
+            # halb geschriebenen letzten Datensatz abschneiden.
+            with CaptureReader(path, repair=True) as reader:
+                data_end = reader.data_end
+            if os.path.getsize(path) > data_end:
+                os.truncate(path, data_end)
+        self._data = open(path, "ab")
+        self._index = open(index_path(path), "ab")
+        if not exists:
+            self._data.write(_HEADER.pack(_MAGIC, _VERSION, 0))
+        self._offset = self._data.tell()
+
+    def append(self, subject: str, reply: str, data: bytes, timestamp_ns: int | None = None) -> None:
+        subject_bytes = subject.encode("utf-8")
+        reply_bytes = (reply or "").encode("utf-8")
+        if len(subject_bytes) > 0xFFFF or len(reply_bytes) > 0xFFFF:
+            raise ValueError("Subject bzw. Reply ist zu lang für das Capture-Format.")
+        timestamp_ns = time.time_ns() if timestamp_ns is None else timestamp_ns
+        crc = zlib.crc32(data, zlib.crc32(reply_bytes, zlib.crc32(subject_bytes)))
+        record = b"".join(
+            (
+                _RECORD.pack(timestamp_ns, len(data), crc, len(subject_bytes), len(reply_bytes)),
+                subject_bytes,
+                reply_bytes,
+                data,
+            )
+        )
+        self._data.write(record)
+        self._index.write(_INDEX.pack(timestamp_ns, self._offset))
+        self._offset += len(record)
+        self.stats.records += 1
+        self.stats.bytes += len(record)
+        self._unflushed += 1
+        if self.flush_every and self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        # Erst die Daten, dann den Index – ein Indexeintrag zeigt nie ins Leere.
+        self._data.flush()
+        self._index.flush()
+        self._unflushed = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CaptureReader:
+    """Liest eine Capture-Datei über mmap; Zugriff per Position oder Zeitstempel.
+
+    Fehlt der Index oder ist er kürzer als die Daten, werden die fehlenden
+    Einträge aus der Datendatei ergänzt (mit ``repair`` auch in der
+    Indexdatei). Ein unvollständiger letzter Datensatz wird ignoriert.
+    """
+
+    def __init__(self, path: str, repair: bool = False) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.path.getsize(path)
+        if size < _HEADER.size:
+            self._file.close()
+            raise ValueError(f"'{path}' ist keine gültige Capture-Datei.")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"'{path}' ist keine gültige Capture-Datei.")
+        self._timestamps: list[int] = []
+        self._offsets: list[int] = []
+        self._load_index(repair)
+
+    def _load_index(self, repair: bool) -> None:
+        path = index_path(self.path)
+        raw = b""
+        if os.path.exists(path):
+            with open(path, "rb") as handle:
+                raw = handle.read()
+        size = len(self._mm)
+        for timestamp_ns, offset in _INDEX.iter_unpack(raw[: len(raw) - len(raw) % _INDEX.size]):
+            if offset + _RECORD.size > size or offset + self._record_size(offset) > size:
+                break
+            self._timestamps.append(timestamp_ns)
+            self._offsets.append(offset)
+        indexed = len(self._offsets)
+
+        # Daten hinter dem letzten gültigen Indexeintrag nachindizieren.
+        offset = self._offsets[-1] + self._record_size(self._offsets[-1]) if indexed else _HEADER.size
+        while offset + _RECORD.size <= size:
+            record_size = self._record_size(offset)
+            if offset + record_size > size:
+                break
+            self._timestamps.append(_RECORD.unpack_from(self._mm, offset)[0])
+            self._offsets.append(offset)
+            offset += record_size
+        self.data_end = offset
+
+        if repair and (len(self._offsets) != indexed or len(raw) != indexed * _INDEX.size):
+            with open(path, "wb") as handle:
+                handle.write(
+                    b"".join(_INDEX.pack(*entry) for entry in zip(self._timestamps, self._offsets))
+                )
+
+    def _record_size(self, offset: int) -> int:
+        _, payload_len, _, subject_len, reply_len = _RECORD.unpack_from(self._mm, offset)
+        return _RECORD.size + subject_len + reply_len + payload_len
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    @property
+    def start_time_ns(self) -> int | None:
+        return self._timestamps[0] if self._timestamps else None
+
+    @property
+    def end_time_ns(self) -> int | None:
+        return self._timestamps[-1] if self._timestamps else None
+
+    def read(self, position: int) -> CaptureRecord:
+        offset = self._offsets[position]
+        timestamp_ns, payload_len, crc, subject_len, reply_len = _RECORD.unpack_from(
+            self._mm, offset
+        )
+        pos = offset + _RECORD.size
+        subject = bytes(self._mm[pos : pos + subject_len])
+        pos += subject_len
+        reply = bytes(self._mm[pos : pos + reply_len])
+        pos += reply_len
+        data = bytes(self._mm[pos : pos + payload_len])
+        if zlib.crc32(data, zlib.crc32(reply, zlib.crc32(subject))) != crc:
+            raise ValueError(f"Beschädigter Datensatz {position} in '{self.path}'.")
+        return CaptureRecord(timestamp_ns, subject.decode("utf-8"), reply.decode("utf-8"), data)
+
+    def position_at(self, timestamp_ns: int) -> int:
+        """Position des ersten Datensatzes mit Zeitstempel ``>= timestamp_ns``."""
+        return bisect.bisect_left(self._timestamps, timestamp_ns)
+
+    def records(self, start: int = 0, stop: int | None = None) -> Iterator[CaptureRecord]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        for position in range(start, stop):
+            yield self.read(position)
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        return self.records()
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TrafficRecorder:
+    """Schneidet alle Nachrichten auf den angegebenen Subjects mit (Standard: ``v1.loc.>``)."""
+
+    def __init__(
+        self,
+        connection: NatsConnection,
+        writer: CaptureWriter,
+        subjects: Iterable[str] = ("v1.loc.>",),
+    ) -> None:
+        self._nats = connection
+        self.writer = writer
+        self.subjects = list(subjects)
+        self._subscriptions: list = []
+
+    async def start(self) -> None:
+        await self._nats.connect()
+        for subject in self.subjects:
+            self._subscriptions.append(await self._nats.subscribe(subject, callback=self._handle))
+
+    async def stop(self) -> None:
+        for subscription in self._subscriptions:
+            await subscription.unsubscribe()
+        self._subscriptions.clear()
+        self.writer.flush()
+
+    async def _handle(self, msg) -> None:
+        try:
+            self.writer.append(msg.subject, msg.reply, msg.data)
+        except ValueError as exc:
+            self.writer.stats.dropped += 1
+            print(f"Nachricht nicht aufgezeichnet: {exc}")
+
+
+async def replay_capture(
+    connection: NatsConnection,
+    reader: CaptureReader,
+    speed: float = 1.0,
+    start: int = 0,
+    stop: int | None = None,
+    keep_reply: bool = False,
+) -> int:
+    """Publiziert die Datensätze erneut – zeitgetreu ``speed``-fach, ``0`` = so schnell wie möglich.
+
+    Reply-Subjects der Aufnahme zeigen auf Inboxen, die es nicht mehr gibt;
+    sie werden daher nur mit ``keep_reply`` übernommen.
+    """
+    stop = len(reader) if stop is None else min(stop, len(reader))
+    if start >= stop:
+        return 0
+    first_ns = reader.read(start).timestamp_ns
+    started = time.perf_counter()
+    count = 0
+    for record in reader.records(start, stop):
+        if speed > 0:
+            due = (record.timestamp_ns - first_ns) / 1_000_000_000 / speed
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await connection.publish(
+            record.subject, record.data, record.reply if keep_reply and record.reply else None
+        )
+        count += 1
+        if speed <= 0 and count % 1000 == 0:
+            # Bei Maximalgeschwindigkeit anderen Tasks Luft lassen.
+            await asyncio.sleep(0)
+    return count
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import struct
+import time
 from dataclasses import dataclass
-from typing import Callable, List
+from typing import Any, AsyncIterator, Callable, Iterable, List, Mapping, Set
 
 from nats.aio.msg import Msg
+from nats.errors import NoRespondersError, TimeoutError as NatsTimeoutError
 
+from weidmueller.ucontrol.hub.Variable import Variable
 from weidmueller.ucontrol.hub.VariablesChangedEvent import VariablesChangedEvent
 from weidmueller.ucontrol.hub.ReadVariablesQueryResponse import ReadVariablesQueryResponse
 from weidmueller.ucontrol.hub.VariableValue import VariableValue
@@ -15,10 +19,60 @@ from weidmueller.ucontrol.hub.VariableValueInt64 import VariableValueInt64
 from weidmueller.ucontrol.hub.VariableValueString import VariableValueString
 
 from .auth import OAuthCredentials, request_token
-from .models import ConnectionSettings, VariableDefinitionModel, VariableStateModel
+from .definition_cache import CachedDefinition, DefinitionCache
+from .dispatch import CallbackSubscriber, ChangeCallback, ChangeStream
+from .metrics import ResyncStats, SubscriberStats
+from .models import (
+    ConnectionSettings,
+    OverflowPolicy,
+    VariableAccess,
+    VariableDefinitionModel,
+    VariableStateModel,
+    VariableType,
+)
 from .nats_client import NatsConnection
-from .payloads import build_read_variables_query
-from .subjects import read_variables_query, vars_changed_event
+from .payloads import build_read_variables_query, build_write_variables_command
+from .subjects import (
+    read_variables_query,
+    registry_provider_event,
+    vars_changed_event,
+    write_variables_command,
+)
+
+_SOFFSET = struct.Struct("<i")
+_VOFFSET = struct.Struct("<H")
+_UINT32 = struct.Struct("<I")
+# vtable-Offset des Feldes ``id`` in der Tabelle ``Variable`` (Slot 2).
+_VARIABLE_ID_SLOT = 8
+# vtable-Offset des Vektors ``items`` in der Tabelle ``VariableList`` (Slot 2).
+_VARIABLE_LIST_ITEMS_SLOT = 8
+_WRITE_TYPES = {
+    VariableType.INT64: (int,),
+    VariableType.FLOAT64: (int, float),
+    VariableType.STRING: (str,),
+    VariableType.BOOLEAN: (bool,),
+}
+_INT64_RANGE = range(-(2**63), 2**63)
+
+
+def _item_positions(var_list) -> range:
+    """Positionen der Offsets im ``items``-Vektor, ohne Variable-Objekte anzulegen."""
+    tab = var_list._tab
+    o = tab.Offset(_VARIABLE_LIST_ITEMS_SLOT)
+    if not o:
+        return range(0)
+    start = tab.Vector(o)
+    return range(start, start + tab.VectorLen(o) * 4, 4)
+
+
+def _read_item_id(buf, offset_pos: int) -> tuple[int, int]:
+    """Liest Tabellenposition und ``id`` eines Items direkt aus dem Puffer."""
+    pos = offset_pos + _UINT32.unpack_from(buf, offset_pos)[0]
+    vtable = pos - _SOFFSET.unpack_from(buf, pos)[0]
+    if _VOFFSET.unpack_from(buf, vtable)[0] <= _VARIABLE_ID_SLOT:
+        return pos, 0
+    field = _VOFFSET.unpack_from(buf, vtable + _VARIABLE_ID_SLOT)[0]
+    return pos, _UINT32.unpack_from(buf, pos + field)[0] if field else 0
 
 
 @dataclass
@@ -26,58 +80,458 @@ class ConsumerRuntime:
     settings: ConnectionSettings
     oauth: OAuthCredentials
     variables: List[VariableDefinitionModel]
+    # Optionale Interessenmenge: nur diese IDs bzw. Keys (Keys werden über
+    # ``variables`` aufgelöst) werden dekodiert und an Callbacks gemeldet.
+    interest_ids: Set[int] | None = None
+    interest_keys: Set[str] | None = None
+    # Mit Cache prüft der Consumer den Definitions-Fingerprint jedes Events
+    # und lädt die Definition bei Abweichung bzw. Registry-Änderung nach.
+    definition_cache: DefinitionCache | None = None
+
+
+@dataclass
+class _PendingWrite:
+    expected: dict[int, Any]
+    future: asyncio.Future
+    timer: asyncio.TimerHandle | None = None
+
+
+def _check_write_value(var: VariableDefinitionModel, value: Any) -> None:
+    if var.access != VariableAccess.READ_WRITE:
+        raise ValueError(f"Variable '{var.key}' ist nicht beschreibbar.")
+    allowed = _WRITE_TYPES.get(var.data_type)
+    if (
+        allowed is None
+        or not isinstance(value, allowed)
+        or (isinstance(value, bool) and var.data_type != VariableType.BOOLEAN)
+    ):
+        raise ValueError(
+            f"Wert {value!r} passt nicht zum Datentyp {var.data_type.value} von '{var.key}'."
+        )
+    if var.data_type == VariableType.INT64 and value not in _INT64_RANGE:
+        raise ValueError(f"Wert {value!r} liegt außerhalb des int64-Bereichs von '{var.key}'.")
 
 
 class ConsumerApp:
-    def __init__(self, runtime: ConsumerRuntime) -> None:
+    def __init__(self, runtime: ConsumerRuntime, connection: NatsConnection | None = None) -> None:
         self.runtime = runtime
+        # Optional injizierte Verbindung (z. B. LoopbackConnection); ohne
+        # Injektion wird per OAuth-Token eine NatsConnection aufgebaut.
+        self._connection = connection
         self._nats: NatsConnection | None = None
+        self._attached = False
         self._callbacks: list[Callable[[list[VariableStateModel]], None]] = []
+        self._subscribers: list[CallbackSubscriber] = []
+        self._streams: list[ChangeStream] = []
         self._states: dict[int, VariableStateModel] = {}
+        self._resync_task: asyncio.Task | None = None
+        self.resync_stats = ResyncStats()
+        # Während eines Snapshots gepufferte Event-Payloads (None = kein Snapshot aktiv).
+        self._sync_buffer: list[bytes] | None = None
+        self.definition: CachedDefinition | None = (
+            runtime.definition_cache.get(runtime.settings.provider_id)
+            if runtime.definition_cache is not None
+            else None
+        )
+        self._definition_task: asyncio.Task | None = None
+        self._checked_fingerprint: int | None = None
+        self._interest: set[int] | None = None
+        self._interest_ids: set[int] | None = None
+        self._interest_keys: set[str] | None = None
+        self._pending_writes: list[_PendingWrite] = []
+        if runtime.interest_ids is not None or runtime.interest_keys is not None:
+            self.set_interest(runtime.interest_ids, runtime.interest_keys)
+
+    @property
+    def interest(self) -> set[int] | None:
+        return self._interest
+
+    @property
+    def states(self) -> list[VariableStateModel]:
+        """Kopien der zuletzt bekannten Zustände aller empfangenen Variablen."""
+        return [
+            VariableStateModel(s.id, s.value, s.quality, s.timestamp_ns)
+            for s in self._states.values()
+        ]
+
+    def set_interest(
+        self, ids: Iterable[int] | None = None, keys: Iterable[str] | None = None
+    ) -> None:
+        """Beschränkt Dekodierung und Callbacks auf die angegebenen Variablen.
+
+        Ohne IDs und Keys wird die Beschränkung aufgehoben.
+        """
+        if ids is None and keys is None:
+            self._interest = None
+            self._interest_ids = self._interest_keys = None
+            return
+        interest = set(ids or ())
+        self._interest_ids = set(ids) if ids is not None else None
+        self._interest_keys = set(keys) if keys else None
+        if keys:
+            variables = self.definition.variables if self.definition else self.runtime.variables
+            by_key = {var.key: var.id for var in variables}
+            for key in keys:
+                if key not in by_key:
+                    raise ValueError(f"Key '{key}' ist in den Variablendefinitionen unbekannt.")
+                interest.add(by_key[key])
+        self._interest = interest
 
-    def on_change(self, cb: Callable[[list[VariableStateModel]], None]) -> None:
-        self._callbacks.append(cb)
+    def on_change(
+        self,
+        cb: ChangeCallback,
+        queue_size: int | None = None,
+        policy: OverflowPolicy | None = None,
+    ) -> CallbackSubscriber | None:
+        """Registriert einen Callback für geänderte Zustände.
+
+        Synchrone Callbacks ohne ``queue_size``/``policy`` laufen direkt im
+        Message-Handler. Async-Callbacks (oder mit Queue-Optionen registrierte)
+        bekommen eine eigene begrenzte Queue samt Dispatch-Task; der
+        zurückgegebene :class:`CallbackSubscriber` liefert deren Statistik.
+        """
+        if queue_size is None and policy is None and not asyncio.iscoroutinefunction(cb):
+            self._callbacks.append(cb)
+            return None
+        subscriber = CallbackSubscriber(
+            cb,
+            maxsize=queue_size or 1000,
+            policy=policy or OverflowPolicy.CONFLATE,
+        )
+        self._subscribers.append(subscriber)
+        if self._nats:
+            subscriber.start()
+        return subscriber
+
+    async def changes(
+        self,
+        ids: Iterable[int] | None = None,
+        max_batch: int = 1000,
+        max_latency: float = 0.05,
+    ) -> AsyncIterator[list[VariableStateModel]]:
+        """Liefert geänderte Zustände als Batches: ``async for batch in consumer.changes()``.
+
+        Ein Batch enthält bis zu ``max_batch`` Zustände (pro Variable der
+        jeweils letzte Wert) und wird spätestens ``max_latency`` Sekunden nach
+        der ersten Änderung ausgeliefert. Wird die Schleife verlassen oder der
+        Task abgebrochen, meldet sich der Stream wieder ab.
+        """
+        stream = ChangeStream(ids, max_batch, max_latency)
+        self._streams.append(stream)
+        try:
+            while True:
+                yield await stream.next_batch()
+        finally:
+            self._streams.remove(stream)
+
+    async def write(
+        self,
+        values: Mapping[int | str, Any],
+        confirm: bool = False,
+        timeout: float = 2.0,
+    ) -> asyncio.Future | None:
+        """Schreibt mehrere Variablen mit einem einzigen ``WriteVariablesCommand``.
+
+        Schlüssel sind IDs oder Keys; geprüft werden Existenz, Schreibrecht und
+        Datentyp gegen die Providerdefinition (``definition`` bzw.
+        ``runtime.variables``) – bei einem Fehler wird nichts gesendet. Die
+        Methode wartet nur auf das Publish, nicht auf den Provider. Mit
+        ``confirm`` gibt sie einen Future zurück, der erfüllt wird, sobald alle
+        geschriebenen Werte per Event zurückgemeldet wurden, und sonst nach
+        ``timeout`` Sekunden mit ``TimeoutError`` scheitert. Bestätigen lassen
+        sich nur Variablen innerhalb der Interessenmenge; für andere wird mit
+        ``confirm`` ein ``ValueError`` ausgelöst.
+        """
+        if not self._nats:
+            raise RuntimeError("Consumer ist nicht gestartet")
+        if self.definition is not None:
+            by_id, by_key = self.definition.by_id, self.definition.by_key
+        else:
+            by_id = {var.id: var for var in self.runtime.variables}
+            by_key = {var.key: var for var in self.runtime.variables}
+
+        selected: dict[int, VariableDefinitionModel] = {}
+        expected: dict[int, Any] = {}
+        for key_or_id, value in values.items():
+            var = by_key.get(key_or_id) if isinstance(key_or_id, str) else by_id.get(key_or_id)
+            if var is None:
+                raise ValueError(
+                    f"Variable '{key_or_id}' ist in den Variablendefinitionen unbekannt."
+                )
+            _check_write_value(var, value)
+            selected[var.id] = var
+            expected[var.id] = value
+        if not expected:
+            return None
+        if confirm and self._interest is not None:
+            outside = sorted(var_id for var_id in expected if var_id not in self._interest)
+            if outside:
+                raise ValueError(
+                    f"Variablen {outside} liegen außerhalb der Interessenmenge und "
+                    "lassen sich nicht bestätigen."
+                )
+
+        now = time.time_ns()
+        payload = build_write_variables_command(
+            list(selected.values()),
+            [
+                VariableStateModel(var_id, value, timestamp_ns=now)
+                for var_id, value in expected.items()
+            ],
+        )
+        pending = None
+        if confirm:
+            # Vor dem Publish registrieren – die Antwort kann sofort kommen.
+            loop = asyncio.get_running_loop()
+            pending = _PendingWrite(dict(expected), loop.create_future())
+            pending.timer = loop.call_later(timeout, self._expire_write, pending)
+            self._pending_writes.append(pending)
+        try:
+            await self._nats.publish(
+                write_variables_command(self.runtime.settings.provider_id), payload
+            )
+        except Exception:
+            if pending is not None:
+                self._discard_write(pending)
+            raise
+        return pending.future if pending is not None else None
+
+    def _confirm_writes(self, changed: list[VariableStateModel]) -> None:
+        for pending in list(self._pending_writes):
+            expected = pending.expected
+            for state in changed:
+                if state.id in expected and state.value == expected[state.id]:
+                    del expected[state.id]
+            if not expected:
+                self._discard_write(pending)
+                if not pending.future.done():
+                    pending.future.set_result(None)
+
+    def _expire_write(self, pending: _PendingWrite) -> None:
+        self._discard_write(pending)
+        if not pending.future.done():
+            missing = ", ".join(str(var_id) for var_id in sorted(pending.expected))
+            pending.future.set_exception(
+                TimeoutError(f"Schreibbefehl nicht bestätigt für IDs {missing}.")
+            )
+
+    def _discard_write(self, pending: _PendingWrite) -> None:
+        if pending.timer is not None:
+            pending.timer.cancel()
+        if pending in self._pending_writes:
+            self._pending_writes.remove(pending)
+
+    def subscriber_stats(self) -> dict[str, SubscriberStats]:
+        return {subscriber.name: subscriber.stats for subscriber in self._subscribers}
 
     async def start(self) -> None:
+        self._nats = self._connection or await self._open_connection()
+        for subscriber in self._subscribers:
+            subscriber.start()
+        self._nats.on_disconnected(self._handle_disconnected)
+        self._nats.on_reconnected(self._handle_reconnected)
+        await self._nats.connect()
+        await self._nats.subscribe(
+            vars_changed_event(self.runtime.settings.provider_id),
+            callback=self.feed,
+        )
+        if self.runtime.definition_cache is not None:
+            await self._nats.subscribe(
+                registry_provider_event(self.runtime.settings.provider_id),
+                callback=self._handle_definition_changed,
+            )
+            try:
+                await self._refresh_definition(None)
+            except (NoRespondersError, NatsTimeoutError, RuntimeError) as exc:
+                print(f"Providerdefinition nicht verfügbar: {exc or type(exc).__name__}")
+
+    def attach(self, connection: NatsConnection) -> None:
+        """Nutzt eine fremde, bereits verbundene Verbindung, ohne selbst zu abonnieren.
+
+        Für :class:`MultiProviderConsumer`, der die Events aller Provider über
+        eine Subscription empfängt und per :meth:`feed`,
+        :meth:`invalidate_definition` und :meth:`resync` an die passende
+        Instanz weiterreicht.
+        """
+        self._nats = connection
+        self._attached = True
+        for subscriber in self._subscribers:
+            subscriber.start()
+
+    async def _open_connection(self) -> NatsConnection:
         token = await request_token(self.runtime.oauth)
-        self._nats = NatsConnection(
+        return NatsConnection(
             host=self.runtime.settings.host,
             port=self.runtime.settings.port,
             client_name=self.runtime.settings.client_name,
             token=token,
         )
-        await self._nats.connect()
-        await self._nats.subscribe(
-            vars_changed_event(self.runtime.settings.provider_id),
-            callback=self._handle_event,
-        )
 
     async def stop(self) -> None:
-        if self._nats:
+        if self._definition_task:
+            self._definition_task.cancel()
+            await asyncio.gather(self._definition_task, return_exceptions=True)
+            self._definition_task = None
+        if self._resync_task:
+            self._resync_task.cancel()
+            await asyncio.gather(self._resync_task, return_exceptions=True)
+            self._resync_task = None
+        for subscriber in self._subscribers:
+            await subscriber.stop()
+        for pending in list(self._pending_writes):
+            self._discard_write(pending)
+            pending.future.cancel()
+        if self._nats and not self._attached:
             await self._nats.close()
-            self._nats = None
+        self._nats = None
 
     async def request_snapshot(self) -> list[VariableStateModel]:
         if not self._nats:
             raise RuntimeError("Consumer ist nicht gestartet")
-        payload = build_read_variables_query(None)
+        seen, _, event_changed = await self._synchronized_snapshot()
+        await self._dispatch(event_changed)
+        return seen
+
+    async def _synchronized_snapshot(
+        self,
+    ) -> tuple[list[VariableStateModel], list[VariableStateModel], list[VariableStateModel]]:
+        """Snapshot lesen, ohne Events zu verlieren oder mit alten Werten zu überschreiben.
+
+        Events, die während des Requests eintreffen, werden gepuffert und erst
+        nach dem Snapshot pro Variable nach Zeitstempel eingemischt; bis dahin
+        sehen Callbacks nichts davon. Liefert (alle Snapshot-Zustände, durch den
+        Snapshot geänderte, durch gepufferte Events geänderte Zustände).
+        """
+        if self._sync_buffer is not None:
+            # Es läuft bereits ein Snapshot, der den Puffer besitzt.
+            seen: list[VariableStateModel] = []
+            changed = self._update_states(await self._read_snapshot(), newer_only=True, seen=seen)
+            return seen, changed, []
+
+        self._sync_buffer = []
+        try:
+            var_list = await self._read_snapshot()
+        except BaseException:
+            await self._dispatch(self._release_sync_buffer())
+            raise
+        seen = []
+        changed = self._update_states(var_list, newer_only=True, seen=seen)
+        return seen, changed, self._release_sync_buffer()
+
+    def _release_sync_buffer(self) -> list[VariableStateModel]:
+        buffered, self._sync_buffer = self._sync_buffer or [], None
+        merged: dict[int, VariableStateModel] = {}
+        for data in buffered:
+            event = VariablesChangedEvent.GetRootAsVariablesChangedEvent(data, 0)
+            for state in self._update_states(event.ChangedVariables(), newer_only=True):
+                merged[state.id] = state
+        return list(merged.values())
+
+    async def _read_snapshot(self):
+        interest = self._interest
+        payload = build_read_variables_query(sorted(interest) if interest else None)
         msg = await self._nats.request(
             read_variables_query(self.runtime.settings.provider_id),
             payload,
             timeout=2.0,
         )
         response = ReadVariablesQueryResponse.GetRootAsReadVariablesQueryResponse(msg.data, 0)
-        return self._update_states(response.Variables())
+        return response.Variables()
+
+    def _handle_disconnected(self) -> None:
+        self.resync_stats.disconnects += 1
 
-    async def _handle_event(self, msg: Msg) -> None:
+    def _handle_reconnected(self) -> None:
+        self.resync_stats.reconnects += 1
+        if self._resync_task and not self._resync_task.done():
+            return
+        self._resync_task = asyncio.create_task(self._resync(time.perf_counter()))
+
+    async def resync(self) -> None:
+        """Liest einmal einen Snapshot wie nach einem Reconnect und meldet die Änderungen."""
+        await self._resync(time.perf_counter())
+
+    async def _resync(self, started: float) -> None:
+        # Genau ein Snapshot pro Reconnect; Werte, die inzwischen per Event
+        # neuer angekommen sind, überschreibt er nicht.
+        try:
+            _, changed, event_changed = await self._synchronized_snapshot()
+        except (NoRespondersError, NatsTimeoutError):
+            self.resync_stats.failed_resyncs += 1
+            print("Resync nach Reconnect fehlgeschlagen: Provider antwortet nicht")
+            return
+        self.resync_stats.record(time.perf_counter() - started)
+        ids = {state.id for state in changed}
+        await self._dispatch(changed + [state for state in event_changed if state.id not in ids])
+
+    async def feed(self, msg: Msg) -> None:
+        """Verarbeitet ein ``vars.evt.changed``-Event dieses Providers."""
+        if self._sync_buffer is not None:
+            self._sync_buffer.append(msg.data)
+            return
         event = VariablesChangedEvent.GetRootAsVariablesChangedEvent(msg.data, 0)
-        changed = self._update_states(event.ChangedVariables())
+        var_list = event.ChangedVariables()
+        if self.runtime.definition_cache is not None and var_list:
+            self._check_fingerprint(var_list.ProviderDefinitionFingerprint())
+        await self._dispatch(self._update_states(var_list))
+
+    def _check_fingerprint(self, fingerprint: int) -> None:
+        if self.definition is not None and fingerprint == self.definition.fingerprint:
+            return
+        # Pro abweichendem Fingerprint genau ein Nachladen.
+        if fingerprint == self._checked_fingerprint:
+            return
+        if self._definition_task and not self._definition_task.done():
+            return
+        self._checked_fingerprint = fingerprint
+        self._definition_task = asyncio.create_task(self._refresh_definition_safely(fingerprint))
+
+    async def _handle_definition_changed(self, msg: Msg) -> None:
+        self.invalidate_definition()
+
+    def invalidate_definition(self) -> None:
+        """Verwirft die gecachte Definition und lädt sie im Hintergrund neu."""
+        self.runtime.definition_cache.invalidate(self.runtime.settings.provider_id)
+        self._checked_fingerprint = None
+        if self._definition_task and not self._definition_task.done():
+            self._definition_task.cancel()
+        self._definition_task = asyncio.create_task(self._refresh_definition_safely(None))
+
+    async def _refresh_definition_safely(self, fingerprint: int | None) -> None:
+        try:
+            await self._refresh_definition(fingerprint)
+        except (NoRespondersError, NatsTimeoutError, RuntimeError) as exc:
+            print(f"Providerdefinition konnte nicht geladen werden: {exc or type(exc).__name__}")
+
+    async def _refresh_definition(self, fingerprint: int | None) -> None:
+        self.definition = await self.runtime.definition_cache.resolve(
+            self._nats, self.runtime.settings.provider_id, fingerprint
+        )
+        if self._interest_keys:
+            # Keys können nach einer Definitionsänderung auf andere IDs zeigen.
+            try:
+                self.set_interest(self._interest_ids, self._interest_keys)
+            except ValueError as exc:
+                print(f"Interessenmenge nicht aktualisiert: {exc}")
+
+    async def _dispatch(self, changed: list[VariableStateModel]) -> None:
         if not changed:
             return
+        if self._pending_writes:
+            self._confirm_writes(changed)
         for cb in self._callbacks:
             cb(changed)
+        for stream in self._streams:
+            stream.push(changed)
+        for subscriber in self._subscribers:
+            await subscriber.put(changed)
 
-    def _update_states(self, var_list) -> list[VariableStateModel]:
+    def _update_states(
+        self,
+        var_list,
+        newer_only: bool = False,
+        seen: list[VariableStateModel] | None = None,
+    ) -> list[VariableStateModel]:
         if not var_list:
             return []
 
@@ -85,15 +539,28 @@ class ConsumerApp:
         base_ns = base_ts.Seconds() * 1_000_000_000 + base_ts.Nanos()
 
         changed: list[VariableStateModel] = []
+        interest = self._interest
+        buf = var_list._tab.Bytes
 
-        for i in range(var_list.ItemsLength()):
-            item = var_list.Items(i)
-            if item is None:
+        for offset_pos in _item_positions(var_list):
+            # Die ID steht direkt im Puffer – nicht interessante Items werden
+            # übersprungen, ohne Objekte anzulegen oder Werte zu lesen.
+            pos, var_id = _read_item_id(buf, offset_pos)
+            if interest is not None and var_id not in interest:
                 continue
-            var_id = item.Id()
+            item = Variable()
+            item.Init(buf, pos)
 
+            item_ts = item.Timestamp()
+            timestamp_ns = (
+                item_ts.Seconds() * 1_000_000_000 + item_ts.Nanos() if item_ts else base_ns
+            )
             state = self._states.setdefault(var_id, VariableStateModel(id=var_id, value=None))
-            state.timestamp_ns = base_ns
+            if seen is not None:
+                seen.append(state)
+            if newer_only and state.timestamp_ns > timestamp_ns:
+                continue
+            state.timestamp_ns = timestamp_ns
 
             value_type = item.ValueType()
             value_table = item.Value()
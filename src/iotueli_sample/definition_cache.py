@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+
+from weidmueller.ucontrol.hub.ReadProviderDefinitionQueryResponse import (
+    ReadProviderDefinitionQueryResponse,
+)
+from weidmueller.ucontrol.hub.VariableAccessType import VariableAccessType
+from weidmueller.ucontrol.hub.VariableDataType import VariableDataType
+
+from .metrics import DefinitionCacheStats
+from .models import (
+    VariableAccess,
+    VariableDefinitionModel,
+    VariableType,
+    definition_from_dict,
+    definition_to_dict,
+)
+from .nats_client import NatsConnection
+from .payloads import build_read_provider_definition_query
+from .subjects import registry_provider_query
+
+_DATA_TYPES = {
+    VariableDataType.BOOLEAN: VariableType.BOOLEAN,
+    VariableDataType.FLOAT64: VariableType.FLOAT64,
+    VariableDataType.INT64: VariableType.INT64,
+    VariableDataType.STRING: VariableType.STRING,
+}
+_ACCESS_TYPES = {
+    VariableAccessType.READ_ONLY: VariableAccess.READ_ONLY,
+    VariableAccessType.READ_WRITE: VariableAccess.READ_WRITE,
+}
+
+
+def decode_definition(definition) -> list[VariableDefinitionModel]:
+    """Variablen einer FlatBuffer-``ProviderDefinition``; nicht unterstützte Typen fehlen."""
+    variables: list[VariableDefinitionModel] = []
+    if definition is None or definition.VariableDefinitionsIsNone():
+        return variables
+    for idx in range(definition.VariableDefinitionsLength()):
+        entry = definition.VariableDefinitions(idx)
+        if entry is None:
+            continue
+        data_type = _DATA_TYPES.get(entry.DataType())
+        access = _ACCESS_TYPES.get(entry.AccessType())
+        if data_type is None or access is None:
+            continue
+        key = entry.Key()
+        if isinstance(key, (bytes, bytearray)):
+            key = key.decode("utf-8")
+        variables.append(
+            VariableDefinitionModel(
+                id=entry.Id(),
+                key=str(key),
+                data_type=data_type,
+                access=access,
+                experimental=entry.Experimental(),
+            )
+        )
+    return variables
+
+
+@dataclass
+class CachedDefinition:
+    provider_id: str
+    fingerprint: int
+    variables: list[VariableDefinitionModel]
+    by_id: dict[int, VariableDefinitionModel] = field(init=False, repr=False)
+    by_key: dict[str, VariableDefinitionModel] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.by_id = {var.id: var for var in self.variables}
+        self.by_key = {var.key: var for var in self.variables}
+
+
+class DefinitionCache:
+    """Provider-Definitionen, abgelegt unter (Provider-ID, Fingerprint).
+
+    :meth:`resolve` liefert die aktuelle Definition eines Providers ohne
+    Roundtrip, solange der übergebene Fingerprint (z. B. aus
+    ``VariableList.ProviderDefinitionFingerprint()``) bekannt ist. Bei einem
+    unbekannten Fingerprint oder nach :meth:`invalidate` (Registry-Event
+    ``def.evt.changed``) wird genau einmal nachgeladen – gleichzeitige
+    Aufrufer warten auf denselben Request. Mit ``path`` wird der Cache als
+    JSON-Datei gespeichert und beim nächsten Start wieder geladen.
+    """
+
+    def __init__(self, path: str | None = None, timeout: float = 2.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.stats = DefinitionCacheStats()
+        self._entries: dict[tuple[str, int], CachedDefinition] = {}
+        self._current: dict[str, int] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+        # Fingerprints, die auch nach dem Nachladen nicht zur Registry passten –
+        # für sie wird bis zur nächsten Invalidierung nicht erneut angefragt.
+        self._unresolved: set[tuple[str, int]] = set()
+        if path and os.path.exists(path):
+            self._load()
+
+    def get(self, provider_id: str, fingerprint: int | None = None) -> CachedDefinition | None:
+        """Definition aus dem Cache; ohne Fingerprint die zuletzt gültige."""
+        if fingerprint is None:
+            fingerprint = self._current.get(provider_id)
+            if fingerprint is None:
+                return None
+        return self._entries.get((provider_id, fingerprint))
+
+    def put(
+        self, provider_id: str, fingerprint: int, variables: list[VariableDefinitionModel]
+    ) -> CachedDefinition:
+        entry = CachedDefinition(provider_id, fingerprint, list(variables))
+        self._entries[(provider_id, fingerprint)] = entry
+        self._current[provider_id] = fingerprint
+        self._save()
+        return entry
+
+    def invalidate(self, provider_id: str) -> None:
+        """Nächstes :meth:`resolve` ohne bekannten Fingerprint lädt neu."""
+        self._unresolved = {key for key in self._unresolved if key[0] != provider_id}
+        if self._current.pop(provider_id, None) is not None:
+            self.stats.invalidations += 1
+            self._save()
+
+    async def resolve(
+        self, connection: NatsConnection, provider_id: str, fingerprint: int | None = None
+    ) -> CachedDefinition:
+        entry = self.get(provider_id, fingerprint)
+        if entry is not None:
+            if fingerprint is not None:
+                self._current[provider_id] = fingerprint
+            self.stats.hits += 1
+            return entry
+        current = self.get(provider_id)
+        if current is not None and (provider_id, fingerprint) in self._unresolved:
+            self.stats.hits += 1
+            return current
+        if fingerprint is not None and current is not None:
+            self.stats.mismatches += 1
+        pending = self._pending.get(provider_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(connection, provider_id))
+            self._pending[provider_id] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(provider_id, None))
+        entry = await asyncio.shield(pending)
+        if fingerprint is not None and entry.fingerprint != fingerprint:
+            self._unresolved.add((provider_id, fingerprint))
+        return entry
+
+    async def _fetch(self, connection: NatsConnection, provider_id: str) -> CachedDefinition:
+        self.stats.fetches += 1
+        msg = await connection.request(
+            registry_provider_query(provider_id),
+            build_read_provider_definition_query(),
+            timeout=self.timeout,
+        )
+        response = ReadProviderDefinitionQueryResponse.GetRootAsReadProviderDefinitionQueryResponse(
+            msg.data, 0
+        )
+        definition = response.ProviderDefinition()
+        if definition is None:
+            raise RuntimeError(f"Keine Definition für Provider '{provider_id}' gefunden.")
+        return self.put(provider_id, definition.Fingerprint(), decode_definition(definition))
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        for item in data.get("definitions", []):
+            variables = [definition_from_dict(var) for var in item["variables"]]
+            entry = CachedDefinition(item["provider_id"], item["fingerprint"], variables)
+            self._entries[(entry.provider_id, entry.fingerprint)] = entry
+        self._current = {pid: int(fp) for pid, fp in data.get("current", {}).items()}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        data = {
+            "current": self._current,
+            "definitions": [
+                {
+                    "provider_id": entry.provider_id,
+                    "fingerprint": entry.fingerprint,
+                    "variables": [definition_to_dict(var) for var in entry.variables],
+                }
+                for entry in self._entries.values()
+            ],
+        }
+        # Erst vollständig schreiben, dann ersetzen – ein Abbruch hinterlässt
+        # nie eine halbe Datei.
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle)
+        os.replace(tmp_path, self.path)
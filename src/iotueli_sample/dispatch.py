@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Iterable, Union
+
+from .metrics import SubscriberStats
+from .models import OverflowPolicy, VariableStateModel
+
+ChangeCallback = Callable[[list[VariableStateModel]], Union[None, Awaitable[None]]]
+
+
+class CallbackSubscriber:
+    """Ruft einen ``on_change``-Callback aus einem eigenen Task auf.
+
+    Änderungen landen in einer begrenzten Queue, sodass ein langsamer Callback
+    (Datenbank, HTTP) weder das Dekodieren weiterer Events noch andere
+    Callbacks aufhält. Mit :attr:`OverflowPolicy.CONFLATE` wird pro Variable nur
+    der letzte Wert behalten; ``maxsize`` gilt dort bewusst nicht. Die Queue
+    ist schon durch die Anzahl Variablen der Definition begrenzt, und eine
+    verdrängte Variable wäre – anders als ein veralteter Batch – für den
+    Callback stillschweigend verloren, bis sie sich wieder ändert.
+    ``DROP_OLDEST`` verwirft bei voller Queue den ältesten Batch, ``BLOCK``
+    lässt den Aufrufer warten. ``stats`` enthält Tiefe, Verluste und die
+    Verzögerung zwischen Einreihen und Auslieferung.
+    """
+
+    def __init__(
+        self,
+        callback: ChangeCallback,
+        maxsize: int = 1000,
+        policy: OverflowPolicy = OverflowPolicy.CONFLATE,
+        name: str | None = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize muss mindestens 1 sein.")
+        self.callback = callback
+        self.maxsize = maxsize
+        self.policy = OverflowPolicy(policy)
+        self.name = name or getattr(callback, "__qualname__", repr(callback))
+        self.stats = SubscriberStats()
+        # CONFLATE: ID -> (Zustand, eingereiht um); sonst Batches mit Zeitstempel.
+        self._latest: OrderedDict[int, tuple[VariableStateModel, float]] = OrderedDict()
+        self._batches: deque[tuple[list[VariableStateModel], float]] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._latest) if self.policy == OverflowPolicy.CONFLATE else len(self._batches)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Wartende Produzenten (BLOCK) nicht hängen lassen.
+        self._not_full.set()
+
+    async def put(self, states: Iterable[VariableStateModel]) -> None:
+        # Der Consumer aktualisiert seine Zustandsobjekte in place – die Queue
+        # braucht daher Kopien.
+        batch = [VariableStateModel(s.id, s.value, s.quality, s.timestamp_ns) for s in states]
+        if not batch:
+            return
+        now = time.perf_counter()
+        stats = self.stats
+        if self.policy == OverflowPolicy.CONFLATE:
+            latest = self._latest
+            for state in batch:
+                entry = latest.get(state.id)
+                if entry is not None:
+                    latest[state.id] = (state, entry[1])
+                    stats.conflated += 1
+                else:
+                    latest[state.id] = (state, now)
+        else:
+            while len(self._batches) >= self.maxsize:
+                if self.policy == OverflowPolicy.BLOCK and self._task is not None:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+                    now = time.perf_counter()
+                else:
+                    dropped, _ = self._batches.popleft()
+                    stats.dropped += len(dropped)
+            self._batches.append((batch, now))
+        stats.enqueued += len(batch)
+        self._update_depth()
+        self._not_empty.set()
+
+    def _take(self) -> tuple[list[VariableStateModel], float]:
+        if self.policy == OverflowPolicy.CONFLATE:
+            entries = list(self._latest.values())
+            self._latest.clear()
+            return [state for state, _ in entries], min(since for _, since in entries)
+        return self._batches.popleft()
+
+    async def _run(self) -> None:
+        while True:
+            while not len(self):
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            batch, enqueued_at = self._take()
+            self._update_depth()
+            self._not_full.set()
+            self.stats.record_lag(time.perf_counter() - enqueued_at)
+            try:
+                result = self.callback(batch)
+                if inspect.isawaitable(result):
+                    await result
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.stats.errors += 1
+                print(f"Callback '{self.name}' fehlgeschlagen: {exc}")
+                continue
+            self.stats.delivered += len(batch)
+
+    def _update_depth(self) -> None:
+        depth = len(self)
+        self.stats.depth = depth
+        self.stats.max_depth = max(self.stats.max_depth, depth)
+
+
+def _wake(waiter: asyncio.Future | None) -> None:
+    if waiter is not None and not waiter.done():
+        waiter.set_result(None)
+
+
+class ChangeStream:
+    """Puffer hinter :meth:`ConsumerApp.changes` mit Micro-Batching.
+
+    Alle Streams eines Consumers bekommen dieselben, einmal dekodierten
+    Zustände. Pro Variable wird nur der letzte noch nicht abgeholte Wert
+    gehalten; :meth:`next_batch` liefert höchstens ``max_batch`` Zustände,
+    sobald genug beisammen sind oder die erste wartende Änderung
+    ``max_latency`` Sekunden alt ist.
+    """
+
+    def __init__(
+        self,
+        ids: Iterable[int] | None = None,
+        max_batch: int = 1000,
+        max_latency: float = 0.05,
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch muss mindestens 1 sein.")
+        self.ids = set(ids) if ids is not None else None
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.conflated = 0
+        self._pending: OrderedDict[int, VariableStateModel] = OrderedDict()
+        self._first_at = 0.0
+        self._not_empty = asyncio.Event()
+        self._waiter: asyncio.Future | None = None
+
+    def push(self, states: Iterable[VariableStateModel]) -> None:
+        ids = self.ids
+        pending = self._pending
+        was_empty = not pending
+        for s in states:
+            if ids is not None and s.id not in ids:
+                continue
+            if s.id in pending:
+                self.conflated += 1
+            pending[s.id] = VariableStateModel(s.id, s.value, s.quality, s.timestamp_ns)
+        if not pending:
+            return
+        if was_empty:
+            self._first_at = asyncio.get_running_loop().time()
+            self._not_empty.set()
+        if len(pending) >= self.max_batch:
+            _wake(self._waiter)
+
+    async def next_batch(self) -> list[VariableStateModel]:
+        pending = self._pending
+        while not pending:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        loop = asyncio.get_running_loop()
+        deadline = self._first_at + self.max_latency
+        if len(pending) < self.max_batch and deadline > loop.time():
+            # Eigener Future statt asyncio.wait_for: dort kann unter
+            # Python < 3.12 ein Abbruch verloren gehen.
+            self._waiter = loop.create_future()
+            timer = loop.call_at(deadline, _wake, self._waiter)
+            try:
+                await self._waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+        count = min(len(pending), self.max_batch)
+        batch = [pending.popitem(last=False)[1] for _ in range(count)]
+        if pending:
+            # Rest gehört zum nächsten Batch, dessen Wartezeit ab jetzt läuft.
+            self._first_at = loop.time()
+        return batch
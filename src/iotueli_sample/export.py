@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from .metrics import ExportStats
+from .models import VariableStateModel, numeric_value
+from .payloads import QUALITY_CODES, quality_to_enum
+
+_MAGIC = b"IOTUCOLS"
+_VERSION = 1
+# magic, version, flags
+_HEADER = struct.Struct("<8sII")
+# rows, payload_len, crc32
+_CHUNK = struct.Struct("<III")
+_FLAG_COMPRESSED = 1
+_SUFFIX = ".iotcol"
+
+
+@dataclass
+class ColumnChunk:
+    """Ein Block einer Exportdatei; Qualität als ``VariableQuality``-Code."""
+
+    ids: array
+    timestamps: array
+    values: array
+    quality: array
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class _Buffer:
+    __slots__ = ("ids", "timestamps", "values", "quality", "size", "started")
+
+    def __init__(self, capacity: int) -> None:
+        self.ids = array("q", bytes(8 * capacity))
+        self.timestamps = array("q", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.quality = array("B", bytes(capacity))
+        self.size = 0
+        self.started = 0.0
+
+    def columns(self) -> list[memoryview]:
+        size = self.size
+        return [
+            memoryview(column)[:size].cast("B")
+            for column in (self.ids, self.timestamps, self.values, self.quality)
+        ]
+
+
+class ColumnarExporter:
+    """Schreibt Updates als rollierende Spaltendateien (ID, Zeitstempel, Wert, Qualität).
+
+    Das Format kennt nur numerische Werte (Booleans als 0/1) in einer
+    ``float64``-Spalte; String-Variablen werden nicht exportiert, sondern in
+    ``stats.skipped`` gezählt. Die Werte landen in vorab angelegten
+    Spaltenpuffern mit ``chunk_rows`` Zeilen; ein voller Puffer bzw. einer,
+    dessen erste Zeile ``flush_interval`` Sekunden alt ist, geht als Block an
+    einen Writer-Thread, der ihn – mit ``compress`` per zlib (Stufe
+    ``compress_level``) – anhängt. Es kreisen ``buffers`` Puffer; sind alle
+    beim Writer, werden neue Zeilen verworfen statt den Consumer aufzuhalten
+    (``stats.dropped``). Eine neue
+    Datei beginnt ab ``max_file_bytes`` bzw. nach ``rotate_interval``
+    Sekunden. Anbindung: ``consumer.on_change(exporter.record)`` und
+    ``exporter.start()``; lesen mit :func:`read_columns`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "export",
+        chunk_rows: int = 65_536,
+        flush_interval: float = 1.0,
+        max_file_bytes: int = 256 * 1024 * 1024,
+        rotate_interval: float | None = None,
+        compress: bool = False,
+        compress_level: int = 1,
+        buffers: int = 8,
+    ) -> None:
+        if chunk_rows < 1 or buffers < 2:
+            raise ValueError("chunk_rows muss mindestens 1 und buffers mindestens 2 sein.")
+        self.directory = directory
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.rotate_interval = rotate_interval
+        self.compress = compress
+        self.compress_level = compress_level
+        self.stats = ExportStats()
+        self.chunk_rows = chunk_rows
+        self._free: queue.SimpleQueue[_Buffer] = queue.SimpleQueue()
+        for _ in range(buffers - 1):
+            self._free.put(_Buffer(chunk_rows))
+        self._buffer: _Buffer | None = _Buffer(chunk_rows)
+        self._full: queue.SimpleQueue[_Buffer | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._task: asyncio.Task | None = None
+        self._file = None
+        self._file_opened = 0.0
+        self._sequence = 0
+        self.current_path: str | None = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="columnar-export", daemon=True
+            )
+            self._thread.start()
+        if self._task is None:
+            self._task = asyncio.create_task(self._tick())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def close(self) -> None:
+        """Übergibt den angefangenen Block, wartet auf den Writer und schließt die Datei.
+
+        Ohne :meth:`start` schreibt ``close`` die wartenden Blöcke selbst.
+        """
+        self.flush()
+        self._full.put(None)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self._run()
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval / 2)
+            buffer = self._buffer
+            if buffer is not None and buffer.size:
+                if time.monotonic() - buffer.started >= self.flush_interval:
+                    self.flush()
+
+    def record(self, states: Iterable[VariableStateModel]) -> None:
+        buffer = self._buffer
+        capacity = self.chunk_rows
+        stats = self.stats
+        codes = QUALITY_CODES
+        for state in states:
+            value = numeric_value(state.value)
+            if value is None:
+                stats.skipped += 1
+                continue
+            if buffer is None or buffer.size == capacity:
+                buffer = self._swap()
+                if buffer is None:
+                    stats.dropped += 1
+                    continue
+            row = buffer.size
+            if not row:
+                buffer.started = time.monotonic()
+            buffer.ids[row] = state.id
+            buffer.timestamps[row] = state.timestamp_ns
+            buffer.values[row] = value
+            code = codes.get(state.quality)
+            buffer.quality[row] = quality_to_enum(state.quality) if code is None else code
+            buffer.size = row + 1
+            stats.rows += 1
+        if buffer is not None and buffer.size and (
+            time.monotonic() - buffer.started >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Gibt den angefangenen Block sofort an den Writer."""
+        if self._buffer is not None and self._buffer.size:
+            self._swap()
+
+    def _swap(self) -> _Buffer | None:
+        if self._buffer is not None and self._buffer.size:
+            self._full.put(self._buffer)
+            self._buffer = None
+        if self._buffer is None:
+            try:
+                self._buffer = self._free.get_nowait()
+            except queue.Empty:
+                return None
+        return self._buffer
+
+    def _run(self) -> None:
+        try:
+            while True:
+                buffer = self._full.get()
+                if buffer is None:
+                    break
+                try:
+                    self._write_chunk(buffer)
+                except OSError as exc:
+                    self.stats.dropped += buffer.size
+                    print(f"Export: Block mit {buffer.size} Zeilen nicht geschrieben: {exc}")
+                buffer.size = 0
+                self._free.put(buffer)
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write_chunk(self, buffer: _Buffer) -> None:
+        columns = buffer.columns()
+        if self.compress:
+            compressor = zlib.compressobj(self.compress_level)
+            parts = [compressor.compress(column) for column in columns]
+            parts.append(compressor.flush())
+        else:
+            parts = columns
+        payload_len = sum(len(part) for part in parts)
+        crc = 0
+        for part in parts:
+            crc = zlib.crc32(part, crc)
+        handle = self._open_file(payload_len)
+        handle.write(_CHUNK.pack(buffer.size, payload_len, crc))
+        for part in parts:
+            handle.write(part)
+        handle.flush()
+        for column in columns:
+            column.release()
+        self.stats.chunks += 1
+        self.stats.bytes += _CHUNK.size + payload_len
+
+    def _open_file(self, incoming: int):
+        handle = self._file
+        if handle is not None:
+            too_big = handle.tell() + _CHUNK.size + incoming > self.max_file_bytes
+            too_old = (
+                self.rotate_interval is not None
+                and time.monotonic() - self._file_opened >= self.rotate_interval
+            )
+            if not (too_big or too_old) or handle.tell() == _HEADER.size:
+                return handle
+            handle.close()
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        self.current_path = os.path.join(
+            self.directory, f"{self.prefix}-{stamp}-{self._sequence:04d}{_SUFFIX}"
+        )
+        handle = self._file = open(self.current_path, "wb")
+        handle.write(_HEADER.pack(_MAGIC, _VERSION, _FLAG_COMPRESSED if self.compress else 0))
+        self._file_opened = time.monotonic()
+        self.stats.files += 1
+        self.stats.bytes += _HEADER.size
+        return handle
+
+
+def read_columns(path: str) -> Iterator[ColumnChunk]:
+    """Liest die Blöcke einer Exportdatei; ein unvollständiger letzter Block wird ignoriert."""
+    with open(path, "rb") as handle:
+        header = handle.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"'{path}' ist keine gültige Exportdatei.")
+        magic, version, flags = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"'{path}' ist keine gültige Exportdatei.")
+        while True:
+            head = handle.read(_CHUNK.size)
+            if len(head) < _CHUNK.size:
+                return
+            rows, payload_len, crc = _CHUNK.unpack(head)
+            payload = handle.read(payload_len)
+            if len(payload) < payload_len:
+                return
+            if zlib.crc32(payload) != crc:
+                raise ValueError(f"Beschädigter Block in '{path}'.")
+            if flags & _FLAG_COMPRESSED:
+                payload = zlib.decompress(payload)
+            ids = array("q", payload[: 8 * rows])
+            timestamps = array("q", payload[8 * rows : 16 * rows])
+            values = array("d", payload[16 * rows : 24 * rows])
+            quality = array("B", payload[24 * rows : 25 * rows])
+            yield ColumnChunk(ids, timestamps, values, quality)
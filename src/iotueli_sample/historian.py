@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+from .metrics import HistorianStats
+from .models import VariableStateModel
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS providers (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    # AUTOINCREMENT: Zeilen-IDs werden auch nach dem Leeren der Tabelle nicht
+    # wiederverwendet, das Aufräumen per ID-Grenze bleibt damit korrekt.
+    "CREATE TABLE IF NOT EXISTS samples (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " provider INTEGER NOT NULL, var_id INTEGER NOT NULL, ts INTEGER NOT NULL,"
+    " value, quality TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS samples_provider_var_ts ON samples (provider, var_id, ts)",
+)
+_INSERT = "INSERT INTO samples (provider, var_id, ts, value, quality) VALUES (?, ?, ?, ?, ?)"
+
+
+def _connect(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Mit WAL bleibt die Datenbank bei NORMAL konsistent; nur die letzten
+    # Commits vor einem Stromausfall können fehlen.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SqliteHistorian:
+    """Schreibt Consumer-Updates in eine SQLite-Datenbank (WAL).
+
+    :meth:`record` hängt die Zeilen nur an einen Puffer an und blockiert den
+    Event-Loop nicht; ein Writer-Thread schreibt sie per ``executemany`` in
+    Blöcken von ``batch_size`` und committet spätestens alle
+    ``commit_interval`` Sekunden. Über ``max_pending`` wartende Zeilen hinaus
+    wird verworfen (``stats.dropped``). Mit ``retention`` (Sekunden) löscht der
+    Writer alle ``prune_interval`` Sekunden ältere Werte – blockweise über die
+    Zeilen-ID, da Zeilen in Schreibreihenfolge liegen. Abfragen laufen über
+    eine eigene Leseverbindung parallel zum Writer.
+
+    Anbindung: ``consumer.on_change(historian.sink(provider_id))`` bzw.
+    ``multi.on_change(historian.record)``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 10_000,
+        commit_interval: float = 1.0,
+        retention: float | None = None,
+        prune_interval: float = 60.0,
+        max_pending: int = 1_000_000,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size muss mindestens 1 sein.")
+        self.path = path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.max_pending = max_pending
+        self.stats = HistorianStats()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._pending: list[tuple] = []
+        self._new_providers: list[tuple[int, str]] = []
+        self._in_flight = 0
+        self._closing = False
+        self._thread: threading.Thread | None = None
+        # (letzte Zeilen-ID, größter Zeitstempel) je Commit, nur mit ``retention``;
+        # ``_prune`` entfernt abgelaufene Einträge.
+        self._checkpoints: collections.deque[tuple[int, int]] = collections.deque()
+        self._scanned = False
+        self._reader = _connect(path, check_same_thread=False)
+        self._reader_lock = threading.Lock()
+        for statement in _SCHEMA:
+            self._reader.execute(statement)
+        self._reader.commit()
+        self._providers: dict[str, int] = dict(
+            self._reader.execute("SELECT name, id FROM providers")
+        )
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._closing = False
+            self._thread = threading.Thread(
+                target=self._run, name="sqlite-historian", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """Schreibt den Rest, beendet den Writer und schließt die Datenbank."""
+        if self._thread is not None:
+            self._closing = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        with self._reader_lock:
+            self._reader.close()
+
+    async def stop(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def _provider_key(self, provider_id: str) -> int:
+        key = self._providers.get(provider_id)
+        if key is None:
+            key = max(self._providers.values(), default=0) + 1
+            self._providers[provider_id] = key
+            with self._lock:
+                self._new_providers.append((key, provider_id))
+        return key
+
+    def sink(self, provider_id: str) -> Callable[[list[VariableStateModel]], None]:
+        """``on_change``-Callback für einen einzelnen Provider."""
+
+        def record(states: list[VariableStateModel]) -> None:
+            self.record(provider_id, states)
+
+        return record
+
+    def record(self, provider_id: str, states: Iterable[VariableStateModel]) -> None:
+        key = self._provider_key(provider_id)
+        rows = [(key, s.id, s.timestamp_ns, s.value, s.quality) for s in states]
+        with self._lock:
+            room = self.max_pending - len(self._pending)
+            if room < len(rows):
+                self.stats.dropped += len(rows) - max(room, 0)
+                rows = rows[: max(room, 0)]
+            self._pending.extend(rows)
+            pending = self.stats.pending = len(self._pending)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wartet, bis alle bisher übergebenen Zeilen committet sind."""
+        if self._thread is None:
+            return not self._pending
+        self._wake.set()
+        with self._idle:
+            return self._idle.wait_for(
+                lambda: not self._pending and not self._in_flight, timeout
+            )
+
+    def _run(self) -> None:
+        conn = _connect(self.path)
+        next_prune = time.monotonic() + self.prune_interval
+        try:
+            while True:
+                timeout = self.commit_interval
+                if self.retention is not None:
+                    timeout = min(timeout, max(0.0, next_prune - time.monotonic()))
+                self._wake.wait(timeout)
+                self._wake.clear()
+                closing = self._closing
+                with self._lock:
+                    rows, self._pending = self._pending, []
+                    providers, self._new_providers = self._new_providers, []
+                    self._in_flight = len(rows)
+                    self.stats.pending = 0
+                self._write(conn, providers, rows)
+                if self.retention is not None and time.monotonic() >= next_prune:
+                    self._prune(conn)
+                    next_prune = time.monotonic() + self.prune_interval
+                with self._idle:
+                    self._in_flight = 0
+                    self._idle.notify_all()
+                if closing and not self._pending:
+                    break
+        finally:
+            conn.close()
+
+    def _write(
+        self, conn: sqlite3.Connection, providers: list[tuple[int, str]], rows: list[tuple]
+    ) -> None:
+        if not rows and not providers:
+            return
+        try:
+            if providers:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO providers (id, name) VALUES (?, ?)", providers
+                )
+            newest = 0
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start : start + self.batch_size]
+                conn.executemany(_INSERT, batch)
+                newest = max(newest, max(row[2] for row in batch))
+                self.stats.batches += 1
+            conn.commit()
+        except sqlite3.Error as exc:
+            conn.rollback()
+            self.stats.errors += 1
+            self.stats.dropped += len(rows)
+            print(f"Historian: Schreiben von {len(rows)} Zeilen fehlgeschlagen: {exc}")
+            return
+        self.stats.commits += 1
+        self.stats.written += len(rows)
+        if rows and self.retention is not None:
+            last_id = conn.execute("SELECT max(id) FROM samples").fetchone()[0]
+            self._checkpoints.append((last_id, newest))
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        cutoff = time.time_ns() - int(self.retention * 1_000_000_000)
+        try:
+            last_id = None
+            while self._checkpoints and self._checkpoints[0][1] < cutoff:
+                last_id = self._checkpoints.popleft()[0]
+            if not self._scanned:
+                # Zeilen aus früheren Läufen haben keine Checkpoints – einmal per Scan.
+                deleted = conn.execute("DELETE FROM samples WHERE ts < ?", (cutoff,)).rowcount
+                self._scanned = True
+            elif last_id is not None:
+                deleted = conn.execute(
+                    "DELETE FROM samples WHERE id <= ?", (last_id,)
+                ).rowcount
+            else:
+                return
+            conn.commit()
+        except sqlite3.Error as exc:
+            conn.rollback()
+            self.stats.errors += 1
+            print(f"Historian: Aufräumen fehlgeschlagen: {exc}")
+            return
+        self.stats.pruned += deleted
+
+    def range(
+        self,
+        provider_id: str,
+        var_id: int,
+        start_ns: int | None = None,
+        end_ns: int | None = None,
+        limit: int | None = None,
+    ) -> list[tuple[int, Any, str]]:
+        """Gespeicherte Werte ``(timestamp_ns, value, quality)`` mit
+        ``start_ns <= t < end_ns`` (``None`` = offen), aufsteigend nach Zeit.
+        Booleans kommen als 0/1 zurück."""
+        key = self._providers.get(provider_id)
+        if key is None:
+            return []
+        sql = "SELECT ts, value, quality FROM samples WHERE provider = ? AND var_id = ?"
+        params: list = [key, var_id]
+        if start_ns is not None:
+            sql += " AND ts >= ?"
+            params.append(start_ns)
+        if end_ns is not None:
+            sql += " AND ts < ?"
+            params.append(end_ns)
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._reader_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def latest(self, provider_id: str, var_id: int) -> tuple[int, Any, str] | None:
+        key = self._providers.get(provider_id)
+        if key is None:
+            return None
+        with self._reader_lock:
+            return self._reader.execute(
+                "SELECT ts, value, quality FROM samples WHERE provider = ? AND var_id = ?"
+                " ORDER BY ts DESC LIMIT 1",
+                (key, var_id),
+            ).fetchone()
+
+    async def query_range(
+        self,
+        provider_id: str,
+        var_id: int,
+        start_ns: int | None = None,
+        end_ns: int | None = None,
+        limit: int | None = None,
+    ) -> list[tuple[int, Any, str]]:
+        """:meth:`range` in einem Executor-Thread, ohne den Event-Loop aufzuhalten."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.range, provider_id, var_id, start_ns, end_ns, limit
+        )
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import math
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable
+
+from .metrics import HistoryStats
+from .models import VariableStateModel, numeric_value
+
+try:
+    import numpy as np
+except ImportError:  # ohne numpy rechnen die Abfragen mit den C-Schleifen von min/max/fsum
+    np = None
+
+
+@dataclass
+class WindowStats:
+    count: int = 0
+    min: float | None = None
+    max: float | None = None
+    mean: float | None = None
+    stddev: float | None = None
+
+
+class SeriesBuffer:
+    """Ringpuffer fester Kapazität mit Zeit- (``int64`` ns) und Wertspalte (``float64``).
+
+    Werte werden in Zeitreihenfolge erwartet; ein älterer Zeitstempel als der
+    letzte gespeicherte wird verworfen, damit Bereichsabfragen per binärer
+    Suche arbeiten können.
+    """
+
+    __slots__ = ("capacity", "times", "values", "_start", "_count")
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity muss mindestens 1 sein.")
+        self.capacity = capacity
+        self.times = array("q", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp_ns: int, value: float) -> bool:
+        count = self._count
+        if count and timestamp_ns < self.times[(self._start + count - 1) % self.capacity]:
+            return False
+        if count < self.capacity:
+            pos = (self._start + count) % self.capacity
+            self._count = count + 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+        self.times[pos] = timestamp_ns
+        self.values[pos] = value
+        return True
+
+    def _slice(self, first: int, stop: int) -> tuple[array, array]:
+        """Logische Positionen ``[first, stop)`` als zusammenhängende Kopien."""
+        if first >= stop:
+            return array("q"), array("d")
+        begin = (self._start + first) % self.capacity
+        end = begin + (stop - first)
+        if end <= self.capacity:
+            return self.times[begin:end], self.values[begin:end]
+        end -= self.capacity
+        return self.times[begin:] + self.times[:end], self.values[begin:] + self.values[:end]
+
+    def _bisect(self, timestamp_ns: int) -> int:
+        """Erste logische Position mit Zeitstempel ``>= timestamp_ns``."""
+        lo, hi = 0, self._count
+        times, start, capacity = self.times, self._start, self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[(start + mid) % capacity] < timestamp_ns:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def last(self, n: int) -> tuple[array, array]:
+        return self._slice(max(0, self._count - n), self._count)
+
+    def range(self, start_ns: int | None = None, end_ns: int | None = None) -> tuple[array, array]:
+        """Punkte mit ``start_ns <= t < end_ns``; ``None`` = offen."""
+        first = 0 if start_ns is None else self._bisect(start_ns)
+        stop = self._count if end_ns is None else self._bisect(end_ns)
+        return self._slice(first, stop)
+
+
+def window_stats(values: array) -> WindowStats:
+    count = len(values)
+    if not count:
+        return WindowStats()
+    if np is not None:
+        column = np.frombuffer(values, dtype=np.float64)
+        return WindowStats(
+            count,
+            float(column.min()),
+            float(column.max()),
+            float(column.mean()),
+            float(column.std()),
+        )
+    mean = math.fsum(values) / count
+    variance = math.fsum((v - mean) * (v - mean) for v in values) / count
+    return WindowStats(count, min(values), max(values), mean, math.sqrt(variance))
+
+
+class HistoryStore:
+    """Verlauf numerischer Variablen (Booleans als 0/1) für Trends und Alarme.
+
+    Pro Variable ein :class:`SeriesBuffer` mit ``capacity_per_variable``
+    Punkten; insgesamt höchstens ``max_points`` reservierte Punkte. Reicht
+    der Platz für eine neue Variable nicht, wird die am längsten nicht
+    abgefragte Reihe verworfen. Eine verdrängte Variable legt ``record`` erst
+    wieder an, nachdem sie abgefragt wurde (``stats.rejected``) – sonst
+    verdrängten sich bei mehr Variablen als Platz alle Reihen reihum.
+    Anbindung: ``consumer.on_change(history.record)``.
+    """
+
+    def __init__(self, capacity_per_variable: int = 1024, max_points: int = 1_000_000) -> None:
+        if capacity_per_variable > max_points:
+            raise ValueError("max_points muss mindestens capacity_per_variable betragen.")
+        self.capacity_per_variable = capacity_per_variable
+        self.max_points = max_points
+        self.stats = HistoryStats()
+        # Reihenfolge = zuletzt abgefragt (bzw. angelegt) am Ende.
+        self._series: OrderedDict[int, SeriesBuffer] = OrderedDict()
+        self._evicted: set[int] = set()
+
+    def __contains__(self, var_id: int) -> bool:
+        return var_id in self._series
+
+    def record(self, states: Iterable[VariableStateModel]) -> None:
+        series = self._series
+        stats = self.stats
+        for state in states:
+            value = numeric_value(state.value)
+            if value is None:
+                stats.skipped += 1
+                continue
+            buffer = series.get(state.id)
+            if buffer is None:
+                if state.id in self._evicted:
+                    stats.rejected += 1
+                    continue
+                buffer = self._create(state.id)
+            if buffer.append(state.timestamp_ns, value):
+                stats.appended += 1
+            else:
+                stats.skipped += 1
+
+    def _create(self, var_id: int) -> SeriesBuffer:
+        capacity = self.capacity_per_variable
+        while (len(self._series) + 1) * capacity > self.max_points:
+            evicted, _ = self._series.popitem(last=False)
+            self._evicted.add(evicted)
+            self.stats.evicted_series += 1
+        buffer = SeriesBuffer(capacity)
+        self._series[var_id] = buffer
+        self.stats.series = len(self._series)
+        self.stats.points = len(self._series) * capacity
+        return buffer
+
+    def _touch(self, var_id: int) -> SeriesBuffer | None:
+        buffer = self._series.get(var_id)
+        if buffer is not None:
+            self._series.move_to_end(var_id)
+        else:
+            # Wer abfragt, will den Verlauf: beim nächsten Wert wieder anlegen.
+            self._evicted.discard(var_id)
+        return buffer
+
+    def last(self, var_id: int, n: int) -> tuple[array, array]:
+        """Die letzten ``n`` Punkte als (Zeitstempel, Werte)."""
+        buffer = self._touch(var_id)
+        return buffer.last(n) if buffer else (array("q"), array("d"))
+
+    def range(
+        self, var_id: int, start_ns: int | None = None, end_ns: int | None = None
+    ) -> tuple[array, array]:
+        buffer = self._touch(var_id)
+        return buffer.range(start_ns, end_ns) if buffer else (array("q"), array("d"))
+
+    def window_stats(
+        self, var_id: int, start_ns: int | None = None, end_ns: int | None = None
+    ) -> WindowStats:
+        """min/max/mean/stddev (Populationsstandardabweichung) im Zeitfenster."""
+        return window_stats(self.range(var_id, start_ns, end_ns)[1])
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import zlib
+
+from .metrics import JournalStats
+
+_MAGIC = b"IOTUJRNL"
+_VERSION = 1
+# magic, version, reserved, capacity, head, tail, count, dropped
+_HEADER = struct.Struct("<8sIIQQQQQ")
+_DATA_OFFSET = 64
+# payload_len, crc32, subject_len
+_RECORD = struct.Struct("<IIH")
+_WRAP = 0xFFFF
+
+
+class StoreAndForwardJournal:
+    """Ringpuffer in einer mmap-Datei für Events während einer Verbindungsunterbrechung.
+
+    Datensätze (Subject + kodierte Payload) werden in Schreibreihenfolge
+    abgelegt und bleiben über einen Neustart des Prozesses erhalten. Ist der
+    Puffer voll, wird der älteste Datensatz verworfen und in ``dropped``
+    gezählt. Alle ``flush_every`` Änderungen (``append``, ``pop``,
+    ``drop_oldest``) wird per ``msync`` der Bereich vom Kopf bis zum Ende der
+    seitdem geschriebenen Daten gesichert, nicht die ganze Abbildung; ein
+    einziger Aufruf ist dabei billiger als getrennte für Kopf und Datensatz.
+    Nach einem Absturz können daher bis zu ``flush_every - 1`` bereits
+    bestätigte Datensätze erneut nachgesendet werden (at-least-once).
+    """
+
+    def __init__(self, path: str, capacity: int = 64 * 1024 * 1024, flush_every: int = 1) -> None:
+        self.path = path
+        self.flush_every = flush_every
+        self.stats = JournalStats()
+        self._unflushed = 0
+        # Ende des am weitesten hinten seit dem letzten flush beschriebenen Bereichs.
+        self._dirty_end = 0
+
+        exists = os.path.exists(path) and os.path.getsize(path) >= _DATA_OFFSET
+        self._file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            capacity = self._read_capacity()
+        else:
+            self._file.truncate(_DATA_OFFSET + capacity)
+        self.capacity = capacity
+        self._mm = mmap.mmap(self._file.fileno(), _DATA_OFFSET + capacity)
+
+        if exists:
+            magic, version, _, _, head, tail, count, dropped = _HEADER.unpack_from(self._mm, 0)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"'{path}' ist keine gültige Journal-Datei.")
+            self._head, self._tail, self._count = head, tail, count
+            self.stats.dropped = dropped
+        else:
+            self._head = self._tail = self._count = 0
+            self._write_header()
+        self.stats.pending = self._count
+
+    def _read_capacity(self) -> int:
+        self._file.seek(0)
+        magic, version, _, capacity, *_ = _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"'{self.path}' ist keine gültige Journal-Datei.")
+        return capacity
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _write_header(self) -> None:
+        _HEADER.pack_into(
+            self._mm,
+            0,
+            _MAGIC,
+            _VERSION,
+            0,
+            self.capacity,
+            self._head,
+            self._tail,
+            self._count,
+            self.stats.dropped,
+        )
+        self.stats.pending = self._count
+
+    def append(self, subject: str, payload: bytes) -> None:
+        subject_bytes = subject.encode("utf-8")
+        size = _RECORD.size + len(subject_bytes) + len(payload)
+        if size > self.capacity // 2:
+            raise ValueError(f"Nachricht ({size} Bytes) ist zu groß für das Journal.")
+        if self._count == 0:
+            self._head = self._tail = 0
+
+        while True:
+            remaining = self.capacity - self._head % self.capacity
+            pad = remaining if remaining < size else 0
+            if self._head - self._tail + pad + size <= self.capacity:
+                break
+            self._discard_oldest()
+            self.stats.dropped += 1
+
+        if pad:
+            if pad >= _RECORD.size:
+                pos = _DATA_OFFSET + self._head % self.capacity
+                _RECORD.pack_into(self._mm, pos, 0, 0, _WRAP)
+                self._dirty_end = max(self._dirty_end, pos + _RECORD.size)
+            self._head += pad
+
+        pos = _DATA_OFFSET + self._head % self.capacity
+        self._dirty_end = max(self._dirty_end, pos + size)
+        crc = zlib.crc32(payload, zlib.crc32(subject_bytes))
+        _RECORD.pack_into(self._mm, pos, len(payload), crc, len(subject_bytes))
+        pos += _RECORD.size
+        self._mm[pos : pos + len(subject_bytes)] = subject_bytes
+        pos += len(subject_bytes)
+        self._mm[pos : pos + len(payload)] = payload
+        self._head += size
+        self._count += 1
+        self.stats.appended += 1
+        self._write_header()
+        self._changed()
+
+    def _changed(self) -> None:
+        self._unflushed += 1
+        if self.flush_every and self._unflushed >= self.flush_every:
+            self.flush()
+
+    def _skip_padding(self) -> None:
+        remaining = self.capacity - self._tail % self.capacity
+        if remaining < _RECORD.size:
+            self._tail += remaining
+            return
+        _, _, subject_len = _RECORD.unpack_from(self._mm, _DATA_OFFSET + self._tail % self.capacity)
+        if subject_len == _WRAP:
+            self._tail += remaining
+
+    def _read_oldest(self) -> tuple[str, bytes, int]:
+        self._skip_padding()
+        pos = _DATA_OFFSET + self._tail % self.capacity
+        payload_len, crc, subject_len = _RECORD.unpack_from(self._mm, pos)
+        pos += _RECORD.size
+        subject_bytes = bytes(self._mm[pos : pos + subject_len])
+        pos += subject_len
+        payload = bytes(self._mm[pos : pos + payload_len])
+        if zlib.crc32(payload, zlib.crc32(subject_bytes)) != crc:
+            raise ValueError(f"Beschädigter Datensatz im Journal '{self.path}'.")
+        return subject_bytes.decode("utf-8"), payload, _RECORD.size + subject_len + payload_len
+
+    def _discard_oldest(self) -> None:
+        _, _, size = self._read_oldest()
+        self._tail += size
+        self._count -= 1
+
+    def peek(self) -> tuple[str, bytes] | None:
+        if not self._count:
+            return None
+        try:
+            subject, payload, _ = self._read_oldest()
+        except ValueError:
+            # Ein beschädigter Rest (z. B. nach einem Absturz mitten im msync)
+            # lässt sich nicht mehr sicher zerlegen.
+            self.stats.dropped += self._count
+            self._head = self._tail = self._count = 0
+            self._write_header()
+            return None
+        return subject, payload
+
+    def pop(self) -> None:
+        if not self._count:
+            return
+        self._discard_oldest()
+        self.stats.replayed += 1
+        self._write_header()
+        self._changed()
+
+    def drop_oldest(self) -> None:
+        """Verwirft den ältesten Datensatz, ohne ihn als nachgesendet zu zählen."""
+        if not self._count:
+            return
+        self._discard_oldest()
+        self.stats.dropped += 1
+        self._write_header()
+        self._changed()
+
+    def flush(self) -> None:
+        self._mm.flush(0, max(self._dirty_end, _HEADER.size))
+        self._dirty_end = 0
+        self._unflushed = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._mm.close()
+        self._file.close()
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .subjects import subject_matches
+
+_CRLF = b"\r\n"
+_NO_RESPONDERS = b"NATS/1.0 503\r\n\r\n"
+MAX_PAYLOAD = 8 * 1024 * 1024
+MAX_PENDING_BYTES = 64 * 1024 * 1024
+ROUTE_CACHE_SIZE = 4096
+# Antwort-Subjects sind Einweg-Subjects, ein Cache-Eintrag würde nie wieder getroffen.
+_INBOX_PREFIX = "_INBOX."
+
+
+@dataclass
+class ServerStats:
+    connections: int = 0
+    msgs_in: int = 0
+    msgs_out: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    slow_consumers: int = 0
+
+
+class _Subscription:
+    __slots__ = ("client", "subject", "queue", "sid", "max_msgs", "delivered")
+
+    def __init__(self, client: "_Client", subject: str, queue: str | None, sid: str) -> None:
+        self.client = client
+        self.subject = subject
+        self.queue = queue
+        self.sid = sid
+        self.max_msgs = 0
+        self.delivered = 0
+
+
+class _Client:
+    def __init__(self, cid: int, writer: asyncio.StreamWriter) -> None:
+        self.cid = cid
+        self.writer = writer
+        self.subscriptions: dict[str, _Subscription] = {}
+        self.headers = False
+        self.no_responders = False
+        self.closed = False
+
+    def send(self, data: bytes) -> bool:
+        if self.closed:
+            return False
+        if self.writer.transport.get_write_buffer_size() > MAX_PENDING_BYTES:
+            return False
+        self.writer.write(data)
+        return True
+
+
+class LocalNatsServer:
+    """Minimaler NATS-Server für Benchmarks und Tests über echte Sockets.
+
+    Unterstützt die Teilmenge des Client-Protokolls, die nats-py hier nutzt:
+    INFO/CONNECT (optional mit Token), PUB/HPUB, SUB/UNSUB, MSG/HMSG,
+    PING/PONG, Wildcards und Queue-Groups sowie "no responders" für Requests.
+    Kein Clustering, kein JetStream, keine Persistenz.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 4222, token: str | None = None) -> None:
+        self.host = host
+        self.port = port
+        self.token = token
+        self.stats = ServerStats()
+        self._server: asyncio.AbstractServer | None = None
+        self._clients: dict[int, _Client] = {}
+        self._handlers: set[asyncio.Task] = set()
+        self._subscriptions: list[_Subscription] = []
+        self._route_cache: OrderedDict[str, list[_Subscription]] = OrderedDict()
+        self._cids = itertools.count(1)
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # Bei Port 0 vergibt das Betriebssystem einen freien Port.
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            for client in list(self._clients.values()):
+                client.writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "LocalNatsServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def _info(self, cid: int) -> bytes:
+        info = {
+            "server_id": "iotueli-local",
+            "server_name": "iotueli-local",
+            "version": "2.10.0",
+            "proto": 1,
+            "host": self.host,
+            "port": self.port,
+            "headers": True,
+            "max_payload": MAX_PAYLOAD,
+            "client_id": cid,
+            "auth_required": bool(self.token),
+        }
+        return b"INFO " + json.dumps(info).encode() + _CRLF
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        client = _Client(next(self._cids), writer)
+        self._clients[client.cid] = client
+        self.stats.connections += 1
+        writer.write(self._info(client.cid))
+        try:
+            await self._read_loop(client, reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._drop_client(client)
+            self._handlers.discard(task)
+
+    async def _read_loop(self, client: _Client, reader: asyncio.StreamReader) -> None:
+        connected = False
+        while True:
+            line = (await reader.readuntil(_CRLF))[:-2]
+            op, _, args = line.partition(b" ")
+            op = op.upper()
+            if not connected and op != b"CONNECT":
+                await self._error(client, "Authorization Violation")
+                return
+
+            if op == b"PUB" or op == b"HPUB":
+                parts = args.split()
+                total = int(parts[-1])
+                if total > MAX_PAYLOAD:
+                    await self._error(client, "Maximum Payload Violation")
+                    return
+                data = (await reader.readexactly(total + 2))[:-2]
+                if op == b"PUB":
+                    subject, reply = parts[0], parts[1] if len(parts) == 3 else b""
+                    self._route(client, subject, reply, None, data)
+                else:
+                    subject, reply = parts[0], parts[1] if len(parts) == 4 else b""
+                    header_len = int(parts[-2])
+                    self._route(client, subject, reply, data[:header_len], data[header_len:])
+            elif op == b"SUB":
+                parts = args.decode().split()
+                queue = parts[1] if len(parts) == 3 else None
+                self._subscribe(client, parts[0], queue, parts[-1])
+            elif op == b"UNSUB":
+                parts = args.decode().split()
+                self._unsubscribe(client, parts[0], int(parts[1]) if len(parts) > 1 else 0)
+            elif op == b"PING":
+                client.send(b"PONG" + _CRLF)
+            elif op == b"PONG":
+                pass
+            elif op == b"CONNECT":
+                options = json.loads(args or b"{}")
+                if self.token and options.get("auth_token") != self.token:
+                    await self._error(client, "Authorization Violation")
+                    return
+                client.headers = bool(options.get("headers"))
+                client.no_responders = bool(options.get("no_responders"))
+                connected = True
+            else:
+                await self._error(client, "Unknown Protocol Operation")
+                return
+            await client.writer.drain()
+
+    async def _error(self, client: _Client, text: str) -> None:
+        client.writer.write(f"-ERR '{text}'".encode() + _CRLF)
+        await client.writer.drain()
+
+    def _drop_client(self, client: _Client) -> None:
+        client.closed = True
+        self._clients.pop(client.cid, None)
+        for sub in client.subscriptions.values():
+            self._remove(sub)
+        client.subscriptions.clear()
+        client.writer.close()
+
+    def _subscribe(self, client: _Client, subject: str, queue: str | None, sid: str) -> None:
+        sub = _Subscription(client, subject, queue, sid)
+        client.subscriptions[sid] = sub
+        self._subscriptions.append(sub)
+        self._route_cache.clear()
+
+    def _unsubscribe(self, client: _Client, sid: str, max_msgs: int) -> None:
+        sub = client.subscriptions.get(sid)
+        if sub is None:
+            return
+        if max_msgs and sub.delivered < max_msgs:
+            sub.max_msgs = max_msgs
+            return
+        del client.subscriptions[sid]
+        self._remove(sub)
+
+    def _remove(self, sub: _Subscription) -> None:
+        if sub in self._subscriptions:
+            self._subscriptions.remove(sub)
+            self._route_cache.clear()
+
+    def _matching(self, subject: str) -> list[_Subscription]:
+        cache = self._route_cache
+        routes = cache.get(subject)
+        if routes is not None:
+            cache.move_to_end(subject)
+            return routes
+        routes = [s for s in self._subscriptions if subject_matches(s.subject, subject)]
+        if not subject.startswith(_INBOX_PREFIX):
+            cache[subject] = routes
+            if len(cache) > ROUTE_CACHE_SIZE:
+                cache.popitem(last=False)
+        return routes
+
+    def _route(
+        self,
+        sender: _Client,
+        subject: bytes,
+        reply: bytes,
+        headers: bytes | None,
+        payload: bytes,
+    ) -> None:
+        self.stats.msgs_in += 1
+        self.stats.bytes_in += len(payload)
+        targets: list[_Subscription] = []
+        groups: dict[str, list[_Subscription]] = {}
+        for sub in self._matching(subject.decode()):
+            if sub.queue:
+                groups.setdefault(sub.queue, []).append(sub)
+            else:
+                targets.append(sub)
+        targets.extend(random.choice(members) for members in groups.values())
+
+        if not targets and reply and sender.no_responders and sender.headers:
+            reply_subs = [
+                s for s in self._matching(reply.decode()) if s.client is sender
+            ]
+            for sub in reply_subs:
+                self._deliver(sub, reply, b"", _NO_RESPONDERS, b"")
+            return
+
+        for sub in targets:
+            self._deliver(sub, subject, reply, headers, payload)
+
+    def _deliver(
+        self,
+        sub: _Subscription,
+        subject: bytes,
+        reply: bytes,
+        headers: bytes | None,
+        payload: bytes,
+    ) -> None:
+        sid = sub.sid.encode()
+        reply_part = b" " + reply if reply else b""
+        if headers is not None and sub.client.headers:
+            head = b"HMSG %s %s%s %d %d\r\n" % (
+                subject,
+                sid,
+                reply_part,
+                len(headers),
+                len(headers) + len(payload),
+            )
+            frame = head + headers + payload + _CRLF
+        else:
+            frame = b"MSG %s %s%s %d\r\n" % (subject, sid, reply_part, len(payload)) + payload + _CRLF
+        if not sub.client.send(frame):
+            self.stats.slow_consumers += 1
+            return
+        self.stats.msgs_out += 1
+        self.stats.bytes_out += len(payload)
+        sub.delivered += 1
+        if sub.max_msgs and sub.delivered >= sub.max_msgs:
+            sub.client.subscriptions.pop(sub.sid, None)
+            self._remove(sub)
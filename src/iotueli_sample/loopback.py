@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from nats.errors import NoRespondersError, TimeoutError as NatsTimeoutError
+
+from .nats_client import NatsConnection
+from .subjects import subject_matches
+
+
+@dataclass
+class LoopbackMsg:
+    subject: str
+    reply: str
+    data: bytes
+    _connection: "LoopbackConnection | None" = field(default=None, repr=False)
+
+    async def respond(self, data: bytes) -> None:
+        if not self.reply or self._connection is None:
+            raise ValueError("Nachricht hat kein Reply-Subject.")
+        await self._connection.publish(self.reply, data)
+
+
+class LoopbackSubscription:
+    """Subscription mit eigener Warteschlange und eigenem Zustell-Task – wie in nats-py."""
+
+    def __init__(
+        self,
+        connection: "LoopbackConnection",
+        subject: str,
+        queue: str | None,
+        callback: Callable[[LoopbackMsg], Awaitable[None]] | None,
+    ) -> None:
+        self.subject = subject
+        self.queue = queue
+        self._connection = connection
+        self._callback = callback
+        self._pending: asyncio.Queue[LoopbackMsg] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        if callback is not None:
+            self._task = asyncio.create_task(self._deliver())
+
+    @property
+    def pending_msgs(self) -> int:
+        return self._pending.qsize()
+
+    def _enqueue(self, msg: LoopbackMsg) -> None:
+        self._pending.put_nowait(msg)
+
+    async def _deliver(self) -> None:
+        while True:
+            msg = await self._pending.get()
+            try:
+                await self._callback(msg)
+            except Exception as exc:  # wie nats-py: Fehler im Handler beenden die Subscription nicht
+                print(f"Fehler im Loopback-Handler für '{self.subject}': {exc!r}")
+
+    async def next_msg(self, timeout: float | None = 1.0) -> LoopbackMsg:
+        try:
+            return await asyncio.wait_for(self._pending.get(), timeout)
+        except asyncio.TimeoutError:
+            raise NatsTimeoutError from None
+
+    async def unsubscribe(self) -> None:
+        self._connection.broker._remove(self)
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class LoopbackBroker:
+    """In-Process-Ersatz für den NATS-Server: Subject-Routing inkl. Wildcards und Queue-Groups."""
+
+    def __init__(self) -> None:
+        self._subscriptions: list[LoopbackSubscription] = []
+        self._route_cache: dict[str, list[LoopbackSubscription]] = {}
+        self.messages = 0
+        self.bytes = 0
+
+    def _add(self, subscription: LoopbackSubscription) -> None:
+        self._subscriptions.append(subscription)
+        self._route_cache.clear()
+
+    def _remove(self, subscription: LoopbackSubscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            self._route_cache.clear()
+
+    def _route(self, subject: str) -> list[LoopbackSubscription]:
+        routes = self._route_cache.get(subject)
+        if routes is None:
+            routes = [s for s in self._subscriptions if subject_matches(s.subject, subject)]
+            self._route_cache[subject] = routes
+        return routes
+
+    def has_interest(self, subject: str) -> bool:
+        return any(s._connection.is_connected for s in self._route(subject))
+
+    def deliver(self, subject: str, data: bytes, reply: str = "") -> None:
+        self.messages += 1
+        self.bytes += len(data)
+        groups: dict[str, list[LoopbackSubscription]] = {}
+        for subscription in self._route(subject):
+            if not subscription._connection.is_connected:
+                continue
+            if subscription.queue:
+                groups.setdefault(subscription.queue, []).append(subscription)
+                continue
+            subscription._enqueue(LoopbackMsg(subject, reply, data, subscription._connection))
+        for members in groups.values():
+            member = random.choice(members)
+            member._enqueue(LoopbackMsg(subject, reply, data, member._connection))
+
+
+class LoopbackConnection(NatsConnection):
+    """Verbindung zu einem :class:`LoopbackBroker` mit derselben Oberfläche wie
+    :class:`NatsConnection` – für Tests und Benchmarks ganz ohne Sockets.
+
+    ``simulate_disconnect``/``simulate_reconnect`` lösen dieselben Callbacks
+    aus wie ein echter Verbindungsabbruch. Dazwischen wartet :meth:`connect`
+    auf den Reconnect, Subscriptions werden wie in nats-py trotzdem angelegt.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, broker: LoopbackBroker, client_name: str = "loopback") -> None:
+        super().__init__(host="loopback", port=0, client_name=client_name, token="")
+        self.broker = broker
+        self._connected_flag = False
+        self._interrupted = False
+        self._subscriptions: list[LoopbackSubscription] = []
+        self._buffered: list[tuple[str, bytes, str]] = []
+        self._inbox_prefix = f"_INBOX.{client_name}.{next(self._ids)}"
+        self._inbox_seq = itertools.count()
+
+    @property
+    def client(self):
+        raise RuntimeError("Loopback-Verbindung hat keinen nats-py-Client.")
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected_flag
+
+    async def connect(self) -> None:
+        if self._connected_flag:
+            return
+        if self._interrupted:
+            # Simulierter Abbruch: erst simulate_reconnect stellt die Verbindung
+            # wieder her (inkl. Nachsenden und Callbacks).
+            await self._connected.wait()
+            return
+        self._connected_flag = True
+        self._connected.set()
+
+    async def close(self) -> None:
+        self._connected_flag = False
+        self._interrupted = False
+        self._connected.clear()
+        for subscription in list(self._subscriptions):
+            await subscription.unsubscribe()
+        self._subscriptions.clear()
+
+    async def simulate_disconnect(self) -> None:
+        if not self._connected_flag:
+            return
+        self._connected_flag = False
+        self._interrupted = True
+        await self._handle_disconnected()
+
+    async def simulate_reconnect(self) -> None:
+        if self._connected_flag:
+            return
+        self._connected_flag = True
+        self._interrupted = False
+        buffered, self._buffered = self._buffered, []
+        for subject, payload, reply in buffered:
+            self.broker.deliver(subject, payload, reply)
+        await self._handle_reconnected()
+
+    async def subscribe(
+        self,
+        subject: str,
+        queue: str | None = None,
+        callback: Callable[[LoopbackMsg], Awaitable[None]] | None = None,
+    ) -> LoopbackSubscription:
+        if not self._interrupted:
+            await self.connect()
+        wrapped = None
+        if callback:
+            async def wrapped(msg: LoopbackMsg) -> None:
+                result = callback(msg)
+                if asyncio.iscoroutine(result):
+                    await result
+
+        subscription = LoopbackSubscription(self, subject, queue, wrapped)
+        self._subscriptions.append(subscription)
+        self.broker._add(subscription)
+        return subscription
+
+    async def publish(self, subject: str, payload: bytes, reply_to: str | None = None) -> None:
+        if not self._connected_flag:
+            # nats-py puffert während eines Reconnects ebenfalls.
+            self._buffered.append((subject, payload, reply_to or ""))
+            return
+        self.broker.deliver(subject, payload, reply_to or "")
+
+    async def request(self, subject: str, payload: bytes, timeout: float = 2.0) -> LoopbackMsg:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            await asyncio.wait_for(self.connect(), timeout)
+        except asyncio.TimeoutError:
+            raise NatsTimeoutError from None
+        if not self.broker.has_interest(subject):
+            raise NoRespondersError
+        inbox = f"{self._inbox_prefix}.{next(self._inbox_seq)}"
+        subscription = await self.subscribe(inbox)
+        try:
+            self.broker.deliver(subject, payload, inbox)
+            return await subscription.next_msg(max(0.0, deadline - loop.time()))
+        finally:
+            await subscription.unsubscribe()
+            # close() kann die Liste inzwischen geleert haben.
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    async def flush(self, timeout: float = 1.0) -> None:
+        await asyncio.sleep(0)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class EncodeStats:
+    inline_count: int = 0
+    offloaded_count: int = 0
+    inline_seconds: float = 0.0
+    max_inline_seconds: float = 0.0
+    offloaded_seconds: float = 0.0
+
+    def record_inline(self, seconds: float) -> None:
+        self.inline_count += 1
+        self.inline_seconds += seconds
+        self.max_inline_seconds = max(self.max_inline_seconds, seconds)
+
+    def record_offloaded(self, seconds: float) -> None:
+        self.offloaded_count += 1
+        self.offloaded_seconds += seconds
+
+
+@dataclass
+class PublishQueueStats:
+    depth: int = 0
+    max_depth: int = 0
+    enqueued: int = 0
+    published: int = 0
+    dropped: int = 0
+    conflated: int = 0
+    high_water_events: int = 0
+    send_errors: int = 0
+
+
+@dataclass
+class SubscriberStats:
+    depth: int = 0
+    max_depth: int = 0
+    enqueued: int = 0
+    delivered: int = 0
+    dropped: int = 0
+    conflated: int = 0
+    errors: int = 0
+    last_lag_seconds: float = 0.0
+    max_lag_seconds: float = 0.0
+
+    def record_lag(self, seconds: float) -> None:
+        self.last_lag_seconds = seconds
+        self.max_lag_seconds = max(self.max_lag_seconds, seconds)
+
+
+@dataclass
+class DefinitionCacheStats:
+    hits: int = 0
+    fetches: int = 0
+    invalidations: int = 0
+    mismatches: int = 0
+
+
+@dataclass
+class MultiConsumerStats:
+    providers: int = 0
+    events: int = 0
+    ignored: int = 0
+    snapshots: int = 0
+
+
+@dataclass
+class HistoryStats:
+    series: int = 0
+    points: int = 0
+    appended: int = 0
+    skipped: int = 0
+    evicted_series: int = 0
+    rejected: int = 0
+
+
+@dataclass
+class AggregationStats:
+    variables: int = 0
+    updates: int = 0
+    late: int = 0
+    skipped: int = 0
+    windows: int = 0
+
+
+@dataclass
+class HistorianStats:
+    pending: int = 0
+    written: int = 0
+    dropped: int = 0
+    batches: int = 0
+    commits: int = 0
+    pruned: int = 0
+    errors: int = 0
+
+
+@dataclass
+class ExportStats:
+    rows: int = 0
+    chunks: int = 0
+    files: int = 0
+    bytes: int = 0
+    dropped: int = 0
+    skipped: int = 0
+
+
+@dataclass
+class FanoutStats:
+    variables: int = 0
+    batches: int = 0
+    written: int = 0
+    skipped: int = 0
+
+
+@dataclass
+class JournalStats:
+    pending: int = 0
+    appended: int = 0
+    replayed: int = 0
+    dropped: int = 0
+
+
+@dataclass
+class ResyncStats:
+    disconnects: int = 0
+    reconnects: int = 0
+    resyncs: int = 0
+    failed_resyncs: int = 0
+    last_time_to_consistent: float = 0.0
+    max_time_to_consistent: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.resyncs += 1
+        self.last_time_to_consistent = seconds
+        self.max_time_to_consistent = max(self.max_time_to_consistent, seconds)
+
+
+@dataclass
+class LoopBlockingStats:
+    samples: int = 0
+    blocked_count: int = 0
+    total_blocked_seconds: float = 0.0
+    max_blocked_seconds: float = 0.0
+
+
+class LoopBlockingMonitor:
+    """Misst, wie lange die Event-Loop blockiert war.
+
+    Ein Hintergrund-Task schläft ``interval`` Sekunden; jede Verspätung über
+    ``threshold`` zählt als Blockadezeit der Loop.
+    """
+
+    def __init__(self, interval: float = 0.01, threshold: float = 0.005) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.stats = LoopBlockingStats()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def reset(self) -> None:
+        self.stats = LoopBlockingStats()
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - started - self.interval
+            stats = self.stats
+            stats.samples += 1
+            if lag > self.threshold:
+                stats.blocked_count += 1
+                stats.total_blocked_seconds += lag
+                stats.max_blocked_seconds = max(stats.max_blocked_seconds, lag)
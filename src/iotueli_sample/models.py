@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 from typing import Any
 
@@ -17,6 +17,30 @@ class VariableAccess(str, Enum):
     READ_WRITE = "read-write"
 
 
+class OverflowPolicy(str, Enum):
+    CONFLATE = "conflate"
+    DROP_OLDEST = "drop-oldest"
+    BLOCK = "block"
+
+
+class AggregateFunction(str, Enum):
+    MIN = "min"
+    MAX = "max"
+    MEAN = "mean"
+    FIRST = "first"
+    LAST = "last"
+    COUNT = "count"
+    TIME_WEIGHTED_AVERAGE = "twa"
+
+
+class WaveformProfile(str, Enum):
+    SINE = "sine"
+    RAMP = "ramp"
+    RANDOM_WALK = "random-walk"
+    STEP = "step"
+    CONSTANT = "constant"
+
+
 @dataclass
 class VariableDefinitionModel:
     id: int
@@ -26,6 +50,21 @@ class VariableDefinitionModel:
     experimental: bool = False
 
 
+def definition_to_dict(var: VariableDefinitionModel) -> dict[str, Any]:
+    """JSON-taugliche Form einer Definition (Enums als Wert)."""
+    return {**asdict(var), "data_type": var.data_type.value, "access": var.access.value}
+
+
+def definition_from_dict(data: dict[str, Any]) -> VariableDefinitionModel:
+    return VariableDefinitionModel(
+        id=data["id"],
+        key=data["key"],
+        data_type=VariableType(data["data_type"]),
+        access=VariableAccess(data["access"]),
+        experimental=data.get("experimental", False),
+    )
+
+
 @dataclass
 class VariableStateModel:
     id: int
@@ -34,6 +73,27 @@ class VariableStateModel:
     timestamp_ns: int = field(default=0)
 
 
+def numeric_value(value: Any) -> float | None:
+    """Wert als ``float`` (Booleans als 0/1); ``None`` für Strings und fehlende Werte."""
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+@dataclass
+class Waveform:
+    """Signalverlauf einer simulierten Variable; ``period`` in Ticks."""
+
+    profile: WaveformProfile = WaveformProfile.SINE
+    amplitude: float = 5.0
+    offset: float = 20.0
+    period: float = 30.0
+    # Standardabweichung eines Schritts beim Random Walk.
+    step: float = 1.0
+
+
 @dataclass
 class ConnectionSettings:
     host: str
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import functools
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Union
+
+from nats.aio.msg import Msg
+
+from .auth import request_token
+from .consumer_app import ConsumerApp, ConsumerRuntime
+from .dispatch import ChangeStream
+from .metrics import MultiConsumerStats
+from .models import VariableStateModel
+from .nats_client import NatsConnection
+from .subjects import (
+    all_registry_provider_events,
+    all_vars_changed_events,
+    provider_id_from_registry_event,
+    provider_id_from_vars_event,
+)
+
+ProviderChangeCallback = Callable[
+    [str, list[VariableStateModel]], Union[None, Awaitable[None]]
+]
+
+
+class MultiProviderConsumer:
+    """Ein Consumer für beliebig viele Provider über eine einzige Subscription.
+
+    Abonniert ``v1.loc.*.vars.evt.changed`` und leitet jedes Event anhand der
+    Provider-ID im Subject an einen eigenen :class:`ConsumerApp`-Zustand weiter
+    (Zustände, Interessenmenge, Definition aus dem ``definition_cache`` der
+    Runtime). Die ``provider_id`` in ``runtime.settings`` dient nur als Vorlage.
+    Neu entdeckte Provider werden per Snapshot vervollständigt, nach einem
+    Reconnect alle erneut – höchstens ``max_concurrent_snapshots`` gleichzeitig.
+    Callbacks erhalten ``(provider_id, states)``.
+    """
+
+    def __init__(
+        self,
+        runtime: ConsumerRuntime,
+        connection: NatsConnection | None = None,
+        providers: Iterable[str] | None = None,
+        snapshot_on_discovery: bool = True,
+        max_concurrent_snapshots: int = 16,
+    ) -> None:
+        self.runtime = runtime
+        self._connection = connection
+        self._nats: NatsConnection | None = None
+        self.allowed = set(providers) if providers is not None else None
+        self.snapshot_on_discovery = snapshot_on_discovery
+        self.stats = MultiConsumerStats()
+        self._apps: dict[str, ConsumerApp] = {}
+        self._callbacks: list[tuple[ProviderChangeCallback, dict]] = []
+        self._snapshot_slots = asyncio.Semaphore(max_concurrent_snapshots)
+        self._tasks: set[asyncio.Task] = set()
+        self._streams: list[
+            tuple[dict[str, tuple[ChangeStream, asyncio.Task]], asyncio.Queue, tuple]
+        ] = []
+
+    @property
+    def provider_ids(self) -> list[str]:
+        return sorted(self._apps)
+
+    def provider(self, provider_id: str) -> ConsumerApp | None:
+        return self._apps.get(provider_id)
+
+    def on_change(self, cb: ProviderChangeCallback, **options) -> None:
+        """Registriert einen Callback für alle Provider; ``options`` wie bei
+        :meth:`ConsumerApp.on_change` (``queue_size``, ``policy``)."""
+        self._callbacks.append((cb, options))
+        for provider_id, app in self._apps.items():
+            app.on_change(functools.partial(cb, provider_id), **options)
+
+    async def changes(
+        self,
+        ids: Iterable[int] | None = None,
+        max_batch: int = 1000,
+        max_latency: float = 0.05,
+    ) -> AsyncIterator[tuple[str, list[VariableStateModel]]]:
+        """:meth:`ConsumerApp.changes` über alle Provider: liefert ``(provider_id, batch)``.
+
+        Pro Provider puffert ein eigener :class:`ChangeStream` (Batching und
+        Conflation je Provider); später entdeckte Provider kommen automatisch
+        hinzu. Fertige Batches reihen sich in eine gemeinsame Warteschlange,
+        das Warten kostet damit unabhängig von der Zahl der Provider gleich viel.
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch muss mindestens 1 sein.")
+        # maxsize=1: Ein langsamer Leser staut die Batches in den Streams, wo
+        # sie weiter conflated werden, statt in der Warteschlange.
+        ready: asyncio.Queue[tuple[str, list[VariableStateModel]]] = asyncio.Queue(maxsize=1)
+        streams: dict[str, tuple[ChangeStream, asyncio.Task]] = {}
+        entry = (streams, ready, (ids, max_batch, max_latency))
+        self._streams.append(entry)
+        try:
+            while True:
+                yield await ready.get()
+        finally:
+            self._streams.remove(entry)
+            pumps = [pump for _, pump in streams.values()]
+            for pump in pumps:
+                pump.cancel()
+            await asyncio.gather(*pumps, return_exceptions=True)
+
+    def _push(self, provider_id: str, states: list[VariableStateModel]) -> None:
+        for streams, ready, options in self._streams:
+            entry = streams.get(provider_id)
+            if entry is None:
+                stream = ChangeStream(*options)
+                pump = asyncio.create_task(self._pump(provider_id, stream, ready))
+                entry = streams[provider_id] = (stream, pump)
+            entry[0].push(states)
+
+    @staticmethod
+    async def _pump(provider_id: str, stream: ChangeStream, ready: asyncio.Queue) -> None:
+        while True:
+            await ready.put((provider_id, await stream.next_batch()))
+
+    async def start(self) -> None:
+        self._nats = self._connection or await self._open_connection()
+        self._nats.on_reconnected(self._handle_reconnected)
+        await self._nats.connect()
+        await self._nats.subscribe(all_vars_changed_events(), callback=self._handle_event)
+        if self.runtime.definition_cache is not None:
+            await self._nats.subscribe(
+                all_registry_provider_events(), callback=self._handle_definition_changed
+            )
+
+    async def _open_connection(self) -> NatsConnection:
+        token = await request_token(self.runtime.oauth)
+        return NatsConnection(
+            host=self.runtime.settings.host,
+            port=self.runtime.settings.port,
+            client_name=self.runtime.settings.client_name,
+            token=token,
+        )
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for app in self._apps.values():
+            await app.stop()
+        if self._nats:
+            await self._nats.close()
+            self._nats = None
+
+    async def _handle_event(self, msg: Msg) -> None:
+        provider_id = provider_id_from_vars_event(msg.subject)
+        app = self._apps.get(provider_id)
+        if app is None:
+            if self.allowed is not None and provider_id not in self.allowed:
+                self.stats.ignored += 1
+                return
+            app = self._add_provider(provider_id)
+        self.stats.events += 1
+        await app.feed(msg)
+
+    async def _handle_definition_changed(self, msg: Msg) -> None:
+        app = self._apps.get(provider_id_from_registry_event(msg.subject))
+        if app is not None:
+            app.invalidate_definition()
+
+    def _handle_reconnected(self) -> None:
+        for app in self._apps.values():
+            self._spawn(self._snapshot(app))
+
+    def _add_provider(self, provider_id: str) -> ConsumerApp:
+        settings = dataclasses.replace(self.runtime.settings, provider_id=provider_id)
+        app = ConsumerApp(dataclasses.replace(self.runtime, settings=settings))
+        app.on_change(functools.partial(self._push, provider_id))
+        for cb, options in self._callbacks:
+            app.on_change(functools.partial(cb, provider_id), **options)
+        app.attach(self._nats)
+        self._apps[provider_id] = app
+        self.stats.providers = len(self._apps)
+        if self.snapshot_on_discovery:
+            self._spawn(self._snapshot(app))
+        return app
+
+    async def _snapshot(self, app: ConsumerApp) -> None:
+        async with self._snapshot_slots:
+            # Gleicher Ablauf wie nach einem Reconnect: Events während des
+            # Requests puffern, nach Zeitstempel einmischen, dann melden.
+            await app.resync()
+        self.stats.snapshots += 1
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -9,6 +9,9 @@ from nats.aio.msg import Msg
 from nats.aio.subscription import Subscription
 
 
+ConnectionCallback = Callable[[], Awaitable[None] | None]
+
+
 class NatsConnection:
     def __init__(self, host: str, port: int, client_name: str, token: str) -> None:
         self.host = host
@@ -16,6 +19,9 @@ class NatsConnection:
         self.client_name = client_name
         self.token = token
         self._client: Optional[Client] = None
+        self._connected = asyncio.Event()
+        self._disconnected_callbacks: list[ConnectionCallback] = []
+        self._reconnected_callbacks: list[ConnectionCallback] = []
 
     @property
     def client(self) -> Client:
@@ -23,8 +29,35 @@ class NatsConnection:
             raise RuntimeError("NATS-Verbindung ist nicht aufgebaut.")
         return self._client
 
+    @property
+    def is_connected(self) -> bool:
+        return bool(self._client and self._client.is_connected)
+
+    def on_disconnected(self, callback: ConnectionCallback) -> None:
+        self._disconnected_callbacks.append(callback)
+
+    def on_reconnected(self, callback: ConnectionCallback) -> None:
+        self._reconnected_callbacks.append(callback)
+
+    async def wait_connected(self) -> None:
+        await self._connected.wait()
+
+    async def _run_callbacks(self, callbacks: list[ConnectionCallback]) -> None:
+        for callback in callbacks:
+            result = callback()
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def _handle_disconnected(self) -> None:
+        self._connected.clear()
+        await self._run_callbacks(self._disconnected_callbacks)
+
+    async def _handle_reconnected(self) -> None:
+        self._connected.set()
+        await self._run_callbacks(self._reconnected_callbacks)
+
     async def connect(self) -> None:
-        if self._client and self._client.is_connected:
+        if self._client and (self._client.is_connected or self._client.is_reconnecting):
             return
 
         self._client = Client()
@@ -36,9 +69,13 @@ class NatsConnection:
             max_reconnect_attempts=-1,
             reconnect_time_wait=2,
             inbox_prefix=f"_INBOX.{self.client_name}",
+            disconnected_cb=self._handle_disconnected,
+            reconnected_cb=self._handle_reconnected,
         )
+        self._connected.set()
 
     async def close(self) -> None:
+        self._connected.clear()
         if self._client and self._client.is_connected:
             await self._client.drain()
             await self._client.close()
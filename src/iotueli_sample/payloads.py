@@ -31,6 +31,13 @@ from weidmueller.ucontrol.hub.ReadProviderDefinitionQueryRequest import (
     ReadProviderDefinitionQueryRequestT,
 )
 from weidmueller.ucontrol.hub.WriteVariablesCommand import WriteVariablesCommandT
+from weidmueller.ucontrol.hub.Provider import ProviderT
+from weidmueller.ucontrol.hub.ProviderList import ProviderListT
+from weidmueller.ucontrol.hub.ProvidersChangedEvent import ProvidersChangedEventT
+from weidmueller.ucontrol.hub.ReadProvidersQueryResponse import ReadProvidersQueryResponseT
+from weidmueller.ucontrol.hub.ReadProviderDefinitionQueryResponse import (
+    ReadProviderDefinitionQueryResponseT,
+)
 
 def _timestamp_from_state(state: VariableStateModel) -> TimestampT:
     ts = TimestampT()
@@ -39,13 +46,16 @@ def _timestamp_from_state(state: VariableStateModel) -> TimestampT:
     return ts
 
 
-def _quality_to_enum(quality: str) -> int:
-    mapping = {
-        "GOOD": VariableQuality.GOOD,
-        "BAD": VariableQuality.BAD,
-        "UNCERTAIN": VariableQuality.UNCERTAIN,
-    }
-    return mapping.get(quality.upper(), VariableQuality.GOOD)
+QUALITY_LABELS = {
+    VariableQuality.GOOD: "GOOD",
+    VariableQuality.BAD: "BAD",
+    VariableQuality.UNCERTAIN: "UNCERTAIN",
+}
+QUALITY_CODES = {label: code for code, label in QUALITY_LABELS.items()}
+
+
+def quality_to_enum(quality: str) -> int:
+    return QUALITY_CODES.get(quality.upper(), VariableQuality.GOOD)
 
 
 def _value_to_union(
@@ -95,8 +105,8 @@ def _def_to_flat(var: VariableDefinitionModel) -> VariableDefinitionT:
     definition = VariableDefinitionT()
     definition.key = var.key
     definition.id = var.id
-    definition.data_type = data_type_map[var.data_type]
-    definition.access_type = access
+    definition.dataType = data_type_map[var.data_type]
+    definition.accessType = access
     definition.experimental = var.experimental
     return definition
 
@@ -120,7 +130,7 @@ def _build_variable_list(
         var.valueType = value_type
         var.value = value_obj
         var.timestamp = _timestamp_from_state(state)
-        var.quality = _quality_to_enum(state.quality)
+        var.quality = quality_to_enum(state.quality)
         items.append(var)
 
     base_ts = (
@@ -141,10 +151,10 @@ def build_provider_definition_event(
     fingerprint = _fingerprint(vars)
     definition = ProviderDefinitionT()
     definition.fingerprint = fingerprint
-    definition.variable_definitions = [_def_to_flat(var) for var in vars]
+    definition.variableDefinitions = [_def_to_flat(var) for var in vars]
 
     event = ProviderDefinitionChangedEventT()
-    event.provider_definition = definition
+    event.providerDefinition = definition
     builder = Builder(1024)
     root = event.Pack(builder)
     builder.Finish(root)
@@ -158,7 +168,7 @@ def build_variables_changed_event(
 ) -> bytes:
     var_list = _build_variable_list(variables, states, fingerprint)
     event = VariablesChangedEventT()
-    event.changed_variables = var_list
+    event.changedVariables = var_list
     builder = Builder(1024)
     root = event.Pack(builder)
     builder.Finish(root)
@@ -206,11 +216,54 @@ def build_read_provider_definition_query() -> bytes:
 def build_write_variables_command(
     variables: Sequence[VariableDefinitionModel],
     states: Iterable[VariableStateModel],
+    fingerprint: int = 0,
 ) -> bytes:
-    var_list = _build_variable_list(variables, states, fingerprint=0)
+    var_list = _build_variable_list(variables, states, fingerprint)
     command = WriteVariablesCommandT()
     command.variables = var_list
     builder = Builder(256)
     root = command.Pack(builder)
     builder.Finish(root)
     return bytes(builder.Output())
+
+
+def _provider_list(provider_ids: Iterable[str]) -> ProviderListT:
+    provider_list = ProviderListT()
+    provider_list.items = [ProviderT(id=provider_id) for provider_id in provider_ids]
+    return provider_list
+
+
+def build_read_providers_response(provider_ids: Iterable[str]) -> bytes:
+    response = ReadProvidersQueryResponseT()
+    response.providers = _provider_list(provider_ids)
+    builder = Builder(256)
+    root = response.Pack(builder)
+    builder.Finish(root)
+    return bytes(builder.Output())
+
+
+def build_providers_changed_event(provider_ids: Iterable[str]) -> bytes:
+    event = ProvidersChangedEventT()
+    event.providers = _provider_list(provider_ids)
+    builder = Builder(256)
+    root = event.Pack(builder)
+    builder.Finish(root)
+    return bytes(builder.Output())
+
+
+def build_read_provider_definition_response(definition: ProviderDefinitionT | None) -> bytes:
+    response = ReadProviderDefinitionQueryResponseT()
+    response.providerDefinition = definition
+    builder = Builder(1024)
+    root = response.Pack(builder)
+    builder.Finish(root)
+    return bytes(builder.Output())
+
+
+def build_registry_definition_event(definition: ProviderDefinitionT | None) -> bytes:
+    event = ProviderDefinitionChangedEventT()
+    event.providerDefinition = definition
+    builder = Builder(1024)
+    root = event.Pack(builder)
+    builder.Finish(root)
+    return bytes(builder.Output())
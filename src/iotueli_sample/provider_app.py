@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import asyncio
-from dataclasses import dataclass
-from typing import List
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
 
 from weidmueller.ucontrol.hub import WriteVariablesCommand
 from weidmueller.ucontrol.hub import ProviderDefinitionChangedEvent
+from weidmueller.ucontrol.hub.ReadVariablesQueryRequest import ReadVariablesQueryRequest
 from weidmueller.ucontrol.hub.Variable import Variable
 from weidmueller.ucontrol.hub.VariableValue import VariableValue
 from weidmueller.ucontrol.hub.VariableValueBoolean import (
@@ -22,7 +25,23 @@ from weidmueller.ucontrol.hub.VariableValueString import (
 )
 
 from .auth import OAuthCredentials, request_token
-from .models import ConnectionSettings, VariableDefinitionModel, VariableStateModel, VariableType
+from .journal import StoreAndForwardJournal
+from .metrics import (
+    EncodeStats,
+    JournalStats,
+    LoopBlockingMonitor,
+    LoopBlockingStats,
+    PublishQueueStats,
+    ResyncStats,
+)
+from .models import (
+    ConnectionSettings,
+    OverflowPolicy,
+    VariableDefinitionModel,
+    VariableStateModel,
+    VariableType,
+    Waveform,
+)
 from .nats_client import NatsConnection
 from .payloads import (
     build_provider_definition_event,
@@ -30,6 +49,7 @@ from .payloads import (
     build_read_variables_response,
     build_variables_changed_event,
 )
+from .publisher import PublishQueue, Publisher
 from .simulation import SimulationEngine
 from .subjects import (
     provider_changed_event,
@@ -38,6 +58,7 @@ from .subjects import (
     vars_changed_event,
     write_variables_command,
 )
+from .vector_simulation import VectorSimulationEngine
 
 
 @dataclass
@@ -46,26 +67,77 @@ class ProviderRuntime:
     variables: List[VariableDefinitionModel]
     oauth: OAuthCredentials
     publish_interval: float = 1.0
+    # Anteil der Variablen, die sich pro Tick ändern und publiziert werden.
+    change_ratio: float = 1.0
+    # NumPy-basierte Simulation für große Variablenmengen (change_ratio wird
+    # dort als Änderungswahrscheinlichkeit pro Variable interpretiert).
+    vectorized_simulation: bool = False
+    waveforms: Dict[int, Waveform] | None = None
+    # Read-Antworten ab dieser Variablenanzahl werden im Executor kodiert
+    # (None = immer inline in der Event-Loop).
+    read_offload_threshold: int | None = 5000
+    encode_executor: Executor | None = None
+    # Intervall des Loop-Blockade-Monitors in Sekunden (None = aus).
+    loop_monitor_interval: float | None = None
+    publish_queue_size: int = 1000
+    publish_policy: OverflowPolicy = OverflowPolicy.CONFLATE
+    publish_high_water_mark: int | None = None
+    on_publish_high_water: Callable[[PublishQueueStats], None] | None = None
+    # Optionales mmap-Journal für Events während einer Verbindungsunterbrechung.
+    journal_path: str | None = None
+    journal_capacity: int = 64 * 1024 * 1024
+    catch_up_rate: float | None = None
+
+
+@dataclass
+class ProviderMetrics:
+    read_encode: EncodeStats = field(default_factory=EncodeStats)
+    publish_queue: PublishQueueStats = field(default_factory=PublishQueueStats)
+    journal: JournalStats | None = None
+    resync: ResyncStats = field(default_factory=ResyncStats)
+    loop_monitor: LoopBlockingMonitor | None = None
+
+    @property
+    def loop_blocking(self) -> LoopBlockingStats | None:
+        return self.loop_monitor.stats if self.loop_monitor else None
 
 
 class ProviderApp:
-    def __init__(self, runtime: ProviderRuntime) -> None:
+    def __init__(self, runtime: ProviderRuntime, connection: NatsConnection | None = None) -> None:
         self.runtime = runtime
+        # Optional injizierte Verbindung (z. B. LoopbackConnection); ohne
+        # Injektion wird per OAuth-Token eine NatsConnection aufgebaut.
+        self._connection = connection
         self._nats: NatsConnection | None = None
-        self._sim = SimulationEngine(runtime.variables)
+        if runtime.vectorized_simulation:
+            self._sim = VectorSimulationEngine(
+                runtime.variables, runtime.waveforms, change_probability=runtime.change_ratio
+            )
+        else:
+            self._sim = SimulationEngine(runtime.variables, runtime.change_ratio)
         self._tasks: list[asyncio.Task] = []
         self._fingerprint: int = 0
+        self._definition_payload: bytes | None = None
+        self.publish_queue = PublishQueue(
+            maxsize=runtime.publish_queue_size,
+            policy=runtime.publish_policy,
+            high_water_mark=runtime.publish_high_water_mark,
+            on_high_water=runtime.on_publish_high_water,
+        )
+        self._publisher: Publisher | None = None
+        self._journal: StoreAndForwardJournal | None = None
+        self.metrics = ProviderMetrics(publish_queue=self.publish_queue.stats)
+        if runtime.loop_monitor_interval:
+            self.metrics.loop_monitor = LoopBlockingMonitor(runtime.loop_monitor_interval)
 
     async def start(self) -> None:
-        token = await request_token(self.runtime.oauth)
-        self._nats = NatsConnection(
-            host=self.runtime.settings.host,
-            port=self.runtime.settings.port,
-            client_name=self.runtime.settings.client_name,
-            token=token,
-        )
+        self._nats = self._connection or await self._open_connection()
+        self._nats.on_disconnected(self._handle_disconnected)
+        self._nats.on_reconnected(self._handle_reconnected)
         await self._nats.connect()
         print("NATS-Verbindung steht")
+        if self.metrics.loop_monitor:
+            self.metrics.loop_monitor.start()
 
         await self._nats.subscribe(
             registry_provider_event(self.runtime.settings.provider_id),
@@ -89,64 +161,115 @@ class ProviderApp:
         )
         print("Write-Subscription aktiv")
 
+        if self.runtime.journal_path:
+            self._journal = StoreAndForwardJournal(
+                self.runtime.journal_path, self.runtime.journal_capacity
+            )
+            self.metrics.journal = self._journal.stats
+            if len(self._journal):
+                print(f"Journal enthält {len(self._journal)} ungesendete Events")
+        self._publisher = Publisher(
+            self._nats,
+            self.publish_queue,
+            self._encode_changed,
+            journal=self._journal,
+            catch_up_rate=self.runtime.catch_up_rate,
+        )
+        self._publisher.start()
         self._tasks.append(asyncio.create_task(self._publish_loop()))
         print("Publish-Loop gestartet")
 
+    async def _open_connection(self) -> NatsConnection:
+        token = await request_token(self.runtime.oauth)
+        return NatsConnection(
+            host=self.runtime.settings.host,
+            port=self.runtime.settings.port,
+            client_name=self.runtime.settings.client_name,
+            token=token,
+        )
+
     async def stop(self) -> None:
         for task in self._tasks:
             task.cancel()
         await asyncio.gather(*self._tasks, return_exceptions=True)
         self._tasks.clear()
+        if self._publisher:
+            await self._publisher.stop()
+            self._publisher = None
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+        if self.metrics.loop_monitor:
+            await self.metrics.loop_monitor.stop()
         if self._nats:
             await self._nats.close()
             self._nats = None
 
     async def _register_provider_definition(self) -> None:
-        payload, fingerprint = build_provider_definition_event(self.runtime.variables)
-        self._fingerprint = fingerprint
+        if self._definition_payload is None:
+            payload, fingerprint = build_provider_definition_event(self.runtime.variables)
+            self._definition_payload = payload
+            self._fingerprint = fingerprint
         await self._nats.publish(
-            provider_changed_event(self.runtime.settings.provider_id), payload
+            provider_changed_event(self.runtime.settings.provider_id), self._definition_payload
         )
 
+    def _handle_disconnected(self) -> None:
+        self.metrics.resync.disconnects += 1
+        print("NATS-Verbindung getrennt")
+
+    async def _handle_reconnected(self) -> None:
+        # Nach dem Reconnect kennt die Registry unseren Provider evtl. nicht mehr
+        # und Consumer haben Events verpasst: Definition (gecacht) erneut
+        # registrieren und einmal den vollständigen Zustand senden. Konsistent
+        # ist der Consumer erst, wenn der Publisher diesen Zustand gesendet hat.
+        started = time.perf_counter()
+        self.metrics.resync.reconnects += 1
+        await self._register_provider_definition()
+        await self._publish_once()
+        marker = self.publish_queue.put_marker()
+        marker.add_done_callback(lambda done: self._record_resync(done, started))
+        print("NATS-Verbindung wiederhergestellt, Providerdefinition erneut publiziert")
+
+    def _record_resync(self, marker: asyncio.Future, started: float) -> None:
+        sent = None if marker.cancelled() else marker.result()
+        if sent is None:
+            self.metrics.resync.failed_resyncs += 1
+        else:
+            self.metrics.resync.record(sent - started)
+
     async def _handle_read_request(self, msg) -> None:
         states = self._sim.states
-        payload = build_read_variables_response(self.runtime.variables, states, self._fingerprint)
+        requested = decode_read_query(msg.data)
+        if requested is not None:
+            states = [s for s in states if s.id in requested]
+        threshold = self.runtime.read_offload_threshold
+        started = time.perf_counter()
+        if threshold is not None and len(states) >= threshold:
+            # Kopie, damit der Publish-Loop die Werte während des Encodings
+            # nicht unter den Füßen verändert.
+            snapshot = [
+                VariableStateModel(s.id, s.value, s.quality, s.timestamp_ns) for s in states
+            ]
+            loop = asyncio.get_running_loop()
+            payload = await loop.run_in_executor(
+                self.runtime.encode_executor,
+                build_read_variables_response,
+                self.runtime.variables,
+                snapshot,
+                self._fingerprint,
+            )
+            self.metrics.read_encode.record_offloaded(time.perf_counter() - started)
+        else:
+            payload = build_read_variables_response(
+                self.runtime.variables, states, self._fingerprint
+            )
+            self.metrics.read_encode.record_inline(time.perf_counter() - started)
         await self._nats.publish(msg.reply, payload)
 
     async def _handle_write_command(self, msg) -> None:
-        command = WriteVariablesCommand.WriteVariablesCommand.GetRootAsWriteVariablesCommand(
-            msg.data, 0
-        )
-        var_list = command.Variables()
-        if not var_list:
-            return
-
-        for i in range(var_list.ItemsLength()):
-            item = var_list.Items(i)
-            if not item:
-                continue
-            var_id = item.Id()
-            state = next((s for s in self._sim.states if s.id == var_id), None)
-            if state is None:
-                continue
-
-            value_type = item.ValueType()
-            if value_type == VariableValue.Int64:
-                holder = VariableValueInt64()
-                item.Value(holder)
-                state.value = holder.Value()
-            elif value_type == VariableValue.Float64:
-                holder = VariableValueFloat64()
-                item.Value(holder)
-                state.value = holder.Value()
-            elif value_type == VariableValue.String:
-                holder = VariableValueString()
-                item.Value(holder)
-                state.value = holder.Value().decode("utf-8")
-            elif value_type == VariableValue.Boolean:
-                holder = VariableValueBoolean()
-                item.Value(holder)
-                state.value = bool(holder.Value())
+        for var_id, value in decode_write_command(msg.data):
+            self._sim.write(var_id, value)
 
         await self._publish_once()
 
@@ -154,20 +277,22 @@ class ProviderApp:
         try:
             while True:
                 await asyncio.sleep(self.runtime.publish_interval)
-                self._sim.advance()
-                await self._publish_once()
+                changed = self._sim.advance()
+                await self._publish_once(changed)
         except asyncio.CancelledError:
             pass
 
-    async def _publish_once(self) -> None:
-        states = self._sim.states
-        payload = build_variables_changed_event(self.runtime.variables, states, self._fingerprint)
-        await self._nats.publish(
-            vars_changed_event(self.runtime.settings.provider_id), payload
+    async def _publish_once(self, states: list[VariableStateModel] | None = None) -> None:
+        await self.publish_queue.put_states(
+            vars_changed_event(self.runtime.settings.provider_id),
+            self._sim.states if states is None else states,
         )
 
+    def _encode_changed(self, states: list[VariableStateModel]) -> bytes:
+        return build_variables_changed_event(self.runtime.variables, states, self._fingerprint)
+
     async def _handle_registry_update(self, msg) -> None:
-        event = ProviderDefinitionChangedEvent.GetRootAsProviderDefinitionChangedEvent(
+        event = ProviderDefinitionChangedEvent.ProviderDefinitionChangedEvent.GetRootAs(
             msg.data, 0
         )
         definition = event.ProviderDefinition()
@@ -179,5 +304,53 @@ class ProviderApp:
         print(f"Registry-Status für Provider: {status}")
 
 
+def decode_read_query(data: bytes) -> set[int] | None:
+    """Angefragte IDs eines ReadVariablesQueryRequest; ``None`` = alle Variablen."""
+    if not data:
+        return None
+    request = ReadVariablesQueryRequest.GetRootAsReadVariablesQueryRequest(data, 0)
+    if request.IdsIsNone() or request.IdsLength() == 0:
+        return None
+    return {request.Ids(i) for i in range(request.IdsLength())}
+
+
+def decode_write_command(data: bytes) -> list[tuple[int, object]]:
+    command = WriteVariablesCommand.WriteVariablesCommand.GetRootAsWriteVariablesCommand(data, 0)
+    var_list = command.Variables()
+    if not var_list:
+        return []
+
+    values: list[tuple[int, object]] = []
+    for i in range(var_list.ItemsLength()):
+        item = var_list.Items(i)
+        if not item:
+            continue
+        value_table = item.Value()
+        if value_table is None:
+            continue
+
+        value_type = item.ValueType()
+        if value_type == VariableValue.Int64:
+            holder = VariableValueInt64()
+            holder.Init(value_table.Bytes, value_table.Pos)
+            value = holder.Value()
+        elif value_type == VariableValue.Float64:
+            holder = VariableValueFloat64()
+            holder.Init(value_table.Bytes, value_table.Pos)
+            value = holder.Value()
+        elif value_type == VariableValue.String:
+            holder = VariableValueString()
+            holder.Init(value_table.Bytes, value_table.Pos)
+            value = holder.Value().decode("utf-8")
+        elif value_type == VariableValue.Boolean:
+            holder = VariableValueBoolean()
+            holder.Init(value_table.Bytes, value_table.Pos)
+            value = bool(holder.Value())
+        else:
+            continue
+        values.append((item.Id(), value))
+    return values
+
+
 def build_connection_settings(host: str, port: int, provider_id: str, client_name: str) -> ConnectionSettings:
     return ConnectionSettings(host=host, port=port, provider_id=provider_id, client_name=client_name)
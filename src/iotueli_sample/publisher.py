@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Union
+
+from .journal import StoreAndForwardJournal
+from .metrics import PublishQueueStats
+from .models import OverflowPolicy, VariableStateModel
+from .nats_client import NatsConnection
+
+QueueItem = Union[bytes, list[VariableStateModel], asyncio.Future]
+
+
+class PublishQueue:
+    """Begrenzte Ausgangswarteschlange für Provider-Events.
+
+    ``put_states`` nimmt Zustände entgegen, ``put_payload`` bereits kodierte
+    Nachrichten. Mit :attr:`OverflowPolicy.CONFLATE` wird pro Subject nur der
+    jeweils letzte Wert einer Variable (bzw. pro ``key`` die letzte Payload)
+    behalten. Ein ``key`` ist nur für Payloads gedacht, die ihre Vorgänger
+    vollständig ersetzen; die neue Payload rückt dabei ans Ende.
+    ``DROP_OLDEST`` verwirft bei voller Queue den ältesten Eintrag, ``BLOCK``
+    lässt den Aufrufer warten, bis wieder Platz ist.
+
+    :meth:`put_marker` reiht eine Marke hinter alle bisherigen Einträge ein;
+    ihr Future liefert den Zeitpunkt (``time.perf_counter()``), zu dem der
+    :class:`Publisher` alles davor gesendet hat, bzw. ``None``, wenn davor
+    Einträge verworfen wurden.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        policy: OverflowPolicy = OverflowPolicy.CONFLATE,
+        high_water_mark: int | None = None,
+        on_high_water: Callable[[PublishQueueStats], None] | None = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize muss mindestens 1 sein.")
+        self.maxsize = maxsize
+        self.policy = OverflowPolicy(policy)
+        self.high_water_mark = high_water_mark or max(1, int(maxsize * 0.8))
+        self.on_high_water = on_high_water
+        self.stats = PublishQueueStats()
+        self._entries: OrderedDict[object, tuple[str, object]] = OrderedDict()
+        self._seq = itertools.count()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._above_high_water = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def put_states(self, subject: str, states: Iterable[VariableStateModel]) -> None:
+        snapshot = {
+            s.id: VariableStateModel(s.id, s.value, s.quality, s.timestamp_ns) for s in states
+        }
+        if not snapshot:
+            return
+        if self.policy == OverflowPolicy.CONFLATE:
+            key = (subject, None)
+            entry = self._entries.get(key)
+            if entry is not None:
+                pending = entry[1]
+                self.stats.conflated += sum(1 for var_id in snapshot if var_id in pending)
+                pending.update(snapshot)
+                return
+            await self._append(key, subject, snapshot)
+            return
+        await self._append(next(self._seq), subject, list(snapshot.values()))
+
+    async def put_payload(self, subject: str, payload: bytes, key: object | None = None) -> None:
+        if self.policy == OverflowPolicy.CONFLATE and key is not None:
+            entry_key = (subject, key)
+            if entry_key in self._entries:
+                self._entries[entry_key] = (subject, payload)
+                self._entries.move_to_end(entry_key)
+                self.stats.conflated += 1
+                return
+            await self._append(entry_key, subject, payload)
+            return
+        await self._append(next(self._seq), subject, payload)
+
+    def put_marker(self) -> asyncio.Future:
+        marker = asyncio.get_running_loop().create_future()
+        # Marken zählen nicht gegen maxsize und werden nie conflated.
+        self._entries[next(self._seq)] = ("", marker)
+        self._not_empty.set()
+        return marker
+
+    def cancel_markers(self) -> None:
+        for _, item in self._entries.values():
+            if isinstance(item, asyncio.Future):
+                item.cancel()
+
+    async def get(self) -> tuple[str, QueueItem]:
+        while not self._entries:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def get_nowait(self) -> tuple[str, QueueItem] | None:
+        if not self._entries:
+            return None
+        _, (subject, item) = self._entries.popitem(last=False)
+        self._update_depth()
+        self._not_full.set()
+        if isinstance(item, dict):
+            item = list(item.values())
+        return subject, item
+
+    async def wait(self, timeout: float) -> None:
+        if self._entries:
+            return
+        self._not_empty.clear()
+        try:
+            await asyncio.wait_for(self._not_empty.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _append(self, key: object, subject: str, item: object) -> None:
+        while len(self._entries) >= self.maxsize:
+            if self.policy == OverflowPolicy.BLOCK:
+                self._not_full.clear()
+                await self._not_full.wait()
+            else:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                if isinstance(dropped, asyncio.Future):
+                    _resolve_marker(dropped)
+                    continue
+                self.stats.dropped += 1
+                for _, item in self._entries.values():
+                    if isinstance(item, asyncio.Future) and not item.done():
+                        item.set_result(None)
+        self._entries[key] = (subject, item)
+        self.stats.enqueued += 1
+        self._update_depth()
+        self._not_empty.set()
+
+    def _update_depth(self) -> None:
+        depth = len(self._entries)
+        self.stats.depth = depth
+        self.stats.max_depth = max(self.stats.max_depth, depth)
+        if depth >= self.high_water_mark and not self._above_high_water:
+            self._above_high_water = True
+            self.stats.high_water_events += 1
+            if self.on_high_water:
+                self.on_high_water(self.stats)
+        elif depth < self.high_water_mark:
+            self._above_high_water = False
+
+
+def _resolve_marker(marker: asyncio.Future) -> None:
+    if not marker.done():
+        marker.set_result(time.perf_counter())
+
+
+class Publisher:
+    """Leert eine :class:`PublishQueue` auf die NATS-Verbindung.
+
+    Solange die Verbindung getrennt ist, wird nicht publiziert – die Queue
+    (und damit ihre Überlaufstrategie) fängt die Daten auf, statt dass der
+    unbegrenzte Puffer von nats-py wächst. Mit einem
+    :class:`StoreAndForwardJournal` wird stattdessen jede kodierte Nachricht
+    journalisiert und nach dem Reconnect in Reihenfolge nachgesendet
+    (``catch_up_rate`` Nachrichten/s, ``None`` = so schnell wie möglich).
+    Marken aus :meth:`PublishQueue.put_marker` werden erst aufgelöst, wenn
+    auch das Journal bis zu ihnen nachgesendet ist.
+
+    Schlägt ein Publish fehl, wird er bis zu ``max_send_attempts`` Mal im
+    Abstand von ``reconnect_poll_interval`` wiederholt und die Nachricht erst
+    danach verworfen (``stats.send_errors`` bzw. ``stats.dropped``); mit
+    Journal wandert sie stattdessen ins Journal.
+    """
+
+    def __init__(
+        self,
+        connection: NatsConnection,
+        queue: PublishQueue,
+        encode: Callable[[list[VariableStateModel]], bytes],
+        reconnect_poll_interval: float = 0.1,
+        journal: StoreAndForwardJournal | None = None,
+        catch_up_rate: float | None = None,
+        max_send_attempts: int = 3,
+    ) -> None:
+        if max_send_attempts < 1:
+            raise ValueError("max_send_attempts muss mindestens 1 sein.")
+        self.connection = connection
+        self.queue = queue
+        self._encode = encode
+        self.reconnect_poll_interval = reconnect_poll_interval
+        self.journal = journal
+        self.catch_up_rate = catch_up_rate
+        self.max_send_attempts = max_send_attempts
+        self._task: asyncio.Task | None = None
+        self._markers: list[asyncio.Future] = []
+        self._replay_failures = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._report_exit)
+
+    def _report_exit(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Publisher beendet: {task.exception()!r}")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for marker in self._markers:
+            marker.cancel()
+        self._markers.clear()
+        self.queue.cancel_markers()
+
+    def _payload(self, item: QueueItem) -> bytes | None:
+        if isinstance(item, bytes):
+            return item
+        try:
+            return self._encode(item)
+        except Exception as exc:
+            self.queue.stats.dropped += 1
+            print(f"Event nicht kodierbar: {exc!r}")
+            return None
+
+    async def _send(self, subject: str, payload: bytes) -> bool:
+        try:
+            await self.connection.publish(subject, payload)
+        except Exception as exc:
+            self.queue.stats.send_errors += 1
+            print(f"Publish auf '{subject}' fehlgeschlagen: {exc!r}")
+            return False
+        self.queue.stats.published += 1
+        return True
+
+    async def _run(self) -> None:
+        if self.journal is None:
+            while True:
+                subject, item = await self.queue.get()
+                if isinstance(item, asyncio.Future):
+                    _resolve_marker(item)
+                    continue
+                payload = self._payload(item)
+                if payload is None:
+                    continue
+                for _ in range(self.max_send_attempts):
+                    await self.connection.wait_connected()
+                    if await self._send(subject, payload):
+                        break
+                    await asyncio.sleep(self.reconnect_poll_interval)
+                else:
+                    self.queue.stats.dropped += 1
+
+        while True:
+            if not self.connection.is_connected:
+                await self.queue.wait(self.reconnect_poll_interval)
+                self._spool()
+            elif len(self.journal):
+                # Solange ein Rückstand existiert, läuft auch Live-Verkehr über
+                # das Journal, damit die Reihenfolge erhalten bleibt.
+                self._spool()
+                await self._replay_one()
+            else:
+                self._release_markers()
+                subject, item = await self.queue.get()
+                if isinstance(item, asyncio.Future):
+                    _resolve_marker(item)
+                    continue
+                payload = self._payload(item)
+                if payload is None:
+                    continue
+                if not (self.connection.is_connected and await self._send(subject, payload)):
+                    self._store(subject, payload)
+
+    def _release_markers(self) -> None:
+        for marker in self._markers:
+            _resolve_marker(marker)
+        self._markers.clear()
+
+    def _store(self, subject: str, payload: bytes) -> None:
+        try:
+            self.journal.append(subject, payload)
+        except ValueError as exc:
+            self.journal.stats.dropped += 1
+            print(f"Event nicht journalisiert: {exc}")
+
+    def _spool(self) -> None:
+        while (entry := self.queue.get_nowait()) is not None:
+            subject, item = entry
+            if isinstance(item, asyncio.Future):
+                self._markers.append(item)
+                continue
+            payload = self._payload(item)
+            if payload is not None:
+                self._store(subject, payload)
+
+    async def _replay_one(self) -> None:
+        record = self.journal.peek()
+        if record is None:
+            return
+        subject, payload = record
+        try:
+            await self.connection.publish(subject, payload)
+        except Exception as exc:
+            self.queue.stats.send_errors += 1
+            self._replay_failures += 1
+            if self._replay_failures < self.max_send_attempts:
+                await asyncio.sleep(self.reconnect_poll_interval)
+                return
+            print(f"Journal-Eintrag auf '{subject}' verworfen: {exc!r}")
+            self.journal.drop_oldest()
+        else:
+            self.journal.pop()
+        self._replay_failures = 0
+        if not len(self.journal):
+            self._release_markers()
+        await asyncio.sleep(1.0 / self.catch_up_rate if self.catch_up_rate else 0)
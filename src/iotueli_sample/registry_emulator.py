@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from weidmueller.ucontrol.hub.ProviderDefinition import ProviderDefinitionT
+from weidmueller.ucontrol.hub.ProviderDefinitionChangedEvent import (
+    ProviderDefinitionChangedEvent,
+)
+from weidmueller.ucontrol.hub.ProviderDefinitionState import ProviderDefinitionState
+from weidmueller.ucontrol.hub.VariableAccessType import VariableAccessType
+from weidmueller.ucontrol.hub.VariableDataType import VariableDataType
+
+from .nats_client import NatsConnection
+from .payloads import (
+    build_providers_changed_event,
+    build_read_provider_definition_response,
+    build_read_providers_response,
+    build_registry_definition_event,
+)
+from .subjects import (
+    all_provider_changed_events,
+    all_registry_provider_queries,
+    registry_provider_event,
+    registry_providers_changed_event,
+    registry_providers_query,
+)
+
+_DATA_TYPES = {
+    VariableDataType.BOOLEAN,
+    VariableDataType.DURATION,
+    VariableDataType.FLOAT64,
+    VariableDataType.INT64,
+    VariableDataType.STRING,
+    VariableDataType.TIMESTAMP,
+}
+_ACCESS_TYPES = {VariableAccessType.READ_ONLY, VariableAccessType.READ_WRITE}
+
+
+@dataclass
+class RegistryStats:
+    definitions_received: int = 0
+    definitions_invalid: int = 0
+    providers_queries: int = 0
+    definition_queries: int = 0
+
+
+def validate_definition(definition: ProviderDefinitionT) -> list[str]:
+    """Prüft eine Providerdefinition und liefert die gefundenen Fehler."""
+    errors: list[str] = []
+    ids: set[int] = set()
+    keys: set[str] = set()
+    for var in definition.variableDefinitions or []:
+        key = var.key.decode("utf-8") if isinstance(var.key, (bytes, bytearray)) else var.key
+        if not key:
+            errors.append(f"Variable {var.id} hat keinen Key")
+        elif key in keys:
+            errors.append(f"Key '{key}' ist doppelt vergeben")
+        if var.id in ids:
+            errors.append(f"ID {var.id} ist doppelt vergeben")
+        if var.dataType not in _DATA_TYPES:
+            errors.append(f"Variable {var.id} hat unbekannten Datentyp {var.dataType}")
+        if var.accessType not in _ACCESS_TYPES:
+            errors.append(f"Variable {var.id} hat unbekannten Zugriffstyp {var.accessType}")
+        ids.add(var.id)
+        keys.add(key)
+    return errors
+
+
+class RegistryEmulator:
+    """Lokaler Ersatz für die Provider-Registry des u-OS Data Hub.
+
+    Nimmt ``ProviderDefinitionChangedEvent``s aller Provider entgegen, setzt
+    den Status auf OK bzw. INVALID und beantwortet die Registry-Queries.
+    Funktioniert mit jeder Verbindung, die die Oberfläche von
+    :class:`NatsConnection` bietet (z. B. ``LoopbackConnection``).
+    """
+
+    def __init__(self, connection: NatsConnection, verbose: bool = False) -> None:
+        self._nats = connection
+        self.verbose = verbose
+        self.definitions: dict[str, ProviderDefinitionT] = {}
+        self.stats = RegistryStats()
+        self._subscriptions: list = []
+
+    async def start(self) -> None:
+        await self._nats.connect()
+        for subject, handler in (
+            (all_provider_changed_events(), self._handle_definition),
+            (registry_providers_query(), self._handle_providers_query),
+            (all_registry_provider_queries(), self._handle_definition_query),
+        ):
+            self._subscriptions.append(await self._nats.subscribe(subject, callback=handler))
+
+    async def stop(self) -> None:
+        for subscription in self._subscriptions:
+            await subscription.unsubscribe()
+        self._subscriptions.clear()
+
+    @property
+    def provider_ids(self) -> list[str]:
+        return sorted(self.definitions)
+
+    async def _handle_definition(self, msg) -> None:
+        provider_id = msg.subject.split(".")[2]
+        event = ProviderDefinitionChangedEvent.GetRootAsProviderDefinitionChangedEvent(msg.data, 0)
+        flat = event.ProviderDefinition()
+        known = provider_id in self.definitions
+
+        if flat is None:
+            if not known:
+                return
+            del self.definitions[provider_id]
+            await self._nats.publish(
+                registry_provider_event(provider_id), build_registry_definition_event(None)
+            )
+            await self._publish_providers()
+            self._log(f"Provider '{provider_id}' entfernt")
+            return
+
+        self.stats.definitions_received += 1
+        definition = ProviderDefinitionT.InitFromObj(flat)
+        errors = validate_definition(definition)
+        if errors:
+            self.stats.definitions_invalid += 1
+            definition.state = ProviderDefinitionState.INVALID
+            definition.variableDefinitions = []
+            self._log(f"Provider '{provider_id}' INVALID: {'; '.join(errors)}")
+        else:
+            definition.state = ProviderDefinitionState.OK
+            self._log(
+                f"Provider '{provider_id}' OK ({len(definition.variableDefinitions or [])} Variablen)"
+            )
+        self.definitions[provider_id] = definition
+
+        await self._nats.publish(
+            registry_provider_event(provider_id), build_registry_definition_event(definition)
+        )
+        if not known:
+            await self._publish_providers()
+
+    async def _publish_providers(self) -> None:
+        await self._nats.publish(
+            registry_providers_changed_event(), build_providers_changed_event(self.provider_ids)
+        )
+
+    async def _handle_providers_query(self, msg) -> None:
+        self.stats.providers_queries += 1
+        if msg.reply:
+            await self._nats.publish(msg.reply, build_read_providers_response(self.provider_ids))
+
+    async def _handle_definition_query(self, msg) -> None:
+        self.stats.definition_queries += 1
+        provider_id = msg.subject.split(".")[4]
+        if msg.reply:
+            await self._nats.publish(
+                msg.reply,
+                build_read_provider_definition_response(self.definitions.get(provider_id)),
+            )
+
+    def _log(self, text: str) -> None:
+        if self.verbose:
+            print(text)
@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from .benchmarking import make_definitions, parse_type_mix
+from .models import (
+    VariableAccess,
+    VariableDefinitionModel,
+    VariableStateModel,
+    VariableType,
+    Waveform,
+    WaveformProfile,
+)
+from .nats_client import NatsConnection
+from .payloads import (
+    _fingerprint,
+    build_variables_changed_event,
+    build_write_variables_command,
+)
+from .simulation import SimulationEngine
+from .subjects import vars_changed_event, write_variables_command
+from .vector_simulation import VectorSimulationEngine
+
+STEP_EVENT = "event"
+STEP_WRITE = "write"
+STEP_DISCONNECT = "disconnect"
+STEP_RECONNECT = "reconnect"
+_PRIORITY = {STEP_DISCONNECT: 0, STEP_RECONNECT: 0, STEP_WRITE: 1, "tick": 2}
+
+
+@dataclass
+class Burst:
+    at: float
+    duration: float
+    change_ratio: float = 1.0
+    rate_multiplier: float = 1.0
+
+
+@dataclass
+class WriteStorm:
+    at: float
+    duration: float
+    rate: float
+    # Leer = alle beschreibbaren Variablen.
+    ids: list[int] = field(default_factory=list)
+
+
+@dataclass
+class Disconnect:
+    at: float
+    duration: float
+
+
+@dataclass
+class Scenario:
+    """Reproduzierbares Lastszenario; Zeiten in Sekunden ab Szenariostart."""
+
+    variables: list[VariableDefinitionModel]
+    seed: int = 0
+    duration: float = 60.0
+    tick_interval: float = 1.0
+    change_ratio: float = 1.0
+    # Logische Startzeit der Zeitstempel, damit die Payloads bytegleich bleiben.
+    start_time_ns: int = 1_700_000_000_000_000_000
+    waveforms: dict[int, Waveform] = field(default_factory=dict)
+    vectorized: bool = False
+    bursts: list[Burst] = field(default_factory=list)
+    write_storms: list[WriteStorm] = field(default_factory=list)
+    disconnects: list[Disconnect] = field(default_factory=list)
+
+
+@dataclass
+class ScenarioStep:
+    offset_ns: int
+    kind: str
+    subject: str = ""
+    payload: bytes = b""
+
+
+def _seconds_to_ns(seconds: float) -> int:
+    return int(round(seconds * 1_000_000_000))
+
+
+def _waveform_from_dict(data: dict) -> Waveform:
+    return Waveform(
+        profile=WaveformProfile(data.get("profile", WaveformProfile.SINE.value)),
+        amplitude=float(data.get("amplitude", 5.0)),
+        offset=float(data.get("offset", 20.0)),
+        period=float(data.get("period", 30.0)),
+        step=float(data.get("step", 1.0)),
+    )
+
+
+def _select_ids(spec: dict, variables: list[VariableDefinitionModel]) -> list[int]:
+    selected = variables
+    if "ids" in spec:
+        wanted = set(spec["ids"])
+        selected = [v for v in selected if v.id in wanted]
+    if "range" in spec:
+        first, last = spec["range"]
+        selected = [v for v in selected if first <= v.id <= last]
+    if "data_type" in spec:
+        data_type = VariableType(spec["data_type"])
+        selected = [v for v in selected if v.data_type == data_type]
+    return [v.id for v in selected]
+
+
+def scenario_from_dict(data: dict) -> Scenario:
+    """Baut ein :class:`Scenario` aus dem JSON-Format (siehe ``samples/scenario.json``)."""
+    spec = data.get("variables", {})
+    if isinstance(spec, list):
+        variables = [
+            VariableDefinitionModel(
+                id=int(item["id"]),
+                key=item["key"],
+                data_type=VariableType(item["type"]),
+                access=VariableAccess(item.get("access", VariableAccess.READ_WRITE.value)),
+            )
+            for item in spec
+        ]
+    else:
+        variables = make_definitions(
+            int(spec.get("count", 100)), parse_type_mix(spec.get("type_mix", "int64=1"))
+        )
+
+    waveforms: dict[int, Waveform] = {}
+    for profile in data.get("profiles", []):
+        waveform = _waveform_from_dict(profile)
+        for var_id in _select_ids(profile, variables):
+            waveforms[var_id] = waveform
+
+    scenario = Scenario(
+        variables=variables,
+        seed=int(data.get("seed", 0)),
+        duration=float(data.get("duration", 60.0)),
+        tick_interval=float(data.get("tick_interval", 1.0)),
+        change_ratio=float(data.get("change_ratio", 1.0)),
+        start_time_ns=int(data.get("start_time_ns", Scenario.start_time_ns)),
+        waveforms=waveforms,
+        vectorized=bool(data.get("vectorized", False)),
+    )
+    for event in data.get("events", []):
+        kind = event.get("type")
+        if kind == "burst":
+            scenario.bursts.append(
+                Burst(
+                    float(event["at"]),
+                    float(event["duration"]),
+                    float(event.get("change_ratio", 1.0)),
+                    float(event.get("rate_multiplier", 1.0)),
+                )
+            )
+        elif kind == "write_storm":
+            ids = _select_ids(event, variables) if {"ids", "range", "data_type"} & event.keys() else []
+            scenario.write_storms.append(
+                WriteStorm(float(event["at"]), float(event["duration"]), float(event["rate"]), ids)
+            )
+        elif kind == "disconnect":
+            scenario.disconnects.append(Disconnect(float(event["at"]), float(event["duration"])))
+        else:
+            raise ValueError(f"Unbekannter Szenario-Eventtyp: '{kind}'")
+    if scenario.tick_interval <= 0:
+        raise ValueError("tick_interval muss größer als 0 sein.")
+    return scenario
+
+
+def load_scenario(path: str) -> Scenario:
+    with open(path, encoding="utf-8") as handle:
+        return scenario_from_dict(json.load(handle))
+
+
+class ScenarioPlayer:
+    """Erzeugt aus einem :class:`Scenario` eine deterministische Schrittfolge.
+
+    Zeitstempel stammen aus einer logischen Uhr (``start_time_ns`` + Szenariozeit),
+    alle Zufallswerte aus Generatoren mit ``seed`` – dieselbe Datei liefert
+    daher bei jedem Lauf bytegleiche Payloads. Schreibstürme werden wie vom
+    Provider verarbeitet: Auf jeden Write-Schritt folgt das daraus entstehende
+    Event.
+    """
+
+    def __init__(self, scenario: Scenario, provider_id: str) -> None:
+        self.scenario = scenario
+        self.provider_id = provider_id
+        self._now_ns = scenario.start_time_ns
+        if scenario.vectorized:
+            self.engine = VectorSimulationEngine(
+                scenario.variables,
+                scenario.waveforms,
+                change_probability=scenario.change_ratio,
+                seed=scenario.seed,
+                clock=self._clock,
+            )
+        else:
+            self.engine = SimulationEngine(
+                scenario.variables,
+                scenario.change_ratio,
+                scenario.waveforms,
+                seed=scenario.seed,
+                clock=self._clock,
+            )
+        self._write_rng = random.Random(scenario.seed + 1)
+        self._fingerprint = _fingerprint(scenario.variables)
+        self._by_id = {v.id: v for v in scenario.variables}
+
+    def _clock(self) -> int:
+        return self._now_ns
+
+    def _set_change_ratio(self, ratio: float) -> None:
+        if self.scenario.vectorized:
+            self.engine.change_probability = ratio
+        else:
+            self.engine.change_ratio = ratio
+
+    def _active_burst(self, offset_ns: int) -> Burst | None:
+        for burst in self.scenario.bursts:
+            start = _seconds_to_ns(burst.at)
+            if start <= offset_ns < start + _seconds_to_ns(burst.duration):
+                return burst
+        return None
+
+    def _timeline(self) -> list[tuple[int, int, int, str, object]]:
+        scenario = self.scenario
+        end_ns = _seconds_to_ns(scenario.duration)
+        entries: list[tuple[int, int, int, str, object]] = []
+        seq = 0
+
+        offset = 0
+        while offset < end_ns:
+            entries.append((offset, _PRIORITY["tick"], seq, "tick", None))
+            seq += 1
+            burst = self._active_burst(offset)
+            multiplier = burst.rate_multiplier if burst and burst.rate_multiplier > 0 else 1.0
+            offset += max(1, _seconds_to_ns(scenario.tick_interval / multiplier))
+
+        writable = [v.id for v in scenario.variables if v.access == VariableAccess.READ_WRITE]
+        for storm in scenario.write_storms:
+            ids = storm.ids or writable
+            if not ids or storm.rate <= 0:
+                continue
+            start = _seconds_to_ns(storm.at)
+            for idx in range(int(storm.duration * storm.rate)):
+                at = start + _seconds_to_ns(idx / storm.rate)
+                if at < end_ns:
+                    entries.append((at, _PRIORITY[STEP_WRITE], seq, STEP_WRITE, ids))
+                    seq += 1
+
+        for disconnect in scenario.disconnects:
+            start = _seconds_to_ns(disconnect.at)
+            entries.append((start, _PRIORITY[STEP_DISCONNECT], seq, STEP_DISCONNECT, None))
+            entries.append(
+                (
+                    start + _seconds_to_ns(disconnect.duration),
+                    _PRIORITY[STEP_RECONNECT],
+                    seq + 1,
+                    STEP_RECONNECT,
+                    None,
+                )
+            )
+            seq += 2
+        entries.sort()
+        return entries
+
+    def _write_value(self, definition: VariableDefinitionModel, seq: int):
+        rng = self._write_rng
+        if definition.data_type == VariableType.INT64:
+            return rng.randrange(-1000, 1000)
+        if definition.data_type == VariableType.FLOAT64:
+            return round(rng.uniform(-100.0, 100.0), 3)
+        if definition.data_type == VariableType.BOOLEAN:
+            return rng.random() < 0.5
+        return f"write-{seq}"
+
+    def _event(self, offset_ns: int, states: list[VariableStateModel]) -> ScenarioStep:
+        definitions = [self._by_id[s.id] for s in states]
+        return ScenarioStep(
+            offset_ns,
+            STEP_EVENT,
+            vars_changed_event(self.provider_id),
+            build_variables_changed_event(definitions, states, self._fingerprint),
+        )
+
+    def steps(self) -> Iterator[ScenarioStep]:
+        for offset_ns, _, seq, kind, data in self._timeline():
+            self._now_ns = self.scenario.start_time_ns + offset_ns
+            if kind == "tick":
+                burst = self._active_burst(offset_ns)
+                self._set_change_ratio(burst.change_ratio if burst else self.scenario.change_ratio)
+                changed = self.engine.advance()
+                if changed:
+                    yield self._event(offset_ns, changed)
+            elif kind == STEP_WRITE:
+                definition = self._by_id[self._write_rng.choice(data)]
+                value = self._write_value(definition, seq)
+                command_state = VariableStateModel(definition.id, value, "GOOD", self._now_ns)
+                yield ScenarioStep(
+                    offset_ns,
+                    STEP_WRITE,
+                    write_variables_command(self.provider_id),
+                    build_write_variables_command([definition], [command_state]),
+                )
+                state = self.engine.write(definition.id, value)
+                if state is not None:
+                    yield self._event(offset_ns, [state])
+            else:
+                yield ScenarioStep(offset_ns, kind)
+
+
+def scenario_digest(scenario: Scenario, provider_id: str) -> tuple[int, str]:
+    """Anzahl Schritte und SHA-256 über alle Schritte – zum Prüfen der Reproduzierbarkeit."""
+    digest = hashlib.sha256()
+    count = 0
+    for step in ScenarioPlayer(scenario, provider_id).steps():
+        digest.update(step.offset_ns.to_bytes(8, "little"))
+        digest.update(step.kind.encode())
+        digest.update(step.subject.encode())
+        digest.update(len(step.payload).to_bytes(4, "little"))
+        digest.update(step.payload)
+        count += 1
+    return count, digest.hexdigest()
+
+
+async def play_scenario(
+    connection: NatsConnection,
+    player: ScenarioPlayer,
+    speed: float = 1.0,
+    send_writes: bool = False,
+) -> int:
+    """Spielt die Schritte zeitgetreu (``speed``-fach, 0 = so schnell wie möglich) ab.
+
+    Events werden publiziert; Write-Befehle nur mit ``send_writes``, z. B. um
+    einen echten Provider unter Last zu setzen. Disconnect/Reconnect
+    funktionieren mit Verbindungen, die ``simulate_disconnect`` anbieten
+    (:class:`~iotueli_sample.loopback.LoopbackConnection`).
+    """
+    started = time.perf_counter()
+    published = 0
+    warned = False
+    for step in player.steps():
+        if speed > 0:
+            delay = step.offset_ns / 1_000_000_000 / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if step.kind == STEP_EVENT or (step.kind == STEP_WRITE and send_writes):
+            await connection.publish(step.subject, step.payload)
+            published += 1
+        elif step.kind in (STEP_DISCONNECT, STEP_RECONNECT):
+            action = getattr(
+                connection,
+                "simulate_disconnect" if step.kind == STEP_DISCONNECT else "simulate_reconnect",
+                None,
+            )
+            if action is not None:
+                await action()
+            elif not warned:
+                warned = True
+                print("Disconnect-Ereignisse werden nur mit LoopbackConnection simuliert")
+    return published
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Sequence
+
+from weidmueller.ucontrol.hub.ReadVariablesQueryRequest import ReadVariablesQueryRequest
+
+from .models import VariableDefinitionModel
+from .nats_client import NatsConnection
+from .payloads import build_read_variables_response, build_variables_changed_event
+from .provider_app import ProviderApp, ProviderRuntime, decode_write_command
+from .shared_state import DEFAULT_STRING_SLOT_SIZE, SharedStateTable
+from .simulation import SimulationEngine
+from .subjects import vars_changed_event
+
+_worker_table: SharedStateTable | None = None
+_worker_engines: dict[int, SimulationEngine] = {}
+
+
+def _init_worker(
+    name: str, definitions: Sequence[VariableDefinitionModel], string_slot_size: int
+) -> None:
+    global _worker_table
+    _worker_table = SharedStateTable.attach(name, definitions, string_slot_size)
+
+
+def _shard_tick(
+    shard: int, start: int, stop: int, tick: int, fingerprint: int, change_ratio: float = 1.0
+) -> bytes | None:
+    table = _worker_table
+    slots = range(start, stop)
+    engine = _worker_engines.get(shard)
+    if engine is None:
+        engine = SimulationEngine(table.definitions[start:stop], change_ratio)
+        _worker_engines[shard] = engine
+
+    # Der Shared-Memory-Block ist die Wahrheit: Schreibbefehle landen dort,
+    # deshalb werden die Werte vor jedem Tick neu geladen.
+    engine.load(table.read_states(slots), tick - 1)
+    states = engine.advance()
+    if not states:
+        return None
+    for state in states:
+        table.write(table.slots[state.id], state.value, state.timestamp_ns, state.quality)
+    return build_variables_changed_event(table.definitions[start:stop], states, fingerprint)
+
+
+def _encode_slots(slots: Sequence[int], fingerprint: int, response: bool) -> bytes:
+    table = _worker_table
+    definitions = [table.definitions[slot] for slot in slots]
+    states = table.read_states(slots)
+    if response:
+        return build_read_variables_response(definitions, states, fingerprint)
+    return build_variables_changed_event(definitions, states, fingerprint)
+
+
+def partition(count: int, shards: int) -> list[tuple[int, int]]:
+    shards = max(1, min(shards, count)) if count else 1
+    size, rest = divmod(count, shards)
+    bounds: list[tuple[int, int]] = []
+    start = 0
+    for idx in range(shards):
+        stop = start + size + (1 if idx < rest else 0)
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+class ShardedProviderApp(ProviderApp):
+    """Provider, der die Variablen auf mehrere Worker-Prozesse verteilt.
+
+    Der Koordinator hält Definition und Fingerprint und beantwortet die NATS-
+    Subjects. Simulation und Encoding der ``VariablesChangedEvent``-Slices laufen
+    in einem Prozesspool; die Werte liegen in einer :class:`SharedStateTable`.
+    """
+
+    def __init__(
+        self,
+        runtime: ProviderRuntime,
+        shards: int | None = None,
+        string_slot_size: int = DEFAULT_STRING_SLOT_SIZE,
+        connection: NatsConnection | None = None,
+    ) -> None:
+        super().__init__(runtime, connection)
+        self.shards = shards or os.cpu_count() or 1
+        self.string_slot_size = string_slot_size
+        self._bounds = partition(len(runtime.variables), self.shards)
+        self._starts = [start for start, _ in self._bounds]
+        self._shard_locks = [asyncio.Lock() for _ in self._bounds]
+        self._table: SharedStateTable | None = None
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def start(self) -> None:
+        self._table = SharedStateTable.create(self.runtime.variables, self.string_slot_size)
+        for slot, state in enumerate(self._sim.states):
+            self._table.write(slot, state.value, state.timestamp_ns, state.quality)
+        self._pool = ProcessPoolExecutor(
+            max_workers=len(self._bounds),
+            initializer=_init_worker,
+            initargs=(self._table.name, self._table.definitions, self.string_slot_size),
+        )
+        print(f"{len(self._bounds)} Shards für {len(self._table)} Variablen gestartet")
+        await super().start()
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._table:
+            self._table.close()
+            self._table = None
+
+    def _shard_of(self, slot: int) -> int:
+        return bisect.bisect_right(self._starts, slot) - 1
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, fn, *args)
+
+    async def _handle_read_request(self, msg) -> None:
+        request = ReadVariablesQueryRequest.GetRootAsReadVariablesQueryRequest(msg.data, 0)
+        if request.IdsIsNone() or request.IdsLength() == 0:
+            slots = list(range(len(self._table)))
+        else:
+            slots = [
+                self._table.slots[request.Ids(i)]
+                for i in range(request.IdsLength())
+                if request.Ids(i) in self._table.slots
+            ]
+        started = time.perf_counter()
+        payload = await self._run(_encode_slots, slots, self._fingerprint, True)
+        self.metrics.read_encode.record_offloaded(time.perf_counter() - started)
+        await self._nats.publish(msg.reply, payload)
+
+    async def _handle_write_command(self, msg) -> None:
+        by_shard: dict[int, list[tuple[int, object]]] = {}
+        for var_id, value in decode_write_command(msg.data):
+            slot = self._table.slots.get(var_id)
+            if slot is None:
+                continue
+            by_shard.setdefault(self._shard_of(slot), []).append((slot, value))
+
+        for shard, writes in by_shard.items():
+            async with self._shard_locks[shard]:
+                for slot, value in writes:
+                    self._table.write(slot, value, time.time_ns())
+                payload = await self._run(
+                    _encode_slots, [slot for slot, _ in writes], self._fingerprint, False
+                )
+            await self.publish_queue.put_payload(
+                vars_changed_event(self.runtime.settings.provider_id), payload
+            )
+
+    async def _tick_shard(self, shard: int, tick: int) -> bytes:
+        start, stop = self._bounds[shard]
+        async with self._shard_locks[shard]:
+            return await self._run(
+                _shard_tick, shard, start, stop, tick, self._fingerprint, self.runtime.change_ratio
+            )
+
+    async def _publish_loop(self) -> None:
+        subject = vars_changed_event(self.runtime.settings.provider_id)
+        # Nur vollständige Shard-Slices dürfen einander ersetzen; Teil-Deltas
+        # müssen alle gesendet werden, sonst gehen Änderungen verloren.
+        full = self.runtime.change_ratio >= 1.0
+        tick = 0
+        try:
+            while True:
+                await asyncio.sleep(self.runtime.publish_interval)
+                tick += 1
+                payloads = await asyncio.gather(
+                    *(self._tick_shard(shard, tick) for shard in range(len(self._bounds)))
+                )
+                for shard, payload in enumerate(payloads):
+                    if payload is None:
+                        continue
+                    await self.publish_queue.put_payload(
+                        subject, payload, key=shard if full else None
+                    )
+        except asyncio.CancelledError:
+            pass
+
+    async def _publish_once(self, states=None) -> None:
+        # Im Sharding-Modus wird immer der vollständige Zustand aus dem
+        # Shared-Memory-Block gesendet.
+        subject = vars_changed_event(self.runtime.settings.provider_id)
+        for shard, (start, stop) in enumerate(self._bounds):
+            async with self._shard_locks[shard]:
+                payload = await self._run(
+                    _encode_slots, list(range(start, stop)), self._fingerprint, False
+                )
+            await self.publish_queue.put_payload(subject, payload, key=shard)
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+import struct
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterable, Sequence
+
+from .models import (
+    VariableDefinitionModel,
+    VariableStateModel,
+    VariableType,
+    definition_from_dict,
+    definition_to_dict,
+)
+from .payloads import QUALITY_LABELS, quality_to_enum
+
+DEFAULT_STRING_SLOT_SIZE = 256
+
+_MAGIC = b"IOTUSHST"
+_VERSION = 1
+# magic, version, count, string_slot_size, meta_size, generation
+_HEADER = struct.Struct("<8sIIIIQ")
+_GENERATION_OFFSET = _HEADER.size - 8
+_INT64_RANGE = range(-(2**63), 2**63)
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _encode_definitions(definitions: Sequence[VariableDefinitionModel]) -> bytes:
+    return json.dumps([definition_to_dict(var) for var in definitions]).encode("utf-8")
+
+
+def _decode_definitions(meta: bytes) -> list[VariableDefinitionModel]:
+    return [definition_from_dict(var) for var in json.loads(meta)]
+
+
+class SharedStateTable:
+    """Spaltenweise Variablenwerte in einem ``multiprocessing.shared_memory``-Block.
+
+    Jede Variable belegt einen Slot (Index in der Definitionsliste). Zahlen und
+    Booleans liegen als 8-Byte-Werte vor, Strings in Slots fester Breite – so
+    können mehrere Prozesse dieselben Werte lesen und schreiben, ohne dass sie
+    gepickelt werden müssen. Der Block beschreibt sich selbst (Kopf mit den
+    Definitionen als JSON), :meth:`attach` braucht daher nur den Namen.
+
+    Jeder Slot hat einen Versionszähler (Seqlock): ungerade, solange
+    geschrieben wird. :meth:`read_state` wiederholt das Lesen, bis es einen
+    unveränderten, geraden Stand gesehen hat, und braucht damit keine Sperre.
+    ``generation`` zählt abgeschlossene Schreib-Batches (:meth:`bump_generation`).
+    """
+
+    def __init__(
+        self,
+        shm: shared_memory.SharedMemory,
+        definitions: Sequence[VariableDefinitionModel],
+        string_slot_size: int,
+        owner: bool,
+        meta_size: int,
+    ) -> None:
+        self._shm = shm
+        self._owner = owner
+        self.definitions = list(definitions)
+        self.string_slot_size = string_slot_size
+        self.slots = {definition.id: idx for idx, definition in enumerate(self.definitions)}
+
+        count = len(self.definitions)
+        buf = shm.buf
+        self._generation = buf[_GENERATION_OFFSET : _HEADER.size].cast("Q")
+        offset = _HEADER.size + _align(meta_size)
+        values = buf[offset : offset + count * 8]
+        self._ints = values.cast("q")
+        self._floats = values.cast("d")
+        offset += count * 8
+        self._timestamps = buf[offset : offset + count * 8].cast("q")
+        offset += count * 8
+        self._versions = buf[offset : offset + count * 8].cast("Q")
+        offset += count * 8
+        self._quality = buf[offset : offset + count]
+        offset += _align(count)
+        self._str_len = buf[offset : offset + count * 4].cast("I")
+        offset += _align(count * 4)
+        self._strings = buf[offset : offset + count * string_slot_size]
+
+    @staticmethod
+    def required_size(
+        count: int, string_slot_size: int = DEFAULT_STRING_SLOT_SIZE, meta_size: int = 0
+    ) -> int:
+        return (
+            _HEADER.size
+            + _align(meta_size)
+            + count * 24
+            + _align(count)
+            + _align(count * 4)
+            + count * string_slot_size
+        )
+
+    @classmethod
+    def create(
+        cls,
+        definitions: Sequence[VariableDefinitionModel],
+        string_slot_size: int = DEFAULT_STRING_SLOT_SIZE,
+        name: str | None = None,
+    ) -> "SharedStateTable":
+        meta = _encode_definitions(definitions)
+        size = cls.required_size(len(definitions), string_slot_size, len(meta))
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _HEADER.pack_into(
+            shm.buf, 0, _MAGIC, _VERSION, len(definitions), string_slot_size, len(meta), 0
+        )
+        shm.buf[_HEADER.size : _HEADER.size + len(meta)] = meta
+        return cls(shm, definitions, string_slot_size, owner=True, meta_size=len(meta))
+
+    @classmethod
+    def attach(
+        cls,
+        name: str,
+        definitions: Sequence[VariableDefinitionModel] | None = None,
+        string_slot_size: int | None = None,
+        track: bool = True,
+    ) -> "SharedStateTable":
+        """Öffnet einen bestehenden Block; ohne ``definitions`` aus dessen Kopf.
+
+        ``track=False`` für Prozesse, die nicht vom Erzeuger abstammen: sonst
+        räumt der ``resource_tracker`` des Lesers den Block bei dessen Ende ab.
+        """
+        if track or sys.version_info < (3, 13):
+            shm = shared_memory.SharedMemory(name=name, create=False)
+            if not track:
+                resource_tracker.unregister(shm._name, "shared_memory")
+        else:
+            shm = shared_memory.SharedMemory(name=name, create=False, track=False)
+        magic, version, count, stored_slot_size, meta_size, _ = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            shm.close()
+            raise ValueError(f"'{name}' ist kein gültiger Shared-State-Block.")
+        if definitions is None:
+            meta = bytes(shm.buf[_HEADER.size : _HEADER.size + meta_size])
+            definitions = _decode_definitions(meta)
+        if len(definitions) != count or string_slot_size not in (None, stored_slot_size):
+            shm.close()
+            raise ValueError(f"Definitionen passen nicht zum Shared-State-Block '{name}'.")
+        return cls(shm, definitions, stored_slot_size, owner=False, meta_size=meta_size)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __len__(self) -> int:
+        return len(self.definitions)
+
+    @property
+    def generation(self) -> int:
+        return self._generation[0]
+
+    def bump_generation(self) -> int:
+        self._generation[0] += 1
+        return self._generation[0]
+
+    def write(self, slot: int, value, timestamp_ns: int, quality: str = "GOOD") -> None:
+        data_type = self.definitions[slot].data_type
+        # Erst umwandeln und prüfen, dann den Slot als "in Arbeit" markieren –
+        # ein Fehler darf die Version nicht ungerade zurücklassen.
+        encoded = None
+        if data_type == VariableType.FLOAT64:
+            converted = float(value)
+        elif data_type == VariableType.STRING:
+            encoded = str(value).encode("utf-8")
+            if len(encoded) > self.string_slot_size:
+                raise ValueError(
+                    f"String für Variable {self.definitions[slot].id} ist länger als "
+                    f"{self.string_slot_size} Bytes."
+                )
+        elif data_type == VariableType.BOOLEAN:
+            converted = 1 if value else 0
+        else:
+            converted = int(value)
+            if converted not in _INT64_RANGE:
+                raise ValueError(
+                    f"Wert für Variable {self.definitions[slot].id} liegt außerhalb von int64."
+                )
+        if timestamp_ns not in _INT64_RANGE:
+            raise ValueError(f"Ungültiger Zeitstempel {timestamp_ns}.")
+        quality_code = quality_to_enum(quality)
+
+        version = self._versions[slot]
+        self._versions[slot] = version + 1
+        try:
+            if data_type == VariableType.FLOAT64:
+                self._floats[slot] = converted
+            elif data_type == VariableType.STRING:
+                start = slot * self.string_slot_size
+                self._strings[start : start + len(encoded)] = encoded
+                self._str_len[slot] = len(encoded)
+            else:
+                self._ints[slot] = converted
+            self._timestamps[slot] = timestamp_ns
+            self._quality[slot] = quality_code
+        finally:
+            self._versions[slot] = version + 2
+
+    def write_state(self, state: VariableStateModel) -> None:
+        self.write(self.slots[state.id], state.value, state.timestamp_ns, state.quality)
+
+    def read_value(self, slot: int):
+        data_type = self.definitions[slot].data_type
+        if data_type == VariableType.FLOAT64:
+            return self._floats[slot]
+        if data_type == VariableType.STRING:
+            start = slot * self.string_slot_size
+            return bytes(self._strings[start : start + self._str_len[slot]]).decode("utf-8")
+        if data_type == VariableType.BOOLEAN:
+            return bool(self._ints[slot])
+        return self._ints[slot]
+
+    def read_state(self, slot: int) -> VariableStateModel:
+        versions = self._versions
+        while True:
+            version = versions[slot]
+            if version & 1:
+                continue
+            try:
+                value = self.read_value(slot)
+            except UnicodeDecodeError:
+                # Halb geschriebener String – der Versionsvergleich wiederholt.
+                value = None
+            timestamp_ns = self._timestamps[slot]
+            quality = self._quality[slot]
+            if versions[slot] == version:
+                break
+        return VariableStateModel(
+            id=self.definitions[slot].id,
+            value=value,
+            quality=QUALITY_LABELS.get(quality, "UNCERTAIN"),
+            timestamp_ns=timestamp_ns,
+        )
+
+    def read_states(self, slots: Iterable[int]) -> list[VariableStateModel]:
+        return [self.read_state(slot) for slot in slots]
+
+    def close(self) -> None:
+        for view in (
+            self._generation,
+            self._ints,
+            self._floats,
+            self._timestamps,
+            self._versions,
+            self._quality,
+            self._str_len,
+            self._strings,
+        ):
+            view.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
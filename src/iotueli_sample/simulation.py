@@ -3,20 +3,70 @@ from __future__ import annotations
 import math
 import random
 import time
-from typing import Dict, Iterable
+from typing import Callable, Dict, Iterable, Mapping
 
-from .models import VariableDefinitionModel, VariableStateModel, VariableType
+from .models import (
+    VariableDefinitionModel,
+    VariableStateModel,
+    VariableType,
+    Waveform,
+    WaveformProfile,
+)
+
+STRING_STATES = ("ready", "running", "idle")
+
+
+def waveform_signal(
+    waveform: Waveform, tick: int, phase: float, current: float, rng: random.Random
+) -> float:
+    """Rohsignal eines :class:`Waveform` im Tick ``tick`` (``phase`` in Perioden)."""
+    profile = WaveformProfile(waveform.profile)
+    t = tick / max(waveform.period, 1e-9) + phase
+    if profile == WaveformProfile.SINE:
+        return waveform.offset + waveform.amplitude * math.sin(2.0 * math.pi * t)
+    if profile == WaveformProfile.RAMP:
+        return waveform.offset + waveform.amplitude * (t % 1.0)
+    if profile == WaveformProfile.STEP:
+        return waveform.offset + waveform.amplitude * (math.floor(t) % 2)
+    if profile == WaveformProfile.RANDOM_WALK:
+        return current + rng.gauss(0.0, 1.0) * waveform.step
+    return waveform.offset
 
 
 class SimulationEngine:
-    """Erzeugt Dummywerte für unsere Beispielvariablen."""
+    """Erzeugt Dummywerte für unsere Beispielvariablen.
+
+    Mit ``seed`` und einer eigenen ``clock`` (liefert Nanosekunden) ist die
+    Wertefolge reproduzierbar; Variablen mit einem Eintrag in ``waveforms``
+    folgen diesem Signalverlauf statt dem Standardverhalten.
+    """
 
-    def __init__(self, definitions: Iterable[VariableDefinitionModel]) -> None:
+    def __init__(
+        self,
+        definitions: Iterable[VariableDefinitionModel],
+        change_ratio: float = 1.0,
+        waveforms: Mapping[int, Waveform] | None = None,
+        seed: int | None = None,
+        clock: Callable[[], int] = time.time_ns,
+    ) -> None:
+        if not 0.0 <= change_ratio <= 1.0:
+            raise ValueError("change_ratio muss zwischen 0 und 1 liegen.")
         self._definitions = list(definitions)
+        # Anteil der Variablen, die sich pro Tick ändern (1.0 = alle).
+        self.change_ratio = change_ratio
+        self._rng = random.Random(seed)
+        self._clock = clock
         self._states: Dict[int, VariableStateModel] = {
             definition.id: VariableStateModel(id=definition.id, value=self._initial_value(definition))
             for definition in self._definitions
         }
+        self._waveforms = {
+            var_id: waveform
+            for var_id, waveform in (waveforms or {}).items()
+            if var_id in self._states
+        }
+        self._phases = {var_id: self._rng.random() for var_id in sorted(self._waveforms)}
+        self._signals = {var_id: w.offset for var_id, w in self._waveforms.items()}
         self._tick = 0
 
     def _initial_value(self, definition: VariableDefinitionModel):
@@ -34,13 +84,24 @@ class SimulationEngine:
 
     def advance(self) -> list[VariableStateModel]:
         self._tick += 1
-        now_ns = int(time.time() * 1_000_000_000)
+        now_ns = self._clock()
+
+        definitions = self._definitions
+        if self.change_ratio < 1.0:
+            count = round(len(definitions) * self.change_ratio)
+            indices = sorted(self._rng.sample(range(len(definitions)), count))
+            definitions = [definitions[idx] for idx in indices]
 
-        for definition in self._definitions:
+        changed: list[VariableStateModel] = []
+        for definition in definitions:
             state = self._states[definition.id]
             state.timestamp_ns = now_ns
+            changed.append(state)
 
-            if definition.data_type == VariableType.INT64:
+            waveform = self._waveforms.get(definition.id)
+            if waveform is not None:
+                state.value = self._waveform_value(definition, waveform)
+            elif definition.data_type == VariableType.INT64:
                 state.value = int(state.value) + 1
             elif definition.data_type == VariableType.FLOAT64:
                 state.value = round(20.0 + math.sin(self._tick / 5.0) * 5.0, 3)
@@ -48,11 +109,49 @@ class SimulationEngine:
                 if definition.key.endswith("static_message"):
                     state.value = "Hello from IoTUeli"
                 else:
-                    state.value = random.choice(["ready", "running", "idle"])
+                    state.value = self._rng.choice(STRING_STATES)
             elif definition.data_type == VariableType.BOOLEAN:
                 state.value = not bool(state.value)
 
-        return list(self._states.values())
+        return changed
+
+    def _waveform_value(self, definition: VariableDefinitionModel, waveform: Waveform):
+        signal = waveform_signal(
+            waveform,
+            self._tick,
+            self._phases[definition.id],
+            self._signals[definition.id],
+            self._rng,
+        )
+        self._signals[definition.id] = signal
+        if definition.data_type == VariableType.INT64:
+            return int(round(signal))
+        if definition.data_type == VariableType.BOOLEAN:
+            return signal > waveform.offset
+        if definition.data_type == VariableType.STRING:
+            return STRING_STATES[int(abs(signal)) % len(STRING_STATES)]
+        return round(signal, 3)
+
+    def write(self, var_id: int, value) -> VariableStateModel | None:
+        state = self._states.get(var_id)
+        if state is None:
+            return None
+        state.value = value
+        state.timestamp_ns = self._clock()
+        if var_id in self._signals and not isinstance(value, str):
+            self._signals[var_id] = float(value)
+        return state
+
+    def load(self, states: Iterable[VariableStateModel], tick: int) -> None:
+        """Übernimmt Werte und Tick von außen, z. B. aus einem Shared-Memory-Shard."""
+        for state in states:
+            current = self._states.get(state.id)
+            if current is None:
+                continue
+            current.value = state.value
+            current.quality = state.quality
+            current.timestamp_ns = state.timestamp_ns
+        self._tick = tick
 
     @property
     def states(self) -> list[VariableStateModel]:
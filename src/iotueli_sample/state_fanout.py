@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import time
+from typing import Iterable
+
+from .consumer_app import ConsumerApp
+from .metrics import FanoutStats
+from .models import VariableDefinitionModel, VariableStateModel
+from .shared_state import DEFAULT_STRING_SLOT_SIZE, SharedStateTable
+
+
+def default_block_name(provider_id: str) -> str:
+    return f"iotueli-{provider_id}"
+
+
+class SharedStatePublisher:
+    """Spiegelt die aktuellen Werte eines :class:`ConsumerApp` in Shared Memory.
+
+    Nach ``consumer.start()`` legt :meth:`start` eine :class:`SharedStateTable`
+    mit den Variablen der Providerdefinition an, übernimmt die bereits
+    bekannten Werte und schreibt danach jede Änderung direkt aus dem
+    ``on_change``-Callback – pro Batch einmal ``generation`` erhöht. Lokale
+    Prozesse lesen über :class:`SharedStateReader`, ohne eigenen NATS-Consumer.
+    Variablen, die erst nach dem Anlegen in der Definition auftauchen, werden
+    übersprungen (``stats.skipped``).
+    """
+
+    def __init__(
+        self,
+        consumer: ConsumerApp,
+        name: str | None = None,
+        string_slot_size: int = DEFAULT_STRING_SLOT_SIZE,
+    ) -> None:
+        self.consumer = consumer
+        self.name = name or default_block_name(consumer.runtime.settings.provider_id)
+        self.string_slot_size = string_slot_size
+        self.stats = FanoutStats()
+        self._table: SharedStateTable | None = None
+        self._registered = False
+
+    def start(self) -> None:
+        consumer = self.consumer
+        variables = (
+            consumer.definition.variables if consumer.definition else consumer.runtime.variables
+        )
+        self._table = SharedStateTable.create(variables, self.string_slot_size, name=self.name)
+        self.stats.variables = len(variables)
+        self.publish(consumer.states)
+        if not self._registered:
+            consumer.on_change(self.publish)
+            self._registered = True
+
+    def close(self) -> None:
+        """Gibt den Block frei; Leser behalten ihre Abbildung bis zum eigenen ``close``."""
+        if self._table is not None:
+            self._table.close()
+            self._table = None
+
+    def publish(self, states: Iterable[VariableStateModel]) -> None:
+        table = self._table
+        if table is None:
+            return
+        slots = table.slots
+        stats = self.stats
+        written = 0
+        for state in states:
+            slot = slots.get(state.id)
+            if slot is None or state.value is None:
+                stats.skipped += 1
+                continue
+            try:
+                table.write(slot, state.value, state.timestamp_ns, state.quality)
+            except (TypeError, ValueError, OverflowError):
+                stats.skipped += 1
+                continue
+            written += 1
+        if written:
+            table.bump_generation()
+            stats.written += written
+            stats.batches += 1
+
+
+class SharedStateReader:
+    """Lesezugriff auf den Block eines :class:`SharedStatePublisher` aus beliebigen Prozessen.
+
+    Ohne Sperren und ohne Systemaufrufe pro Lesevorgang; jeder Wert wird per
+    Seqlock konsistent (Wert, Zeitstempel, Qualität) gelesen. Mit
+    :attr:`generation` bzw. :meth:`wait_for_change` lässt sich billig prüfen,
+    ob seit dem letzten Lesen etwas geschrieben wurde.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._table = SharedStateTable.attach(name, track=False)
+        self.by_key = {var.key: idx for idx, var in enumerate(self._table.definitions)}
+
+    @property
+    def definitions(self) -> list[VariableDefinitionModel]:
+        return self._table.definitions
+
+    @property
+    def generation(self) -> int:
+        return self._table.generation
+
+    def _slot(self, id_or_key: int | str) -> int:
+        slot = (
+            self.by_key.get(id_or_key)
+            if isinstance(id_or_key, str)
+            else self._table.slots.get(id_or_key)
+        )
+        if slot is None:
+            raise KeyError(f"Variable '{id_or_key}' ist im Shared-State-Block unbekannt.")
+        return slot
+
+    def get(self, id_or_key: int | str) -> VariableStateModel:
+        return self._table.read_state(self._slot(id_or_key))
+
+    def read(self, ids_or_keys: Iterable[int | str]) -> list[VariableStateModel]:
+        return self._table.read_states(self._slot(item) for item in ids_or_keys)
+
+    def snapshot(self) -> list[VariableStateModel]:
+        return self._table.read_states(range(len(self._table)))
+
+    def wait_for_change(
+        self, generation: int, timeout: float | None = None, poll_interval: float = 0.001
+    ) -> int:
+        """Wartet (pollend), bis ``generation`` überschritten ist; liefert die aktuelle."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._table.generation
+            if current != generation:
+                return current
+            if deadline is not None and time.monotonic() >= deadline:
+                return current
+            time.sleep(poll_interval)
+
+    def close(self) -> None:
+        self._table.close()
+
+    def __enter__(self) -> "SharedStateReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -32,3 +32,49 @@ def registry_providers_query() -> str:
 
 def registry_providers_changed_event() -> str:
     return f"{VERSION_PREFIX}.{LOCATION_PREFIX}.registry.providers.evt.changed"
+
+
+def all_provider_changed_events() -> str:
+    return f"{VERSION_PREFIX}.{LOCATION_PREFIX}.*.def.evt.changed"
+
+
+def all_registry_provider_queries() -> str:
+    return f"{VERSION_PREFIX}.{LOCATION_PREFIX}.registry.providers.*.def.qry.read"
+
+
+def all_vars_changed_events() -> str:
+    return f"{VERSION_PREFIX}.{LOCATION_PREFIX}.*.vars.evt.changed"
+
+
+def all_registry_provider_events() -> str:
+    return f"{VERSION_PREFIX}.{LOCATION_PREFIX}.registry.providers.*.def.evt.changed"
+
+
+_LOC_PREFIX = f"{VERSION_PREFIX}.{LOCATION_PREFIX}."
+_REGISTRY_PREFIX = f"{_LOC_PREFIX}registry.providers."
+_VARS_EVENT_SUFFIX = ".vars.evt.changed"
+_DEF_EVENT_SUFFIX = ".def.evt.changed"
+
+
+def provider_id_from_vars_event(subject: str) -> str:
+    """Provider-ID aus ``v1.loc.<id>.vars.evt.changed`` – reines Slicing, kein split/Regex."""
+    return subject[len(_LOC_PREFIX) : len(subject) - len(_VARS_EVENT_SUFFIX)]
+
+
+def provider_id_from_registry_event(subject: str) -> str:
+    """Provider-ID aus ``v1.loc.registry.providers.<id>.def.evt.changed``."""
+    return subject[len(_REGISTRY_PREFIX) : len(subject) - len(_DEF_EVENT_SUFFIX)]
+
+
+def subject_matches(pattern: str, subject: str) -> bool:
+    """NATS-Wildcard-Vergleich: ``*`` passt auf ein Token, ``>`` auf den Rest."""
+    pattern_tokens = pattern.split(".")
+    subject_tokens = subject.split(".")
+    for idx, token in enumerate(pattern_tokens):
+        if token == ">":
+            return len(subject_tokens) > idx
+        if idx >= len(subject_tokens):
+            return False
+        if token != "*" and token != subject_tokens[idx]:
+            return False
+    return len(pattern_tokens) == len(subject_tokens)
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import math
+import time
+from typing import Callable, Iterable, Mapping
+
+from .models import (
+    VariableDefinitionModel,
+    VariableStateModel,
+    VariableType,
+    Waveform,
+    WaveformProfile,
+)
+from .simulation import STRING_STATES
+
+try:
+    import numpy as np
+except ImportError:  # numpy ist optional und nur für diesen Modus nötig
+    np = None
+
+STATIC_MESSAGE = "Hello from IoTUeli"
+
+_KIND_FLOAT, _KIND_INT, _KIND_BOOL, _KIND_STRING = range(4)
+_KINDS = {
+    VariableType.FLOAT64: _KIND_FLOAT,
+    VariableType.INT64: _KIND_INT,
+    VariableType.BOOLEAN: _KIND_BOOL,
+    VariableType.STRING: _KIND_STRING,
+}
+_PROFILES = list(WaveformProfile)
+
+
+class VectorSimulationEngine:
+    """NumPy-Variante von :class:`SimulationEngine` für Lastgenerierung mit 100k+ Variablen.
+
+    Alle Werte liegen spaltenweise in Arrays; :meth:`step` berechnet den nächsten
+    Tick für alle Variablen auf einmal und liefert die Dirty-Maske. Pro Variable
+    lässt sich ein :class:`Waveform` vorgeben, ``change_probability`` bestimmt,
+    mit welcher Wahrscheinlichkeit eine Variable pro Tick neu berechnet wird.
+    :meth:`advance` und :attr:`states` bieten dieselbe Oberfläche wie
+    :class:`SimulationEngine`.
+    """
+
+    def __init__(
+        self,
+        definitions: Iterable[VariableDefinitionModel],
+        waveforms: Mapping[int, Waveform] | None = None,
+        default_waveform: Waveform | None = None,
+        change_probability: float = 1.0,
+        seed: int | None = None,
+        clock: Callable[[], int] = time.time_ns,
+    ) -> None:
+        if np is None:
+            raise RuntimeError(
+                "Für die vektorisierte Simulation wird numpy benötigt (pip install numpy)."
+            )
+        if not 0.0 <= change_probability <= 1.0:
+            raise ValueError("change_probability muss zwischen 0 und 1 liegen.")
+        self._definitions = list(definitions)
+        self.change_probability = change_probability
+        self._rng = np.random.default_rng(seed)
+        self._clock = clock
+        self._tick = 0
+
+        waveforms = waveforms or {}
+        default_waveform = default_waveform or Waveform()
+        count = len(self._definitions)
+        self.ids = np.fromiter((d.id for d in self._definitions), dtype=np.int64, count=count)
+        self._index = {d.id: idx for idx, d in enumerate(self._definitions)}
+        self._kinds = np.fromiter(
+            (_KINDS.get(d.data_type, _KIND_INT) for d in self._definitions),
+            dtype=np.uint8,
+            count=count,
+        )
+
+        specs = []
+        static: list[int] = []
+        for idx, definition in enumerate(self._definitions):
+            spec = waveforms.get(definition.id)
+            if spec is None:
+                spec = default_waveform
+                if definition.key.endswith("static_message"):
+                    spec = Waveform(WaveformProfile.CONSTANT)
+                    static.append(idx)
+            specs.append(spec)
+        self._profiles = np.fromiter(
+            (_PROFILES.index(WaveformProfile(s.profile)) for s in specs), dtype=np.uint8, count=count
+        )
+        self._amplitude = np.array([s.amplitude for s in specs], dtype=np.float64)
+        self._offset = np.array([s.offset for s in specs], dtype=np.float64)
+        self._period = np.array([max(s.period, 1e-9) for s in specs], dtype=np.float64)
+        self._step_width = np.array([s.step for s in specs], dtype=np.float64)
+        self._phase = self._rng.random(count)
+        self._groups = {
+            profile: np.flatnonzero(self._profiles == _PROFILES.index(profile))
+            for profile in _PROFILES
+        }
+        self._labels = np.array(STRING_STATES, dtype=object)
+        self._string_idx = np.flatnonzero(self._kinds == _KIND_STRING)
+
+        # Rohsignal (für den Random Walk) und die daraus abgeleiteten Werte.
+        self._signal = self._offset.copy()
+        self.values = np.zeros(count, dtype=np.float64)
+        self.strings = np.empty(count, dtype=object)
+        self.strings[self._string_idx] = STRING_STATES[0]
+        self.strings[static] = STATIC_MESSAGE
+        self._static = np.zeros(count, dtype=bool)
+        self._static[static] = True
+        self.timestamps = np.zeros(count, dtype=np.int64)
+
+        self._states = [VariableStateModel(id=d.id, value=None) for d in self._definitions]
+        # Indizes, deren Zustandsobjekte noch nicht mit den Arrays abgeglichen sind.
+        self._stale = np.ones(count, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._definitions)
+
+    def _next_signal(self, tick: int) -> "np.ndarray":
+        signal = self._signal.copy()
+        groups = self._groups
+        idx = groups[WaveformProfile.SINE]
+        if idx.size:
+            t = tick / self._period[idx] + self._phase[idx]
+            signal[idx] = self._offset[idx] + self._amplitude[idx] * np.sin(2.0 * math.pi * t)
+        idx = groups[WaveformProfile.RAMP]
+        if idx.size:
+            t = tick / self._period[idx] + self._phase[idx]
+            signal[idx] = self._offset[idx] + self._amplitude[idx] * np.mod(t, 1.0)
+        idx = groups[WaveformProfile.STEP]
+        if idx.size:
+            t = tick / self._period[idx] + self._phase[idx]
+            signal[idx] = self._offset[idx] + self._amplitude[idx] * np.mod(np.floor(t), 2.0)
+        idx = groups[WaveformProfile.RANDOM_WALK]
+        if idx.size:
+            signal[idx] += self._rng.normal(0.0, 1.0, idx.size) * self._step_width[idx]
+        idx = groups[WaveformProfile.CONSTANT]
+        if idx.size:
+            signal[idx] = self._offset[idx]
+        return signal
+
+    def _derive(self, signal: "np.ndarray") -> "np.ndarray":
+        kinds = self._kinds
+        values = np.round(signal, 3)
+        values = np.where(kinds == _KIND_INT, np.rint(signal), values)
+        values = np.where(kinds == _KIND_BOOL, (signal > self._offset).astype(np.float64), values)
+        return values
+
+    def step(self) -> "np.ndarray":
+        """Berechnet den nächsten Tick und liefert die Dirty-Maske (``bool``-Array)."""
+        self._tick += 1
+        count = len(self._definitions)
+        if self.change_probability >= 1.0:
+            selected = np.ones(count, dtype=bool)
+        else:
+            selected = self._rng.random(count) < self.change_probability
+
+        signal = self._next_signal(self._tick)
+        self._signal = np.where(selected, signal, self._signal)
+        new_values = self._derive(self._signal)
+        dirty = selected & (new_values != self.values)
+
+        string_idx = self._string_idx
+        if string_idx.size:
+            labels = self._labels[
+                np.floor(np.abs(self._signal[string_idx])).astype(np.int64) % len(self._labels)
+            ]
+            changed = selected[string_idx] & ~self._static[string_idx] & (
+                labels != self.strings[string_idx]
+            )
+            self.strings[string_idx[changed]] = labels[changed]
+            dirty[string_idx] = changed
+
+        self.values = np.where(dirty, new_values, self.values)
+        self.timestamps[dirty] = self._clock()
+        self._stale |= dirty
+        return dirty
+
+    def _python_values(self, idx: "np.ndarray") -> list:
+        kinds = self._kinds[idx]
+        values = self.values[idx]
+        out = np.empty(idx.size, dtype=object)
+        out[:] = values
+        mask = kinds == _KIND_INT
+        out[mask] = values[mask].astype(np.int64)
+        mask = kinds == _KIND_BOOL
+        out[mask] = values[mask].astype(bool)
+        mask = kinds == _KIND_STRING
+        out[mask] = self.strings[idx[mask]]
+        return out.tolist()
+
+    def _sync(self, idx: "np.ndarray") -> None:
+        if not idx.size:
+            return
+        values = self._python_values(idx)
+        timestamps = self.timestamps[idx].tolist()
+        states = self._states
+        for i, value, timestamp_ns in zip(idx.tolist(), values, timestamps):
+            state = states[i]
+            state.value = value
+            state.timestamp_ns = timestamp_ns
+        self._stale[idx] = False
+
+    def advance(self) -> list[VariableStateModel]:
+        dirty = np.flatnonzero(self.step())
+        self._sync(np.flatnonzero(self._stale))
+        return [self._states[i] for i in dirty.tolist()]
+
+    def write(self, var_id: int, value) -> VariableStateModel | None:
+        idx = self._index.get(var_id)
+        if idx is None:
+            return None
+        if self._kinds[idx] == _KIND_STRING:
+            self.strings[idx] = str(value)
+        else:
+            self.values[idx] = float(value)
+            self._signal[idx] = float(value)
+        self.timestamps[idx] = self._clock()
+        self._sync(np.array([idx]))
+        return self._states[idx]
+
+    def load(self, states: Iterable[VariableStateModel], tick: int) -> None:
+        for state in states:
+            idx = self._index.get(state.id)
+            if idx is None:
+                continue
+            if self._kinds[idx] == _KIND_STRING:
+                self.strings[idx] = state.value
+            else:
+                self.values[idx] = float(state.value)
+                self._signal[idx] = float(state.value)
+            self.timestamps[idx] = state.timestamp_ns
+            self._states[idx].quality = state.quality
+            self._stale[idx] = True
+        self._tick = tick
+
+    @property
+    def states(self) -> list[VariableStateModel]:
+        self._sync(np.flatnonzero(self._stale))
+        return list(self._states)
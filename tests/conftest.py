@@ -0,0 +1,148 @@
+import asyncio
+import inspect
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
+
+from iotueli_sample.auth import OAuthCredentials  # noqa: E402
+from iotueli_sample.consumer_app import ConsumerApp, ConsumerRuntime  # noqa: E402
+from iotueli_sample.loopback import LoopbackBroker, LoopbackConnection  # noqa: E402
+from iotueli_sample.models import (  # noqa: E402
+    ConnectionSettings,
+    VariableAccess,
+    VariableDefinitionModel,
+    VariableStateModel,
+    VariableType,
+)
+from iotueli_sample.multi_consumer import MultiProviderConsumer  # noqa: E402
+from iotueli_sample.payloads import build_variables_changed_event  # noqa: E402
+from iotueli_sample.registry_emulator import RegistryEmulator  # noqa: E402
+from iotueli_sample.provider_app import ProviderApp, ProviderRuntime  # noqa: E402
+from iotueli_sample.subjects import vars_changed_event  # noqa: E402
+
+NO_OAUTH = OAuthCredentials("x", "", "", "", "")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Führt ``async def``-Tests in einer eigenen Event-Loop aus.
+
+    Fixtures mit ``aclose`` (z. B. :class:`Loopback`) werden danach in
+    derselben Loop aufgeräumt.
+    """
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    args = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+
+    async def run():
+        try:
+            await asyncio.wait_for(pyfuncitem.obj(**args), 10)
+        finally:
+            for value in args.values():
+                if hasattr(value, "aclose"):
+                    await value.aclose()
+
+    asyncio.run(run())
+    return True
+
+
+@pytest.fixture
+def definitions() -> list[VariableDefinitionModel]:
+    return [
+        VariableDefinitionModel(1, "a", VariableType.INT64, VariableAccess.READ_WRITE),
+        VariableDefinitionModel(2, "b", VariableType.FLOAT64, VariableAccess.READ_WRITE),
+        VariableDefinitionModel(3, "c", VariableType.STRING, VariableAccess.READ_WRITE),
+        VariableDefinitionModel(4, "d", VariableType.BOOLEAN, VariableAccess.READ_ONLY),
+    ]
+
+
+class Loopback:
+    """Broker samt Providern, Consumern und Verbindungen für einen Test."""
+
+    def __init__(self, definitions: list[VariableDefinitionModel]) -> None:
+        self.broker = LoopbackBroker()
+        self.definitions = definitions
+        self._closers = []
+        self._publisher: LoopbackConnection | None = None
+
+    @staticmethod
+    def settings(provider_id: str = "prov", client_name: str = "test") -> ConnectionSettings:
+        return ConnectionSettings("loopback", 0, provider_id, client_name)
+
+    async def connect(
+        self, name: str = "client", conn: LoopbackConnection | None = None
+    ) -> LoopbackConnection:
+        """Verbindet ``conn`` (Standard: neue Verbindung ``name``) und schließt sie am Ende."""
+        conn = conn or LoopbackConnection(self.broker, name)
+        await conn.connect()
+        self._closers.append(conn.close)
+        return conn
+
+    async def collect(self, subject: str) -> list[bytes]:
+        """Abonniert ``subject`` und sammelt die Payloads."""
+        received: list[bytes] = []
+        conn = await self.connect("sink")
+        await conn.subscribe(subject, callback=lambda msg: received.append(msg.data))
+        return received
+
+    async def publish_changes(
+        self, provider_id: str, states: list[VariableStateModel], fingerprint: int = 0
+    ) -> None:
+        """Sendet ein ``vars.evt.changed``-Event wie ein Provider."""
+        if self._publisher is None:
+            self._publisher = await self.connect("publisher")
+        payload = build_variables_changed_event(self.definitions, states, fingerprint)
+        await self._publisher.publish(vars_changed_event(provider_id), payload)
+
+    async def provider(self, provider_id: str = "prov", **runtime) -> ProviderApp:
+        runtime.setdefault("publish_interval", 100)
+        app = ProviderApp(
+            ProviderRuntime(
+                self.settings(provider_id, provider_id), self.definitions, NO_OAUTH, **runtime
+            ),
+            LoopbackConnection(self.broker, provider_id),
+        )
+        await app.start()
+        self._closers.append(app.stop)
+        return app
+
+    def consumer_runtime(self, provider_id: str = "prov", **runtime) -> ConsumerRuntime:
+        return ConsumerRuntime(
+            self.settings(provider_id, "consumer"), NO_OAUTH, variables=self.definitions, **runtime
+        )
+
+    async def consumer(self, provider_id: str = "prov", **runtime) -> ConsumerApp:
+        app = ConsumerApp(
+            self.consumer_runtime(provider_id, **runtime),
+            LoopbackConnection(self.broker, "consumer"),
+        )
+        await app.start()
+        self._closers.append(app.stop)
+        return app
+
+    async def registry(self) -> RegistryEmulator:
+        registry = RegistryEmulator(LoopbackConnection(self.broker, "registry"))
+        await registry.start()
+        self._closers.append(registry.stop)
+        return registry
+
+    async def multi(self, **options) -> MultiProviderConsumer:
+        app = MultiProviderConsumer(
+            self.consumer_runtime("template"), LoopbackConnection(self.broker, "multi"), **options
+        )
+        await app.start()
+        self._closers.append(app.stop)
+        return app
+
+    async def aclose(self) -> None:
+        while self._closers:
+            await self._closers.pop()()
+
+
+@pytest.fixture
+def loopback(definitions) -> Loopback:
+    return Loopback(definitions)
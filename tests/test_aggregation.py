@@ -0,0 +1,78 @@
+import pytest
+
+from iotueli_sample.aggregation import WindowAggregator
+from iotueli_sample.models import AggregateFunction, VariableStateModel
+
+SECOND = 1_000_000_000
+
+
+def test_panes_start_clean_after_reuse():
+    aggregator = WindowAggregator(
+        window=2,
+        step=1,
+        functions=[AggregateFunction.COUNT, AggregateFunction.MIN, AggregateFunction.MAX],
+    )
+    batches = []
+    aggregator.on_window(batches.append)
+    aggregator.record([VariableStateModel(1, 5.0, timestamp_ns=0)])
+    aggregator.record([VariableStateModel(1, 9, timestamp_ns=SECOND)])
+    aggregator.record([VariableStateModel(2, True, timestamp_ns=2 * SECOND)])
+    aggregator.record([VariableStateModel(1, 1.0, timestamp_ns=3 * SECOND)])
+    aggregator.advance(4 * SECOND)
+
+    rows = [
+        (batch.window_end_ns // SECOND, list(batch.ids), *(list(c) for c in batch.columns.values()))
+        for batch in batches
+    ]
+    assert rows == [
+        (1, [1], [1], [5.0], [5.0]),
+        (2, [1], [2], [5.0], [9.0]),
+        (3, [1, 2], [1, 1], [9.0, 1.0], [9.0, 1.0]),
+        (4, [1, 2], [1, 1], [1.0, 1.0], [1.0, 1.0]),
+    ]
+
+
+def test_strings_are_skipped():
+    aggregator = WindowAggregator(window=1)
+    aggregator.record([VariableStateModel(1, "text", timestamp_ns=0)])
+    assert aggregator.stats.skipped == 1
+
+
+def _late_sample_batches(allowed_lateness):
+    aggregator = WindowAggregator(
+        window=1,
+        functions=[AggregateFunction.COUNT, AggregateFunction.TIME_WEIGHTED_AVERAGE],
+        allowed_lateness=allowed_lateness,
+    )
+    batches = []
+    aggregator.on_window(batches.append)
+    ms = SECOND // 1000
+    aggregator.record([VariableStateModel(1, 1.0, timestamp_ns=200 * ms)])
+    aggregator.record([VariableStateModel(2, 7.0, timestamp_ns=1200 * ms)])
+    # Älter als der Beginn des Intervalls von Variable 2, aber innerhalb der Toleranz.
+    aggregator.record([VariableStateModel(1, 5.0, timestamp_ns=900 * ms)])
+    aggregator.record([VariableStateModel(1, 3.0, timestamp_ns=1400 * ms)])
+    aggregator.advance(2500 * ms)
+    rows = [
+        (batch.window_end_ns // ms, list(batch.ids), *(list(c) for c in batch.columns.values()))
+        for batch in batches
+    ]
+    return rows, aggregator.stats.late
+
+
+def test_allowed_lateness_keeps_panes_open():
+    rows, late = _late_sample_batches(allowed_lateness=0.5)
+    assert late == 0
+    assert rows == [
+        (1000, [1], [2], [pytest.approx((0.7 * 1.0 + 0.1 * 5.0) / 0.8)]),
+        (2000, [1, 2], [1, 1], [pytest.approx((0.4 * 5.0 + 0.6 * 3.0) / 1.0), 7.0]),
+    ]
+
+
+def test_samples_before_the_open_pane_are_late_without_lateness():
+    rows, late = _late_sample_batches(allowed_lateness=0)
+    assert late == 1
+    assert [(end, ids, counts) for end, ids, counts, _ in rows] == [
+        (1000, [1], [1]),
+        (2000, [1, 2], [1, 1]),
+    ]
@@ -0,0 +1,40 @@
+import asyncio
+
+from iotueli_sample.models import VariableStateModel
+
+
+def _state(var_id, value, ts=1):
+    return VariableStateModel(var_id, value, "GOOD", ts)
+
+
+async def test_changes_conflates_per_variable_within_a_batch(loopback):
+    consumer = await loopback.consumer()
+    stream = consumer.changes(max_latency=0.05)
+    first = asyncio.create_task(anext(stream))
+    await asyncio.sleep(0)
+
+    for value in range(3):
+        await loopback.publish_changes("prov", [_state(1, value, value + 1), _state(2, 0.5)])
+    batch = await first
+    await stream.aclose()
+
+    assert [(s.id, s.value) for s in batch] == [(1, 2), (2, 0.5)]
+    assert consumer._streams == []
+
+
+async def test_changes_splits_at_max_batch_and_filters_ids(loopback):
+    consumer = await loopback.consumer()
+    stream = consumer.changes(ids=[1, 2, 3], max_batch=2, max_latency=1.0)
+    first = asyncio.create_task(anext(stream))
+    await asyncio.sleep(0)
+
+    await loopback.publish_changes(
+        "prov", [_state(1, 1), _state(2, 0.5), _state(3, "x"), _state(4, True)]
+    )
+    # Volle Batches kommen ohne die Wartezeit von max_latency.
+    batches = [await asyncio.wait_for(first, 0.5)]
+    await loopback.publish_changes("prov", [_state(1, 2, 2)])
+    batches.append(await asyncio.wait_for(anext(stream), 0.5))
+    await stream.aclose()
+
+    assert [[s.id for s in batch] for batch in batches] == [[1, 2], [3, 1]]
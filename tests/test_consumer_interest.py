@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from iotueli_sample.models import VariableStateModel
+
+
+_VALUES = {1: 7, 2: 1.5, 3: "x", 4: True}
+
+
+def _states(*ids):
+    return [VariableStateModel(i, _VALUES[i], "GOOD", 1) for i in ids]
+
+
+async def test_events_outside_interest_are_not_decoded(loopback):
+    consumer = await loopback.consumer(interest_ids={1})
+    received = []
+    consumer.on_change(lambda changed: received.extend(s.id for s in changed))
+
+    await loopback.publish_changes("prov", _states(1, 2, 3))
+    await asyncio.sleep(0.01)
+
+    assert received == [1]
+    assert [s.id for s in consumer.states] == [1]
+
+
+async def test_snapshot_reads_only_interest(loopback):
+    await loopback.provider()
+    consumer = await loopback.consumer(interest_ids={2})
+
+    snapshot = await consumer.request_snapshot()
+
+    assert [s.id for s in snapshot] == [2]
+
+
+async def test_set_interest_resolves_keys_and_can_be_lifted(loopback):
+    consumer = await loopback.consumer()
+    consumer.set_interest(ids=[1], keys=["c"])
+    assert consumer.interest == {1, 3}
+
+    with pytest.raises(ValueError, match="unbekannt"):
+        consumer.set_interest(keys=["x"])
+    assert consumer.interest == {1, 3}
+
+    consumer.set_interest()
+    await loopback.publish_changes("prov", _states(1, 2, 3, 4))
+    await asyncio.sleep(0.01)
+    assert consumer.interest is None
+    assert sorted(s.id for s in consumer.states) == [1, 2, 3, 4]
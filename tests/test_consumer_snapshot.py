@@ -0,0 +1,37 @@
+import asyncio
+
+from iotueli_sample.models import VariableStateModel
+from iotueli_sample.payloads import build_read_variables_response
+from iotueli_sample.subjects import read_variables_query
+
+
+async def test_events_during_snapshot_are_merged_by_timestamp(loopback):
+    provider = await loopback.connect("provider")
+    release = asyncio.Event()
+
+    async def answer(msg):
+        await release.wait()
+        snapshot = [
+            VariableStateModel(1, 10, "GOOD", 3),
+            VariableStateModel(2, 1.0, "GOOD", 3),
+        ]
+        await msg.respond(build_read_variables_response(loopback.definitions, snapshot, 0))
+
+    await provider.subscribe(read_variables_query("prov"), callback=answer)
+    consumer = await loopback.consumer()
+    received = []
+    consumer.on_change(lambda changed: received.append({s.id: s.value for s in changed}))
+
+    pending = asyncio.create_task(consumer.request_snapshot())
+    await asyncio.sleep(0.01)
+    await loopback.publish_changes(
+        "prov", [VariableStateModel(1, 11, "GOOD", 5), VariableStateModel(2, 0.5, "GOOD", 1)]
+    )
+    await asyncio.sleep(0.01)
+    assert received == []
+
+    release.set()
+    await pending
+
+    assert {s.id: s.value for s in consumer.states} == {1: 11, 2: 1.0}
+    assert received == [{1: 11}]
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+
+async def test_confirmed_write_resolves_when_values_come_back(loopback):
+    await loopback.provider()
+    consumer = await loopback.consumer()
+
+    confirmed = await consumer.write({"a": 5, 2: 1.5}, confirm=True, timeout=1.0)
+    await asyncio.wait_for(confirmed, 1.0)
+
+    values = {s.id: s.value for s in consumer.states}
+    assert (values[1], values[2]) == (5, 1.5)
+
+
+async def test_confirm_rejects_ids_outside_interest(loopback):
+    await loopback.provider()
+    consumer = await loopback.consumer(interest_ids={1})
+    messages = loopback.broker.messages
+
+    with pytest.raises(ValueError, match=r"\[2\]"):
+        await consumer.write({1: 5, 2: 1.5}, confirm=True)
+    assert loopback.broker.messages == messages
+    assert await consumer.write({2: 1.5}) is None
+
+
+async def test_invalid_value_sends_nothing(loopback):
+    await loopback.provider()
+    consumer = await loopback.consumer()
+    messages = loopback.broker.messages
+
+    with pytest.raises((TypeError, ValueError)):
+        await consumer.write({"a": 1, "b": "text"})
+    with pytest.raises(ValueError):
+        await consumer.write({"d": True})
+    assert loopback.broker.messages == messages
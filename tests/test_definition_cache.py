@@ -0,0 +1,42 @@
+import asyncio
+
+from iotueli_sample.definition_cache import DefinitionCache
+from iotueli_sample.models import (
+    VariableAccess,
+    VariableDefinitionModel,
+    VariableStateModel,
+    VariableType,
+)
+from iotueli_sample.payloads import build_provider_definition_event
+
+
+def test_cache_file_round_trip(tmp_path):
+    path = str(tmp_path / "definitions.json")
+    variables = [
+        VariableDefinitionModel(1, "a", VariableType.INT64, VariableAccess.READ_ONLY),
+        VariableDefinitionModel(2, "b", VariableType.STRING, VariableAccess.READ_WRITE, True),
+    ]
+    DefinitionCache(path).put("prov", 42, variables)
+
+    loaded = DefinitionCache(path).get("prov")
+    assert loaded.fingerprint == 42
+    assert loaded.variables == variables
+    assert loaded.by_key["b"].experimental
+
+
+async def test_consumer_reloads_definition_on_new_fingerprint(loopback):
+    await loopback.registry()
+    await loopback.provider()
+    cache = DefinitionCache()
+    stale = [VariableDefinitionModel(1, "a", VariableType.INT64, VariableAccess.READ_ONLY)]
+    cache.put("prov", 1, stale)
+    consumer = await loopback.consumer(definition_cache=cache)
+    assert consumer.definition.fingerprint == 1
+
+    _, fingerprint = build_provider_definition_event(loopback.definitions)
+    await loopback.publish_changes("prov", [VariableStateModel(1, 5, "GOOD", 1)], fingerprint)
+    await asyncio.sleep(0.01)
+
+    assert consumer.definition.fingerprint == fingerprint
+    assert [v.key for v in consumer.definition.variables] == ["a", "b", "c", "d"]
+    assert cache.get("prov", fingerprint) is consumer.definition
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from benchmarks import e2e_benchmark
+from iotueli_sample.benchmarking import latency_summary, make_definitions, parse_type_mix
+from iotueli_sample.models import VariableType
+
+
+def test_definitions_follow_the_type_mix_deterministically():
+    mix = parse_type_mix("int64=2,boolean=1")
+    definitions = make_definitions(6, mix)
+    assert [d.data_type for d in definitions].count(VariableType.INT64) == 4
+    assert definitions == make_definitions(6, mix)
+    with pytest.raises(ValueError):
+        parse_type_mix("int128=1")
+
+
+def test_latency_summary_uses_nearest_rank():
+    summary = latency_summary([i * 1000 for i in range(1, 101)])
+    assert (summary["samples"], summary["p50_us"], summary["p99_us"]) == (100, 50.0, 99.0)
+    assert latency_summary([])["p50_us"] is None
+
+
+def test_loopback_run_reports_throughput_and_latency(tmp_path):
+    output = tmp_path / "result.json"
+    e2e_benchmark.main(
+        [
+            "--variables", "20",
+            "--rate", "50",
+            "--duration", "0.3",
+            "--warmup", "0.1",
+            "--output", str(output),
+        ]
+    )
+    results = json.loads(output.read_text())["results"]
+    assert results["events_per_s"] > 0
+    assert results["variables_per_s"] >= results["events_per_s"]
+    assert results["latency"]["samples"] > 0
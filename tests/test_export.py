@@ -0,0 +1,30 @@
+from iotueli_sample.export import ColumnarExporter, read_columns
+from iotueli_sample.models import VariableStateModel
+from iotueli_sample.payloads import QUALITY_CODES
+
+
+def _rows(exporter):
+    rows = []
+    for chunk in read_columns(exporter.current_path):
+        rows.extend(zip(chunk.ids, chunk.timestamps, chunk.values, chunk.quality))
+    return rows
+
+
+def test_close_without_start_writes_pending_rows(tmp_path):
+    exporter = ColumnarExporter(str(tmp_path), chunk_rows=2, compress=True)
+    exporter.record(
+        [
+            VariableStateModel(1, 1.5, "GOOD", 10),
+            VariableStateModel(2, True, "BAD", 11),
+            VariableStateModel(3, "text", "GOOD", 12),
+            VariableStateModel(1, 7, "uncertain", 13),
+        ]
+    )
+    exporter.close()
+
+    assert exporter.stats.skipped == 1
+    assert _rows(exporter) == [
+        (1, 10, 1.5, QUALITY_CODES["GOOD"]),
+        (2, 11, 1.0, QUALITY_CODES["BAD"]),
+        (1, 13, 7.0, QUALITY_CODES["UNCERTAIN"]),
+    ]
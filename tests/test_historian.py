@@ -0,0 +1,62 @@
+import time
+
+from iotueli_sample.historian import SqliteHistorian
+from iotueli_sample.models import VariableStateModel
+
+HOUR = 3600 * 1_000_000_000
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Bedingung nicht erfüllt"
+        time.sleep(0.01)
+
+
+def test_prune_removes_exactly_the_rows_outside_retention(tmp_path):
+    historian = SqliteHistorian(
+        str(tmp_path / "history.db"), commit_interval=0.01, retention=3600, prune_interval=0.01
+    )
+    historian.start()
+    now = time.time_ns()
+    try:
+        # Drei Commits: zwei komplett abgelaufen, einer innerhalb des Fensters.
+        historian.record("p", [VariableStateModel(1, 1.0, "GOOD", now - 3 * HOUR)])
+        historian.flush()
+        historian.record(
+            "p",
+            [
+                VariableStateModel(1, 2.0, "GOOD", now - 2 * HOUR),
+                VariableStateModel(2, 5, "GOOD", now - 2 * HOUR),
+            ],
+        )
+        historian.flush()
+        historian.record(
+            "p",
+            [
+                VariableStateModel(1, 3.0, "GOOD", now - HOUR // 2),
+                VariableStateModel(2, 6, "GOOD", now),
+            ],
+        )
+        historian.flush()
+        _wait_for(lambda: historian.stats.pruned == 3)
+
+        assert historian.range("p", 1) == [(now - HOUR // 2, 3.0, "GOOD")]
+        assert historian.range("p", 2) == [(now, 6, "GOOD")]
+        assert historian.stats.written == 5
+    finally:
+        historian.close()
+
+
+def test_range_bounds_are_half_open(tmp_path):
+    historian = SqliteHistorian(str(tmp_path / "history.db"), commit_interval=0.01)
+    historian.start()
+    try:
+        historian.record("p", [VariableStateModel(1, float(t), "GOOD", t) for t in range(5)])
+        assert historian.flush(timeout=5.0)
+        assert [row[0] for row in historian.range("p", 1, start_ns=1, end_ns=3)] == [1, 2]
+        assert historian.range("p", 1, limit=1) == [(0, 0.0, "GOOD")]
+        assert historian.latest("p", 1) == (4, 4.0, "GOOD")
+        assert historian.range("other", 1) == []
+    finally:
+        historian.close()
@@ -0,0 +1,59 @@
+import pytest
+
+from iotueli_sample.history import HistoryStore, SeriesBuffer
+from iotueli_sample.models import VariableStateModel
+
+
+def _filled(capacity, timestamps):
+    buffer = SeriesBuffer(capacity)
+    for ts in timestamps:
+        buffer.append(ts, float(ts))
+    return buffer
+
+
+def test_ring_wraps_around_and_keeps_the_newest_points():
+    buffer = _filled(4, range(10, 70, 10))
+
+    times, values = buffer.last(10)
+    assert list(times) == [30, 40, 50, 60]
+    assert list(values) == [30.0, 40.0, 50.0, 60.0]
+    assert list(buffer.last(2)[0]) == [50, 60]
+    assert not buffer.append(55, 1.0)
+    assert len(buffer) == 4
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        (None, None, [30, 40, 50, 60]),
+        (40, 60, [40, 50]),
+        (41, 60, [50]),
+        (40, 61, [40, 50, 60]),
+        (0, 30, []),
+        (61, None, []),
+        (50, 50, []),
+    ],
+)
+def test_range_is_half_open_across_the_wrap(start, end, expected):
+    # Kapazität 4, sechs Werte: die logischen Positionen liegen über das Array-Ende verteilt.
+    buffer = _filled(4, range(10, 70, 10))
+    assert list(buffer.range(start, end)[0]) == expected
+
+
+def test_eviction_drops_the_least_recently_queried_series_and_does_not_churn():
+    history = HistoryStore(capacity_per_variable=2, max_points=4)
+    history.record([VariableStateModel(1, 1.0, "GOOD", 1), VariableStateModel(2, 2.0, "GOOD", 1)])
+    history.last(1, 1)
+    history.record([VariableStateModel(3, 3.0, "GOOD", 2)])
+    assert (1 in history, 2 in history, 3 in history) == (True, False, True)
+
+    # Die verdrängte Variable 2 verdrängt ihrerseits niemanden.
+    history.record([VariableStateModel(2, 2.5, "GOOD", 3)])
+    assert (1 in history, 2 in history, 3 in history) == (True, False, True)
+    assert (history.stats.evicted_series, history.stats.rejected) == (1, 1)
+
+    # Nach einer Abfrage wird sie wieder angelegt, auf Kosten der ältesten Abfrage.
+    assert len(history.range(2)[0]) == 0
+    history.record([VariableStateModel(2, 2.5, "GOOD", 4)])
+    assert (1 in history, 2 in history, 3 in history) == (False, True, True)
+    assert list(history.range(2)[1]) == [2.5]
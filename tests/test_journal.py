@@ -0,0 +1,118 @@
+import pytest
+
+from iotueli_sample.journal import StoreAndForwardJournal
+
+# 10 Bytes Kopf + 1 Byte Subject + 20 Bytes Payload
+RECORD_SIZE = 31
+
+
+def _payload(i: int) -> bytes:
+    return bytes([i]) * 20
+
+
+def _drain(journal):
+    records = []
+    while (record := journal.peek()) is not None:
+        records.append(record)
+        journal.pop()
+    return records
+
+
+def test_records_survive_reopen_in_order(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = StoreAndForwardJournal(path, capacity=256)
+    for i in range(3):
+        journal.append("s", _payload(i))
+    journal.close()
+
+    journal = StoreAndForwardJournal(path, capacity=4096)
+    assert journal.capacity == 256
+    assert len(journal) == journal.stats.pending == 3
+    assert _drain(journal) == [("s", _payload(i)) for i in range(3)]
+    assert len(journal) == 0
+    journal.close()
+
+
+# 100: Rest vor dem Umbruch zu klein für einen Umbruch-Marker, 110: mit Marker.
+@pytest.mark.parametrize("capacity", [100, 110])
+def test_wrap_around_keeps_order(tmp_path, capacity):
+    path = str(tmp_path / "journal")
+    journal = StoreAndForwardJournal(path, capacity=capacity)
+    for i in range(3):
+        journal.append("s", _payload(i))
+    journal.pop()
+    journal.pop()
+    journal.append("s", _payload(3))
+    journal.append("s", _payload(4))
+    assert journal.stats.dropped == 0
+    journal.close()
+
+    journal = StoreAndForwardJournal(path)
+    assert _drain(journal) == [("s", _payload(i)) for i in (2, 3, 4)]
+    journal.close()
+
+
+def test_full_journal_drops_oldest(tmp_path):
+    journal = StoreAndForwardJournal(str(tmp_path / "journal"), capacity=3 * RECORD_SIZE)
+    for i in range(4):
+        journal.append("s", _payload(i))
+    assert journal.stats.dropped == 1
+    assert _drain(journal) == [("s", _payload(i)) for i in (1, 2, 3)]
+    journal.close()
+
+
+def test_oversized_record_is_rejected(tmp_path):
+    journal = StoreAndForwardJournal(str(tmp_path / "journal"), capacity=2 * RECORD_SIZE - 1)
+    with pytest.raises(ValueError):
+        journal.append("s", _payload(0))
+    assert len(journal) == 0
+    journal.close()
+
+
+def test_corrupt_record_discards_rest(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = StoreAndForwardJournal(path, capacity=256)
+    journal.append("s", _payload(0))
+    journal.append("s", _payload(1))
+    journal.close()
+    with open(path, "r+b") as handle:
+        handle.seek(64 + RECORD_SIZE - 1)
+        handle.write(b"\xff")
+
+    journal = StoreAndForwardJournal(path)
+    assert journal.peek() is None
+    assert len(journal) == 0
+    assert journal.stats.dropped == 2
+    journal.close()
+
+
+def test_large_records_survive_wrap_and_reopen(tmp_path):
+    path = str(tmp_path / "journal")
+    payload = b"x" * 300_000
+    journal = StoreAndForwardJournal(path, 1 << 20, flush_every=0)
+    for i in range(3):
+        journal.append("s", bytes([i]) + payload)
+    journal.flush()
+    journal.pop()
+    journal.pop()
+    # Umbruch: Marker am Ende, Datensatz wieder am Anfang der Daten.
+    journal.append("s", bytes([3]) + payload)
+    journal.close()
+
+    journal = StoreAndForwardJournal(path)
+    assert _drain(journal) == [("s", bytes([i]) + payload) for i in (2, 3)]
+    journal.close()
+
+
+def test_popped_records_are_not_replayed_without_close(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = StoreAndForwardJournal(path, capacity=256)
+    for i in range(3):
+        journal.append("s", _payload(i))
+    journal.pop()
+
+    # Zweite Abbildung derselben Datei, als wäre der Prozess ohne close abgestürzt.
+    reopened = StoreAndForwardJournal(path)
+    assert _drain(reopened) == [("s", _payload(i)) for i in (1, 2)]
+    reopened.close()
+    journal.close()
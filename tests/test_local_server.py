@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+from iotueli_sample.local_server import LocalNatsServer
+
+
+async def _open(server, **options):
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    info = json.loads((await reader.readline())[len(b"INFO ") :])
+    connect = {"verbose": False, "headers": True, "no_responders": True, **options}
+    writer.write(b"CONNECT " + json.dumps(connect).encode() + b"\r\nPING\r\n")
+    return reader, writer, info
+
+
+async def test_socket_round_trip_with_token_wildcards_and_no_responders():
+    async with LocalNatsServer(port=0, token="secret") as server:
+        reader, writer, info = await _open(server, auth_token="secret")
+        assert info["auth_required"]
+        assert await reader.readline() == b"PONG\r\n"
+
+        writer.write(b"SUB v1.loc.*.vars.evt.changed 1\r\n")
+        writer.write(b"PUB v1.loc.prov.vars.evt.changed 5\r\nhello\r\n")
+        assert await reader.readline() == b"MSG v1.loc.prov.vars.evt.changed 1 5\r\n"
+        assert await reader.readline() == b"hello\r\n"
+
+        writer.write(b"SUB _INBOX.abc.* 2\r\n")
+        for token in (b"1", b"2"):
+            writer.write(b"PUB v1.loc.prov.vars.qry.read _INBOX.abc.%s 0\r\n\r\n" % token)
+            header = b"NATS/1.0 503\r\n\r\n"
+            assert await reader.readline() == b"HMSG _INBOX.abc.%s 2 %d %d\r\n" % (
+                token,
+                len(header),
+                len(header),
+            )
+            assert await reader.readexactly(len(header) + 2) == header + b"\r\n"
+        assert server.stats.msgs_out == 3
+        writer.close()
+
+
+async def test_wrong_token_is_rejected():
+    async with LocalNatsServer(port=0, token="secret") as server:
+        reader, writer, _ = await _open(server, auth_token="wrong")
+        assert await reader.readline() == b"-ERR 'Authorization Violation'\r\n"
+        writer.close()
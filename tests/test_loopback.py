@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from nats.errors import TimeoutError as NatsTimeoutError
+
+from iotueli_sample.loopback import LoopbackConnection
+
+
+async def test_subscribe_does_not_undo_simulated_disconnect(loopback):
+    conn = await loopback.connect("a")
+    reconnected = []
+    conn.on_reconnected(lambda: reconnected.append(True))
+    received = []
+    await conn.subscribe("x", callback=lambda msg: received.append(msg.data))
+
+    await conn.simulate_disconnect()
+    await conn.publish("x", b"buffered")
+    await conn.subscribe("y")
+    assert not conn.is_connected
+    assert received == []
+
+    await conn.simulate_reconnect()
+    await asyncio.sleep(0.01)
+    assert received == [b"buffered"]
+    assert reconnected == [True]
+
+
+async def test_request_waits_for_simulated_reconnect(loopback):
+    responder = await loopback.connect("responder")
+    await responder.subscribe("q", callback=lambda msg: msg.respond(b"pong"))
+    conn = await loopback.connect("a")
+    await conn.simulate_disconnect()
+
+    with pytest.raises(NatsTimeoutError):
+        await conn.request("q", b"ping", timeout=0.05)
+    assert not conn.is_connected
+
+    pending = asyncio.create_task(conn.request("q", b"ping", timeout=1.0))
+    await asyncio.sleep(0.01)
+    assert not pending.done()
+    await conn.simulate_reconnect()
+    assert (await pending).data == b"pong"
+
+
+async def test_request_survives_concurrent_close(loopback):
+    responder = await loopback.connect("responder")
+    await responder.subscribe("q", callback=lambda msg: None)
+    conn = LoopbackConnection(loopback.broker, "a")
+    pending = asyncio.create_task(conn.request("q", b"ping", timeout=0.1))
+    await asyncio.sleep(0.01)
+    await conn.close()
+    with pytest.raises(NatsTimeoutError):
+        await pending
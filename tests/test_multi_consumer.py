@@ -0,0 +1,48 @@
+import asyncio
+
+from iotueli_sample.models import VariableStateModel
+
+
+async def test_changes_spans_providers(loopback):
+    multi = await loopback.multi(snapshot_on_discovery=False)
+    received = []
+
+    async def collect():
+        async for provider_id, batch in multi.changes(max_latency=0.01):
+            received.append((provider_id, [(s.id, s.value) for s in batch]))
+            if len(received) == 2:
+                return
+
+    collector = asyncio.create_task(collect())
+    await asyncio.sleep(0)
+    await loopback.publish_changes("p1", [VariableStateModel(1, 10, "GOOD", 1)])
+    await asyncio.sleep(0.05)
+    await loopback.publish_changes("p2", [VariableStateModel(2, 2.5, "GOOD", 1)])
+    await asyncio.wait_for(collector, 1.0)
+
+    assert received == [("p1", [(1, 10)]), ("p2", [(2, 2.5)])]
+    assert [(s.id, s.value) for s in multi.provider("p1").states] == [(1, 10)]
+
+
+async def test_slow_reader_gets_conflated_batches_from_every_provider(loopback):
+    multi = await loopback.multi(snapshot_on_discovery=False)
+    changes = multi.changes(max_latency=0)
+    first = asyncio.ensure_future(changes.__anext__())
+    await asyncio.sleep(0)
+    for value in range(3):
+        for provider_id in ("p1", "p2", "p3"):
+            await loopback.publish_changes(provider_id, [VariableStateModel(1, value, "GOOD", 1)])
+        await asyncio.sleep(0.01)
+
+    latest = {}
+    batches = 0
+    pending = first
+    while latest != {"p1": 2, "p2": 2, "p3": 2}:
+        provider_id, batch = await asyncio.wait_for(pending, 1.0)
+        latest[provider_id] = batch[-1].value
+        batches += 1
+        pending = changes.__anext__()
+    await changes.aclose()
+
+    assert batches < 9
+    assert "_pump" not in {task.get_coro().__name__ for task in asyncio.all_tasks()}
@@ -0,0 +1,32 @@
+import json
+
+from benchmarks import payload_benchmark
+
+
+def test_every_case_runs_for_every_mix():
+    for mix in payload_benchmark.MIXES:
+        for fn, payload_size in payload_benchmark.build_cases(10, mix, 64).values():
+            fn()
+            assert payload_size >= 0
+
+
+def test_count_allocations_sees_temporaries():
+    assert payload_benchmark.count_allocations(lambda: [object() for _ in range(100)]) >= 100
+
+
+def test_json_report_can_serve_as_baseline(tmp_path, capsys):
+    first = tmp_path / "first.json"
+    args = ["--sizes", "10", "--mixes", "mixed", "--min-time", "0.001"]
+    payload_benchmark.main([*args, "--json", str(first)])
+    rows = json.loads(first.read_text())["results"]
+    assert {row["function"] for row in rows} >= {
+        "build_variables_changed_event",
+        "decode_write_command",
+    }
+    assert all(row["variables"] == 10 and row["ns_per_var"] > 0 for row in rows)
+
+    capsys.readouterr()
+    payload_benchmark.main([*args, "--functions", "decode_write", "--baseline", str(first)])
+    lines = capsys.readouterr().out.splitlines()
+    assert "vs. Baseline" in lines[0]
+    assert len(lines) == 2 and lines[1].rstrip().endswith("x")
@@ -0,0 +1,28 @@
+import pytest
+
+import provider_cli
+from iotueli_sample.definition_cache import DefinitionCache
+from iotueli_sample.models import VariableAccess, VariableDefinitionModel, VariableType
+from iotueli_sample.subjects import write_variables_command
+from weidmueller.ucontrol.hub.WriteVariablesCommand import WriteVariablesCommand
+
+
+@pytest.fixture
+def definitions():
+    return [VariableDefinitionModel(5, "a", VariableType.INT64, VariableAccess.READ_WRITE)]
+
+
+async def test_write_refetches_a_stale_cached_definition(loopback, definitions):
+    await loopback.registry()
+    provider = await loopback.provider()
+    writes = await loopback.collect(write_variables_command("prov"))
+    cache = DefinitionCache()
+    stale = VariableDefinitionModel(1, "a", VariableType.INT64, VariableAccess.READ_WRITE)
+    cache.put("prov", 123, [stale])
+
+    await provider_cli.write_value(await loopback.connect("cli"), "prov", "a", None, "7", cache)
+
+    command = WriteVariablesCommand.GetRootAsWriteVariablesCommand(writes[0], 0).Variables()
+    assert command.Items(0).Id() == 5
+    assert command.ProviderDefinitionFingerprint() == provider._fingerprint
+    assert cache.get("prov").fingerprint == provider._fingerprint
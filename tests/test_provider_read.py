@@ -0,0 +1,28 @@
+from iotueli_sample.payloads import build_read_variables_query
+from iotueli_sample.subjects import read_variables_query
+from weidmueller.ucontrol.hub.ReadVariablesQueryResponse import ReadVariablesQueryResponse
+
+
+async def _read_ids(conn, ids):
+    msg = await conn.request(
+        read_variables_query("prov"), build_read_variables_query(ids), timeout=1.0
+    )
+    items = ReadVariablesQueryResponse.GetRootAsReadVariablesQueryResponse(msg.data, 0).Variables()
+    return [items.Items(i).Id() for i in range(items.ItemsLength())]
+
+
+async def test_large_reads_are_encoded_off_the_event_loop(loopback):
+    provider = await loopback.provider(read_offload_threshold=3)
+    conn = await loopback.connect()
+
+    assert await _read_ids(conn, None) == [1, 2, 3, 4]
+    assert await _read_ids(conn, [2]) == [2]
+
+    stats = provider.metrics.read_encode
+    assert (stats.offloaded_count, stats.inline_count) == (1, 1)
+
+
+async def test_offloading_can_be_disabled(loopback):
+    provider = await loopback.provider(read_offload_threshold=None)
+    assert await _read_ids(await loopback.connect(), None) == [1, 2, 3, 4]
+    assert provider.metrics.read_encode.offloaded_count == 0
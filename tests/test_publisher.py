@@ -0,0 +1,106 @@
+import asyncio
+
+from iotueli_sample.journal import StoreAndForwardJournal
+from iotueli_sample.loopback import LoopbackConnection
+from iotueli_sample.models import OverflowPolicy, VariableStateModel
+from iotueli_sample.publisher import PublishQueue, Publisher
+
+
+def _encode(states):
+    return b",".join(str(s.id).encode() for s in states)
+
+
+def _states(*ids):
+    return [VariableStateModel(i, i, "GOOD", i) for i in ids]
+
+
+class _FlakyConnection(LoopbackConnection):
+    def __init__(self, broker, failures):
+        super().__init__(broker, "flaky")
+        self.failures = failures
+
+    async def publish(self, subject, payload, reply_to=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("simuliert")
+        await super().publish(subject, payload, reply_to)
+
+
+async def test_marker_resolves_after_preceding_entries_are_sent(loopback):
+    received = await loopback.collect("s")
+    queue = PublishQueue()
+    await queue.put_states("s", _states(1, 2))
+    marker = queue.put_marker()
+    assert not marker.done()
+
+    publisher = Publisher(await loopback.connect("pub"), queue, _encode)
+    publisher.start()
+    assert await asyncio.wait_for(marker, 1.0) is not None
+    await asyncio.sleep(0.01)
+    await publisher.stop()
+    assert received == [b"1,2"]
+
+
+async def test_marker_reports_dropped_entries():
+    queue = PublishQueue(maxsize=1, policy=OverflowPolicy.DROP_OLDEST)
+    await queue.put_payload("s", b"a")
+    marker = queue.put_marker()
+    await queue.put_payload("s", b"b")
+    assert marker.result() is None
+
+
+async def test_stop_cancels_pending_markers(loopback):
+    queue = PublishQueue()
+    await queue.put_payload("s", b"a")
+    marker = queue.put_marker()
+    publisher = Publisher(LoopbackConnection(loopback.broker, "pub"), queue, _encode)
+    publisher.start()
+    await asyncio.sleep(0.01)
+    await publisher.stop()
+    assert marker.cancelled()
+
+
+async def test_publish_errors_are_retried_and_the_loop_keeps_running(loopback):
+    received = await loopback.collect("s")
+    conn = await loopback.connect(conn=_FlakyConnection(loopback.broker, failures=4))
+    queue = PublishQueue(policy=OverflowPolicy.DROP_OLDEST)
+    publisher = Publisher(conn, queue, _encode, reconnect_poll_interval=0.001)
+    publisher.start()
+    await queue.put_payload("s", b"lost")
+    await queue.put_payload("s", b"retried")
+    await queue.put_payload("s", b"next")
+    await asyncio.wait_for(queue.put_marker(), 1.0)
+    await asyncio.sleep(0.01)
+    assert not publisher._task.done()
+    await publisher.stop()
+
+    stats = queue.stats
+    assert received == [b"retried", b"next"]
+    assert (stats.send_errors, stats.dropped, stats.published) == (4, 1, 2)
+
+
+async def test_failed_publish_goes_to_the_journal(loopback, tmp_path):
+    received = await loopback.collect("s")
+    conn = await loopback.connect(conn=_FlakyConnection(loopback.broker, failures=2))
+    queue = PublishQueue(policy=OverflowPolicy.DROP_OLDEST)
+    journal = StoreAndForwardJournal(str(tmp_path / "journal"), capacity=4096)
+    publisher = Publisher(conn, queue, _encode, reconnect_poll_interval=0.001, journal=journal)
+    publisher.start()
+    await queue.put_payload("s", b"a")
+    await queue.put_payload("s", b"b")
+    await asyncio.wait_for(queue.put_marker(), 1.0)
+    await publisher.stop()
+    journal.close()
+
+    assert received == [b"a", b"b"]
+    assert journal.stats.dropped == 0
+
+
+async def test_conflated_payload_moves_behind_newer_entries():
+    queue = PublishQueue(policy=OverflowPolicy.CONFLATE)
+    await queue.put_payload("s", b"full-1", key=0)
+    await queue.put_payload("s", b"delta")
+    await queue.put_payload("s", b"full-2", key=0)
+
+    assert [queue.get_nowait()[1] for _ in range(len(queue))] == [b"delta", b"full-2"]
+    assert queue.stats.conflated == 1
@@ -0,0 +1,41 @@
+import asyncio
+
+from iotueli_sample.definition_cache import DefinitionCache
+from iotueli_sample.models import VariableAccess, VariableDefinitionModel, VariableType
+from iotueli_sample.payloads import build_provider_definition_event
+from iotueli_sample.subjects import provider_changed_event, registry_providers_query
+from weidmueller.ucontrol.hub.ProviderDefinitionState import ProviderDefinitionState
+from weidmueller.ucontrol.hub.ReadProvidersQueryResponse import ReadProvidersQueryResponse
+
+
+async def test_valid_definition_is_ok_and_served(loopback):
+    registry = await loopback.registry()
+    await loopback.provider()
+    conn = await loopback.connect()
+    await asyncio.sleep(0.01)
+
+    assert registry.definitions["prov"].state == ProviderDefinitionState.OK
+    definition = await DefinitionCache().resolve(conn, "prov")
+    assert [v.key for v in definition.variables] == ["a", "b", "c", "d"]
+
+    msg = await conn.request(registry_providers_query(), b"", timeout=1.0)
+    providers = ReadProvidersQueryResponse.GetRootAsReadProvidersQueryResponse(msg.data, 0)
+    items = providers.Providers()
+    assert [items.Items(i).Id().decode() for i in range(items.ItemsLength())] == ["prov"]
+
+
+async def test_duplicate_keys_mark_the_definition_invalid(loopback):
+    registry = await loopback.registry()
+    conn = await loopback.connect()
+    duplicate = [
+        VariableDefinitionModel(1, "a", VariableType.INT64, VariableAccess.READ_WRITE),
+        VariableDefinitionModel(2, "a", VariableType.FLOAT64, VariableAccess.READ_ONLY),
+    ]
+    payload, _ = build_provider_definition_event(duplicate)
+    await conn.publish(provider_changed_event("bad"), payload)
+    await asyncio.sleep(0.01)
+
+    definition = registry.definitions["bad"]
+    assert definition.state == ProviderDefinitionState.INVALID
+    assert definition.variableDefinitions == []
+    assert (registry.stats.definitions_received, registry.stats.definitions_invalid) == (1, 1)
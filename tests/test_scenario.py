@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from iotueli_sample.scenario import (
+    STEP_DISCONNECT,
+    STEP_EVENT,
+    STEP_RECONNECT,
+    STEP_WRITE,
+    ScenarioPlayer,
+    play_scenario,
+    scenario_digest,
+    scenario_from_dict,
+)
+
+SECOND = 1_000_000_000
+SPEC = {
+    "seed": 3,
+    "duration": 2,
+    "tick_interval": 0.1,
+    "change_ratio": 0.5,
+    "variables": {"count": 20, "type_mix": "int64=1,float64=1,string=1,boolean=1"},
+    "profiles": [{"data_type": "int64", "profile": "random-walk", "step": 2}],
+    "events": [
+        {"type": "burst", "at": 0.5, "duration": 0.3, "rate_multiplier": 4},
+        {"type": "write_storm", "at": 1.0, "duration": 0.5, "rate": 10, "data_type": "float64"},
+        {"type": "disconnect", "at": 1.2, "duration": 0.4},
+    ],
+}
+
+
+def _steps(spec=SPEC):
+    steps = ScenarioPlayer(scenario_from_dict(spec), "prov").steps()
+    return [(s.offset_ns, s.kind, s.subject, s.payload) for s in steps]
+
+
+def test_two_runs_are_byte_identical():
+    assert _steps() == _steps()
+    assert scenario_digest(scenario_from_dict(SPEC), "prov") == scenario_digest(
+        scenario_from_dict(SPEC), "prov"
+    )
+    assert _steps({**SPEC, "seed": 4}) != _steps()
+
+
+def test_timeline_contains_writes_and_connection_drops_in_their_windows():
+    steps = _steps()
+    offsets = [offset for offset, *_ in steps]
+    assert offsets == sorted(offsets)
+    writes = [offset for offset, kind, *_ in steps if kind == STEP_WRITE]
+    assert writes and all(SECOND <= offset < 1.5 * SECOND for offset in writes)
+    drops = [
+        (offset, kind) for offset, kind, *_ in steps if kind in (STEP_DISCONNECT, STEP_RECONNECT)
+    ]
+    assert drops == [(1.2 * SECOND, STEP_DISCONNECT), (1.6 * SECOND, STEP_RECONNECT)]
+
+
+def test_unknown_event_type_is_rejected():
+    with pytest.raises(ValueError, match="explode"):
+        scenario_from_dict({**SPEC, "events": [{"type": "explode", "at": 0}]})
+
+
+async def test_play_publishes_every_event(loopback):
+    received = await loopback.collect("v1.loc.prov.vars.evt.changed")
+    player = ScenarioPlayer(scenario_from_dict(SPEC), "prov")
+    published = await play_scenario(await loopback.connect("player"), player, speed=0)
+    await asyncio.sleep(0.01)
+
+    events = [payload for _, kind, _, payload in _steps() if kind == STEP_EVENT]
+    assert published == len(events)
+    assert received == events
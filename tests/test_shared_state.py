@@ -0,0 +1,98 @@
+import math
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from iotueli_sample.models import VariableAccess, VariableDefinitionModel, VariableType
+from iotueli_sample.shared_state import SharedStateTable
+
+DEFINITIONS = [
+    VariableDefinitionModel(1, "test.int", VariableType.INT64, VariableAccess.READ_WRITE),
+    VariableDefinitionModel(2, "test.float", VariableType.FLOAT64, VariableAccess.READ_WRITE),
+    VariableDefinitionModel(3, "test.string", VariableType.STRING, VariableAccess.READ_WRITE),
+]
+
+
+@pytest.fixture
+def table():
+    table = SharedStateTable.create(DEFINITIONS, string_slot_size=32)
+    yield table
+    table.close()
+
+
+def _read_with_timeout(table, slot, timeout=1.0):
+    result = []
+    reader = threading.Thread(target=lambda: result.append(table.read_state(slot)), daemon=True)
+    reader.start()
+    reader.join(timeout)
+    assert not reader.is_alive(), "read_state hängt nach fehlgeschlagenem Schreiben"
+    return result[0]
+
+
+@pytest.mark.parametrize(
+    "slot, value, error",
+    [
+        (0, "abc", ValueError),
+        (0, math.inf, OverflowError),
+        (0, math.nan, ValueError),
+        (0, 2**63, ValueError),
+        (1, "abc", ValueError),
+        (2, "x" * 33, ValueError),
+    ],
+)
+def test_failed_write_keeps_slot_readable(table, slot, value, error):
+    table.write(slot, 7 if slot != 2 else "ok", 10)
+    with pytest.raises(error):
+        table.write(slot, value, 11)
+    state = _read_with_timeout(table, slot)
+    assert state.timestamp_ns == 10
+    assert state.value == (7 if slot != 2 else "ok")
+
+
+def test_attach_by_name_reads_definitions(table):
+    table.write(0, 42, 5, "BAD")
+    reader = SharedStateTable.attach(table.name, track=False)
+    try:
+        assert [var.key for var in reader.definitions] == [var.key for var in DEFINITIONS]
+        state = reader.read_state(0)
+        assert (state.value, state.timestamp_ns, state.quality) == (42, 5, "BAD")
+    finally:
+        reader.close()
+
+
+def _write_loop(name: str, duration: float) -> None:
+    # Per fork abgeleitet: teilt den resource_tracker mit dem Erzeuger.
+    table = SharedStateTable.attach(name)
+    deadline = time.monotonic() + duration
+    i = 0
+    while time.monotonic() < deadline:
+        i += 1
+        table.write(0, i, i)
+        table.write(2, str(i) * (i % 4 + 1), i)
+        table.bump_generation()
+    table.close()
+
+
+def test_concurrent_reads_are_consistent(table):
+    table.write(0, 0, 0)
+    table.write(2, "0", 0)
+    writer = multiprocessing.get_context("fork").Process(
+        target=_write_loop, args=(table.name, 0.5)
+    )
+    writer.start()
+    reads = 0
+    try:
+        while writer.is_alive():
+            number = table.read_state(0)
+            text = table.read_state(2)
+            assert number.value == number.timestamp_ns
+            i = text.timestamp_ns
+            assert text.value == str(i) * (i % 4 + 1 if i else 1)
+            reads += 1
+    finally:
+        writer.join()
+    assert writer.exitcode == 0
+    assert reads > 0
+    assert table.generation > 0
@@ -0,0 +1,61 @@
+import pytest
+
+from iotueli_sample.models import (
+    VariableAccess,
+    VariableDefinitionModel,
+    VariableType,
+    Waveform,
+    WaveformProfile,
+)
+from iotueli_sample.simulation import STRING_STATES
+
+pytest.importorskip("numpy")
+
+from iotueli_sample.vector_simulation import VectorSimulationEngine  # noqa: E402
+
+DEFINITIONS = [
+    VariableDefinitionModel(1, "a", VariableType.INT64, VariableAccess.READ_WRITE),
+    VariableDefinitionModel(2, "b", VariableType.FLOAT64, VariableAccess.READ_WRITE),
+    VariableDefinitionModel(3, "c", VariableType.STRING, VariableAccess.READ_WRITE),
+    VariableDefinitionModel(4, "d", VariableType.BOOLEAN, VariableAccess.READ_ONLY),
+    VariableDefinitionModel(5, "static_message", VariableType.STRING, VariableAccess.READ_ONLY),
+]
+
+
+def _engine(**options):
+    return VectorSimulationEngine(DEFINITIONS, seed=7, clock=lambda: 42, **options)
+
+
+def _run(engine, ticks):
+    return [[(s.id, s.value) for s in engine.advance()] for _ in range(ticks)]
+
+
+def test_same_seed_gives_the_same_run():
+    walk = Waveform(WaveformProfile.RANDOM_WALK, step=3.0)
+    assert _run(_engine(default_waveform=walk), 20) == _run(_engine(default_waveform=walk), 20)
+
+
+def test_values_have_python_types_matching_the_definition():
+    engine = _engine(default_waveform=Waveform(WaveformProfile.SINE, amplitude=5, offset=20))
+    _run(engine, 10)
+    values = {s.id: s.value for s in engine.states}
+    assert type(values[1]) is int and 15 <= values[1] <= 25
+    assert type(values[2]) is float and 15.0 <= values[2] <= 25.0
+    assert values[3] in STRING_STATES
+    assert type(values[4]) is bool
+    assert values[5] == "Hello from IoTUeli"
+    assert all(s.timestamp_ns == 42 for s in engine.states if s.id != 5)
+
+
+def test_zero_change_probability_changes_nothing():
+    engine = _engine(change_probability=0.0)
+    assert _run(engine, 5) == [[]] * 5
+
+
+def test_write_updates_the_state():
+    engine = _engine(default_waveform=Waveform(WaveformProfile.CONSTANT, offset=1.0))
+    _run(engine, 1)
+    assert engine.write(2, 9.5).value == 9.5
+    assert engine.write(3, "manual").value == "manual"
+    assert engine.write(99, 1) is None
+    assert {s.id: s.value for s in engine.states}[2] == 9.5
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+# Sample by IoTUeli – https://iotueli.com | LinkedIn: iotueli
+
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+
+SRC_PATH = pathlib.Path(__file__).resolve().parent / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from iotueli_sample.capture import CaptureReader, CaptureWriter, TrafficRecorder, replay_capture
+from iotueli_sample.nats_client import NatsConnection
+from provider_cli import open_connection
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Data-Hub-Verkehr aufzeichnen und wieder abspielen"
+    )
+    parser.add_argument("--host", default=None, help="Host des NATS-Servers (mit --token)")
+    parser.add_argument("--port", type=int, default=4222, help="Port des NATS-Servers (mit --token)")
+    parser.add_argument(
+        "--token",
+        default=None,
+        help="Token für einen lokalen NATS-Server; ohne Token wird wie bei provider_cli "
+        "ein OAuth-Token für das Gerät aus config.py geholt",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="Nachrichten in eine Capture-Datei schreiben")
+    record.add_argument("file", help="Capture-Datei")
+    record.add_argument(
+        "--subject",
+        action="append",
+        help="Subject(s) zum Mitschneiden, mehrfach möglich (Standard: v1.loc.>)",
+    )
+    record.add_argument("--duration", type=float, help="Nach N Sekunden automatisch beenden")
+
+    replay = sub.add_parser("replay", help="Capture-Datei erneut publizieren")
+    replay.add_argument("file", help="Capture-Datei")
+    replay.add_argument(
+        "--speed", type=float, default=1.0, help="Faktor auf die Originalzeit, 0 = so schnell wie möglich"
+    )
+    replay.add_argument("--start", type=float, default=0.0, help="Ab Sekunde N der Aufnahme")
+    replay.add_argument("--end", type=float, help="Bis Sekunde N der Aufnahme")
+    replay.add_argument("--loops", type=int, default=1, help="Anzahl Durchläufe")
+
+    info = sub.add_parser("info", help="Kennzahlen einer Capture-Datei anzeigen")
+    info.add_argument("file", help="Capture-Datei")
+    return parser.parse_args()
+
+
+async def connect(args) -> NatsConnection:
+    if args.token is None:
+        return await open_connection("capture")
+    conn = NatsConnection(args.host or "127.0.0.1", args.port, "traffic-capture", args.token)
+    await conn.connect()
+    return conn
+
+
+async def record(args) -> None:
+    conn = await connect(args)
+    writer = CaptureWriter(args.file)
+    recorder = TrafficRecorder(conn, writer, args.subject or ["v1.loc.>"])
+    await recorder.start()
+    print(f"Zeichne {', '.join(recorder.subjects)} in {args.file} auf – Strg+C zum Beenden.")
+    try:
+        if args.duration:
+            await asyncio.sleep(args.duration)
+        else:
+            while True:
+                await asyncio.sleep(3600)
+    finally:
+        await recorder.stop()
+        await conn.close()
+        writer.close()
+        print(f"{writer.stats.records} Nachrichten ({writer.stats.bytes} Bytes) aufgezeichnet")
+
+
+async def replay(args) -> None:
+    with CaptureReader(args.file) as reader:
+        if not len(reader):
+            print("Capture-Datei ist leer")
+            return
+        first = reader.start_time_ns
+        start = reader.position_at(first + int(args.start * 1_000_000_000))
+        stop = None
+        if args.end is not None:
+            stop = reader.position_at(first + int(args.end * 1_000_000_000))
+        conn = await connect(args)
+        try:
+            for loop in range(args.loops):
+                started = time.perf_counter()
+                count = await replay_capture(conn, reader, args.speed, start, stop)
+                await conn.flush()
+                elapsed = time.perf_counter() - started
+                rate = count / elapsed if elapsed > 0 else 0.0
+                print(f"Durchlauf {loop + 1}: {count} Nachrichten in {elapsed:.2f} s ({rate:.0f}/s)")
+        finally:
+            await conn.close()
+
+
+def info(args) -> None:
+    with CaptureReader(args.file) as reader:
+        count = len(reader)
+        print(f"Datei:       {args.file}")
+        print(f"Nachrichten: {count}")
+        if not count:
+            return
+        span = (reader.end_time_ns - reader.start_time_ns) / 1_000_000_000
+        subjects: dict[str, int] = {}
+        for record in reader:
+            subjects[record.subject] = subjects.get(record.subject, 0) + 1
+        print(f"Dauer:       {span:.2f} s")
+        print("Subjects:")
+        for subject, amount in sorted(subjects.items(), key=lambda item: -item[1]):
+            print(f"  {amount:>8}  {subject}")
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "info":
+        info(args)
+        return
+    try:
+        asyncio.run(record(args) if args.command == "record" else replay(args))
+    except KeyboardInterrupt:
+        print("Beenden...")
+
+
+if __name__ == "__main__":
+    main()